@@ -2,56 +2,90 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_pymongo import PyMongo
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
+from config import effective_client_settings, load_config, mongo_client_options
+from donation_stats import (
+    InvalidDateRange, add_donation_to_stats, aggregate_donation_stats,
+    format_donation_stats, get_campaign_stats, new_campaign_stats, parse_date_range
+)
+from cache import TTLCache, apply_projection
+from conditional import (
+    bump_list_version, document_validators, get_list_version, is_not_modified,
+    make_etag, not_modified_response, with_validators
+)
+from donation_import import InvalidImport, import_donations, parse_import
+from export import InvalidExportFormat, export_format, export_response
+from health import POOL_LISTENER, HealthProbe
+from idempotency import init_idempotency, new_transaction_id, stamp_idempotency_key
+from json_provider import init_json
+from metrics import COMMAND_LISTENER, init_metrics, metrics_authorized, metrics_response
+from passwords import HashingBusy, PasswordHasher
+from pagination import InvalidCursor, clamp_limit, fetch_page
+from projection import InvalidFields, parse_fields, public_document, read_projection
+from rate_limit import init_rate_limiting
+from recent_donations import recent_donations_push
+from server_stats import server_stats
+from slow_query import SLOW_QUERY_LISTENER
+from streaming import stream_collection, stream_json_list
+from request_log import init_request_logging
+from transactions import run_write
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 
-# Configuration - Use environment variables when available
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-jwt-secret-key-change-this-in-production')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
-app.config['MONGO_URI'] = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/connect_contribute')
+# Configuration - config.py classes, selected by APP_CONFIG/FLASK_ENV and
+# overridable through environment variables
+config_name = load_config(app)
 
 # Initialize extensions
 CORS(app, resources={
     r"/api/*": {
         "origins": ["*"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "If-Modified-Since", "Idempotency-Key"],
+        "expose_headers": ["ETag", "Last-Modified", "Content-Disposition", "Idempotent-Replayed"]
     }
 })
 jwt = JWTManager(app)
-mongo = PyMongo(app)
+mongo = PyMongo(app, event_listeners=[COMMAND_LISTENER, SLOW_QUERY_LISTENER, POOL_LISTENER],
+                **mongo_client_options(app.config))
+SLOW_QUERY_LISTENER.attach(mongo.cx)
+# After PyMongo, which installs its own BSON provider on app.json
+init_json(app)
 
-# Add request logging middleware
-@app.before_request
-def log_request():
-    print(f"📨 {request.method} {request.path} - From: {request.remote_addr}")
-    if request.is_json:
-        print(f"📄 Data: {request.get_json()}")
+# Background MongoDB ping; health endpoints read its cached result
+health_probe = HealthProbe(mongo.cx)
+init_metrics(app)
+
+# Per-worker caches for single-document reads, invalidated by the write helpers
+campaign_cache = TTLCache('campaigns')
+donation_request_cache = TTLCache('donation_requests')
+
+# Structured, sampled request logging (written by a background thread)
+request_logger = init_request_logging(app)
+
+# Password hashing/verification in a bounded process pool (see passwords.py)
+password_hasher = PasswordHasher()
+
+# Per-IP/per-email throttling of login and signup (see rate_limit.py)
+auth_limiter = init_rate_limiting(mongo, proxy_hops=app.config['RATE_LIMIT_PROXY_HOPS'])
+
+# Replays of retried donation/payment POSTs by Idempotency-Key (see idempotency.py)
+idempotency = init_idempotency(mongo)
 
 # User model helper functions
 def serialize_user(user):
-    """Convert user object to JSON-serializable format"""
+    """Prepare a user for a JSON response"""
     if not user:
         return None
     
-    # Convert _id to string
-    user['_id'] = str(user['_id'])
-    
-    # Convert datetime fields to ISO format strings
-    if user.get('created_at'):
-        user['created_at'] = user['created_at'].isoformat()
-    if user.get('updated_at'):
-        user['updated_at'] = user['updated_at'].isoformat()
-    
     # Remove password from response
     user.pop('password', None)
     
@@ -59,7 +93,8 @@ def serialize_user(user):
 
 def create_user(name, email, password, user_type):
     """Create a new user in the database"""
-    hashed_password = generate_password_hash(password)
+    # Hashed in the password pool, not this request thread
+    hashed_password = password_hasher.hash(password)
     user = {
         'name': name,
         'email': email,
@@ -80,6 +115,21 @@ def get_user_by_email(email):
     user = mongo.db.users.find_one({'email': email})
     return user
 
+def upgrade_password_hash(user, new_hash):
+    """Store a rehashed password after a successful login.
+
+    Only replaces the hash that was verified, so a password changed in the
+    meantime is never overwritten.
+    """
+    try:
+        mongo.db.users.update_one(
+            {'_id': user['_id'], 'password': user['password']},
+            {'$set': {'password': new_hash}}
+        )
+    except Exception as e:
+        # The old hash still works; the next login retries
+        print(f"⚠️ Could not upgrade password hash for {user['_id']}: {e}")
+
 def get_user_by_id(user_id):
     """Get user by ID"""
     try:
@@ -99,21 +149,8 @@ def update_user(user_id, data):
 
 # Fundraising Campaign model helper functions
 def serialize_campaign(campaign):
-    """Convert campaign object to JSON-serializable format"""
-    if not campaign:
-        return None
-    
-    campaign['_id'] = str(campaign['_id'])
-    campaign['created_by'] = str(campaign['created_by'])
-    
-    if campaign.get('created_at'):
-        campaign['created_at'] = campaign['created_at'].isoformat()
-    if campaign.get('updated_at'):
-        campaign['updated_at'] = campaign['updated_at'].isoformat()
-    if campaign.get('end_date'):
-        campaign['end_date'] = campaign['end_date'].isoformat()
-    
-    return campaign
+    """Prepare a campaign for a JSON response (drops campaign_stats)"""
+    return public_document('campaign', campaign)
 
 def create_campaign(data, user_id):
     """Create a new fundraising campaign"""
@@ -129,10 +166,12 @@ def create_campaign(data, user_id):
         'status': 'active',
         'created_by': ObjectId(user_id),
         'created_at': datetime.utcnow(),
-        'updated_at': datetime.utcnow()
+        'updated_at': datetime.utcnow(),
+        'campaign_stats': new_campaign_stats(datetime.utcnow())
     }
     result = mongo.db.campaigns.insert_one(campaign)
     campaign['_id'] = result.inserted_id
+    bump_list_version(mongo.db, 'campaigns')
     return campaign
 
 def get_campaigns_by_user(user_id):
@@ -141,26 +180,44 @@ def get_campaigns_by_user(user_id):
     try:
         query = {'created_by': ObjectId(user_id)}
         print(f"[DEBUG] MongoDB query: {query}")
-        campaigns = list(mongo.db.campaigns.find(query))
+        campaigns = list(mongo.db.campaigns.find(query, read_projection('campaign')))
         print(f"[DEBUG] Found {len(campaigns)} campaigns for user {user_id}")
         return [serialize_campaign(campaign) for campaign in campaigns]
     except Exception as e:
         print(f"[DEBUG] Error in get_campaigns_by_user: {e}")
         return []
 
-def get_all_active_campaigns():
-    """Get all active campaigns"""
-    campaigns = list(mongo.db.campaigns.find({'status': 'active'}))
-    return [serialize_campaign(campaign) for campaign in campaigns]
+def get_all_active_campaigns(projection=None):
+    """Cursor over all active campaigns, for stream_json_list"""
+    return stream_collection(mongo.db.campaigns).find({'status': 'active'}, read_projection('campaign', projection))
+
+def get_active_campaigns_page(limit, cursor=None, projection=None):
+    """Get one keyset page of active campaigns, newest first.
+
+    Returns (campaigns, next_cursor); next_cursor is None on the last page.
+    """
+    campaigns, next_cursor = fetch_page(
+        mongo.db.campaigns, {'status': 'active'}, limit, cursor, read_projection('campaign', projection)
+    )
+    return [serialize_campaign(campaign) for campaign in campaigns], next_cursor
 
-def get_campaign_by_id(campaign_id):
-    """Get campaign by ID"""
+def get_campaign_by_id(campaign_id, projection=None):
+    """Get campaign by ID (served from campaign_cache when possible)"""
     try:
-        campaign = mongo.db.campaigns.find_one({'_id': ObjectId(campaign_id)})
-        return serialize_campaign(campaign)
+        key = str(ObjectId(campaign_id))
+        campaign = campaign_cache.get(key)
+        if campaign is None:
+            campaign = mongo.db.campaigns.find_one({'_id': ObjectId(campaign_id)}, read_projection('campaign'))
+            campaign_cache.set(key, campaign)
+        return apply_projection(campaign, projection)
     except:
         return None
 
+def invalidate_campaign(campaign_id):
+    """Drop a changed campaign from the read cache and bump the list ETag"""
+    campaign_cache.invalidate(str(ObjectId(campaign_id)))
+    bump_list_version(mongo.db, 'campaigns')
+
 def update_campaign(campaign_id, data, user_id):
     """Update campaign data"""
     data['updated_at'] = datetime.utcnow()
@@ -168,6 +225,7 @@ def update_campaign(campaign_id, data, user_id):
         {'_id': ObjectId(campaign_id), 'created_by': ObjectId(user_id)},
         {'$set': data}
     )
+    invalidate_campaign(campaign_id)
     return result.modified_count > 0
 
 def delete_campaign(campaign_id, user_id):
@@ -175,68 +233,101 @@ def delete_campaign(campaign_id, user_id):
     result = mongo.db.campaigns.delete_one(
         {'_id': ObjectId(campaign_id), 'created_by': ObjectId(user_id)}
     )
+    invalidate_campaign(campaign_id)
     return result.deleted_count > 0
 
+# Campaign fields the app shows right after a donation or UPI payment
+DONATION_RESULT_PROJECTION = {
+    'raised_amount': 1,
+    'target_amount': 1,
+    'total_donations': 1,
+    'updated_at': 1
+}
+
+def increment_campaign_raised(campaign_id, amount, count_donation=False, payment_method=None):
+    """Add amount to a campaign's raised_amount in one round trip.
+
+    Set count_donation when a matching record goes into the donations
+    collection, so campaign_stats counts it too.
+    Returns the updated campaign, projected to DONATION_RESULT_PROJECTION,
+    or None if the campaign doesn't exist.
+    """
+    update = {
+        '$inc': {'raised_amount': float(amount)},
+        '$set': {'updated_at': datetime.utcnow()}
+    }
+    if count_donation:
+        add_donation_to_stats(update, amount, payment_method)
+    updated = mongo.db.campaigns.find_one_and_update(
+        {'_id': ObjectId(campaign_id)},
+        update,
+        projection=DONATION_RESULT_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is not None:
+        invalidate_campaign(campaign_id)
+    return updated
+
+def record_and_count(collection, record, count_donation=False, payment_method=None):
+    """Insert a donation or payment record, then add it to its campaign.
+
+    The insert comes first, so a duplicate record fails before any counter
+    moves; if the campaign is missing or its update fails, the record is
+    deleted again. Returns the updated campaign (DONATION_RESULT_PROJECTION
+    fields only) or None if the campaign doesn't exist.
+    """
+    record_id = collection.insert_one(stamp_idempotency_key(record)).inserted_id
+    try:
+        updated = increment_campaign_raised(record['campaign_id'], record['amount'],
+                                            count_donation=count_donation, payment_method=payment_method)
+    except Exception:
+        collection.delete_one({'_id': record_id})
+        raise
+    if updated is None:
+        collection.delete_one({'_id': record_id})
+    return updated
+
 def add_donation_to_campaign(campaign_id, amount, donor_id=None):
     """Increment a campaign's raised amount by the specified amount.
 
-    Returns the updated serialized campaign or None if not found.
+    Returns the updated campaign (DONATION_RESULT_PROJECTION fields only)
+    or None if not found.
     """
     try:
-        update_result = mongo.db.campaigns.update_one(
-            {'_id': ObjectId(campaign_id)},
-            {
-                '$inc': {'raised_amount': float(amount)},
-                '$set': {'updated_at': datetime.utcnow()}
-            }
-        )
-        if update_result.matched_count == 0:
+        # A simple audit entry, recorded before the counters change
+        updated = record_and_count(mongo.db.donations, {
+            'campaign_id': ObjectId(campaign_id),
+            'amount': float(amount),
+            'donor_id': ObjectId(donor_id) if donor_id else None,
+            'created_at': datetime.utcnow()
+        }, count_donation=True)
+        if updated is None:
             return None
 
-        # Optionally record a donation entry (simple audit)
-        try:
-            mongo.db.donations.insert_one({
-                'campaign_id': ObjectId(campaign_id),
-                'amount': float(amount),
-                'donor_id': ObjectId(donor_id) if donor_id else None,
-                'created_at': datetime.utcnow()
-            })
-        except Exception:
-            # Do not block on donation log failure
-            pass
-
-        updated = mongo.db.campaigns.find_one({'_id': ObjectId(campaign_id)})
         return serialize_campaign(updated)
+    except DuplicateKeyError:
+        # Already recorded under this Idempotency-Key; nothing was counted
+        raise
     except Exception:
         return None
 
 # Enhanced donation tracking functions
 def serialize_donation(donation):
-    """Convert donation object to JSON-serializable format"""
-    if not donation:
-        return None
-    
-    donation['_id'] = str(donation['_id'])
-    donation['campaign_id'] = str(donation['campaign_id'])
-    if donation.get('donor_id'):
-        donation['donor_id'] = str(donation['donor_id'])
-    
-    if donation.get('created_at'):
-        donation['created_at'] = donation['created_at'].isoformat()
-    if donation.get('updated_at'):
-        donation['updated_at'] = donation['updated_at'].isoformat()
-    
-    return donation
+    """Prepare a donation for a JSON response (drops idempotency_key)"""
+    return public_document('donation', donation)
 
 def create_donation(campaign_id, donation_data, donor_id=None):
-    """Create a new donation record with comprehensive tracking"""
-    try:
-        # Validate campaign exists
-        campaign = mongo.db.campaigns.find_one({'_id': ObjectId(campaign_id)})
-        if not campaign:
-            return None
+    """Create a new donation record with comprehensive tracking.
 
+    Costs two round trips: the donation insert and one campaign update
+    (which also checks that the campaign exists). With DONATION_TRANSACTIONS
+    enabled both run in one transaction; otherwise the donation is deleted
+    again if the campaign is missing or its update fails. Inserting first
+    means a duplicate donation fails before any counter moves.
+    """
+    try:
         amount = float(donation_data['amount'])
+        now = datetime.utcnow()
         
         # Create donation record
         donation = {
@@ -252,129 +343,97 @@ def create_donation(campaign_id, donation_data, donor_id=None):
             'message': donation_data.get('message'),
             'is_anonymous': donation_data.get('is_anonymous', False),
             'additional_info': donation_data.get('additional_info', {}),
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
+        }
+        stamp_idempotency_key(donation)
+        recent_entry = {
+            'amount': amount,
+            'donor_name': donation['donor_name'],
+            'created_at': now
         }
         
-        # Insert donation
-        result = mongo.db.donations.insert_one(donation)
-        donation['_id'] = result.inserted_id
-        
-        # Update campaign raised amount
-        mongo.db.campaigns.update_one(
-            {'_id': ObjectId(campaign_id)},
-            {
-                '$inc': {'raised_amount': amount},
-                '$set': {'updated_at': datetime.utcnow()}
-            }
-        )
-        
-        # Update campaign donation stats
-        mongo.db.campaigns.update_one(
-            {'_id': ObjectId(campaign_id)},
-            {
-                '$inc': {'total_donations': 1},
-                '$push': {
-                    'recent_donations': {
-                        'amount': amount,
-                        'donor_name': donation['donor_name'],
-                        'created_at': donation['created_at']
-                    }
-                }
-            }
-        )
+        # Raised amount, donation count, campaign_stats and the bounded
+        # recent_donations list all change in one update; recent_donations
+        # keeps only the newest few entries, the full history stays in donations
+        campaign_update = add_donation_to_stats({
+            '$inc': {'raised_amount': amount, 'total_donations': 1},
+            '$set': {'updated_at': now},
+            '$push': {'recent_donations': recent_donations_push(recent_entry)}
+        }, amount, donation['payment_method'])
+        
+        def write(session):
+            result = mongo.db.donations.insert_one(donation, session=session)
+            try:
+                update_result = mongo.db.campaigns.update_one(
+                    {'_id': ObjectId(campaign_id)},
+                    campaign_update,
+                    session=session
+                )
+            except Exception:
+                if session is None:
+                    # No transaction to abort: take the donation out again
+                    mongo.db.donations.delete_one({'_id': result.inserted_id})
+                raise
+            if update_result.matched_count == 0:
+                mongo.db.donations.delete_one({'_id': result.inserted_id}, session=session)
+                return False
+            return True
+        
+        if not run_write(mongo.cx, write):
+            return None
+        invalidate_campaign(campaign_id)
         
         return serialize_donation(donation)
+    except DuplicateKeyError:
+        # transaction_id already recorded; the counters weren't touched
+        raise
     except Exception as e:
         print(f"Error creating donation: {e}")
         return None
 
-def get_campaign_donations(campaign_id, limit=50):
-    """Get donations for a specific campaign"""
+def get_campaign_donations(campaign_id, limit=50, projection=None):
+    """Cursor over donations for a specific campaign, for stream_json_list"""
     try:
-        donations = list(mongo.db.donations.find(
-            {'campaign_id': ObjectId(campaign_id)}
-        ).sort('created_at', -1).limit(limit))
-        return [serialize_donation(d) for d in donations]
+        return stream_collection(mongo.db.donations).find(
+            {'campaign_id': ObjectId(campaign_id)}, read_projection('donation', projection)
+        ).sort('created_at', -1).limit(limit)
     except Exception as e:
         print(f"Error fetching campaign donations: {e}")
         return []
 
 def get_user_donations(user_id, limit=50):
-    """Get donations made by a specific user"""
+    """Cursor over donations made by a specific user, for stream_json_list"""
     try:
-        donations = list(mongo.db.donations.find(
-            {'donor_id': ObjectId(user_id)}
-        ).sort('created_at', -1).limit(limit))
-        return [serialize_donation(d) for d in donations]
+        return stream_collection(mongo.db.donations).find(
+            {'donor_id': ObjectId(user_id)}, read_projection('donation')
+        ).sort('created_at', -1).limit(limit)
     except Exception as e:
         print(f"Error fetching user donations: {e}")
         return []
 
-def get_donation_stats(campaign_id):
-    """Get comprehensive donation statistics for a campaign"""
-    try:
-        pipeline = [
-            {'$match': {'campaign_id': ObjectId(campaign_id)}},
-            {'$group': {
-                '_id': None,
-                'total_amount': {'$sum': '$amount'},
-                'total_donations': {'$sum': 1},
-                'average_donation': {'$avg': '$amount'},
-                'highest_donation': {'$max': '$amount'},
-                'payment_methods': {
-                    '$push': '$payment_method'
-                }
-            }}
-        ]
-        
-        result = list(mongo.db.donations.aggregate(pipeline))
-        if result:
-            stats = result[0]
-            # Count payment methods
-            payment_methods = {}
-            for method in stats.get('payment_methods', []):
-                payment_methods[method] = payment_methods.get(method, 0) + 1
-            
-            return {
-                'total_amount': stats.get('total_amount', 0),
-                'total_donations': stats.get('total_donations', 0),
-                'average_donation': round(stats.get('average_donation', 0), 2),
-                'highest_donation': stats.get('highest_donation', 0),
-                'payment_methods': payment_methods
-            }
-        else:
-            return {
-                'total_amount': 0,
-                'total_donations': 0,
-                'average_donation': 0,
-                'highest_donation': 0,
-                'payment_methods': {}
-            }
+def get_donation_stats(campaign_id, start=None, end=None):
+    """Get comprehensive donation statistics for a campaign.
+
+    All-time stats come from the incrementally maintained campaign_stats
+    sub-document; a start/end window runs one $facet aggregation instead.
+    """
+    try:
+        if start or end:
+            return aggregate_donation_stats(mongo.db, ObjectId(campaign_id), start, end)
+        stats = get_campaign_stats(mongo.db, ObjectId(campaign_id))
+        return stats if stats is not None else format_donation_stats(None)
     except Exception as e:
         print(f"Error fetching donation stats: {e}")
-        return {
-            'total_amount': 0,
-            'total_donations': 0,
-            'average_donation': 0,
-            'highest_donation': 0,
-            'payment_methods': {}
-        }
+        return format_donation_stats(None)
 
 def record_upi_payment(campaign_id, amount, payment_details, donor_id=None):
-    """Record a UPI payment for a campaign with enhanced tracking"""
-    try:
-        # Update campaign raised amount
-        update_result = mongo.db.campaigns.update_one(
-            {'_id': ObjectId(campaign_id)},
-            {
-                '$inc': {'raised_amount': float(amount)},
-                '$set': {'updated_at': datetime.utcnow()}
-            }
-        )
-        if update_result.matched_count == 0:
-            return None
+    """Record a UPI payment for a campaign with enhanced tracking.
 
+    Returns the updated campaign (DONATION_RESULT_PROJECTION fields only)
+    or None if not found.
+    """
+    try:
         # Record detailed payment entry
         payment_record = {
             'campaign_id': ObjectId(campaign_id),
@@ -386,33 +445,21 @@ def record_upi_payment(campaign_id, amount, payment_details, donor_id=None):
             'payment_time': datetime.fromisoformat(payment_details['payment_time']) if payment_details.get('payment_time') else datetime.utcnow(),
             'created_at': datetime.utcnow()
         }
-        mongo.db.payments.insert_one(payment_record)
+        # A payment recorded before under this transaction_id or
+        # Idempotency-Key raises DuplicateKeyError before the raised amount
+        # changes
+        updated = record_and_count(mongo.db.payments, payment_record)
+        if updated is None:
+            return None
 
-        # Get updated campaign
-        updated = mongo.db.campaigns.find_one({'_id': ObjectId(campaign_id)})
         return serialize_campaign(updated)
+    except DuplicateKeyError:
+        raise
     except Exception as e:
         print(f"Error recording UPI payment: {e}")
         return None
 
 # Donation Request model helper functions
-def serialize_donation_request(request):
-    """Convert donation request object to JSON-serializable format"""
-    if not request:
-        return None
-    
-    request['_id'] = str(request['_id'])
-    request['created_by'] = str(request['created_by'])
-    
-    if request.get('created_at'):
-        request['created_at'] = request['created_at'].isoformat()
-    if request.get('updated_at'):
-        request['updated_at'] = request['updated_at'].isoformat()
-    if request.get('deadline'):
-        request['deadline'] = request['deadline'].isoformat()
-    
-    return request
-
 def create_donation_request(data, user_id):
     """Create a new donation request"""
     donation_request = {
@@ -431,26 +478,34 @@ def create_donation_request(data, user_id):
     }
     result = mongo.db.donation_requests.insert_one(donation_request)
     donation_request['_id'] = result.inserted_id
+    bump_list_version(mongo.db, 'donation_requests')
     return donation_request
 
 def get_donation_requests_by_user(user_id):
     """Get donation requests created by a specific user"""
-    requests = list(mongo.db.donation_requests.find({'created_by': ObjectId(user_id)}))
-    return [serialize_donation_request(req) for req in requests]
+    return list(mongo.db.donation_requests.find({'created_by': ObjectId(user_id)}))
 
-def get_all_active_donation_requests():
-    """Get all active donation requests"""
-    requests = list(mongo.db.donation_requests.find({'status': 'active'}))
-    return [serialize_donation_request(req) for req in requests]
+def get_all_active_donation_requests(projection=None):
+    """Cursor over all active donation requests, for stream_json_list"""
+    return stream_collection(mongo.db.donation_requests).find({'status': 'active'}, projection)
 
 def get_donation_request_by_id(request_id):
-    """Get donation request by ID"""
+    """Get donation request by ID (served from donation_request_cache when possible)"""
     try:
-        request = mongo.db.donation_requests.find_one({'_id': ObjectId(request_id)})
-        return serialize_donation_request(request)
+        key = str(ObjectId(request_id))
+        request = donation_request_cache.get(key)
+        if request is None:
+            request = mongo.db.donation_requests.find_one({'_id': ObjectId(request_id)})
+            donation_request_cache.set(key, request)
+        return request
     except:
         return None
 
+def invalidate_donation_request(request_id):
+    """Drop a changed donation request from the read cache and bump the list ETag"""
+    donation_request_cache.invalidate(str(ObjectId(request_id)))
+    bump_list_version(mongo.db, 'donation_requests')
+
 def update_donation_request(request_id, data, user_id):
     """Update donation request data"""
     data['updated_at'] = datetime.utcnow()
@@ -458,6 +513,7 @@ def update_donation_request(request_id, data, user_id):
         {'_id': ObjectId(request_id), 'created_by': ObjectId(user_id)},
         {'$set': data}
     )
+    invalidate_donation_request(request_id)
     return result.modified_count > 0
 
 def delete_donation_request(request_id, user_id):
@@ -465,6 +521,7 @@ def delete_donation_request(request_id, user_id):
     result = mongo.db.donation_requests.delete_one(
         {'_id': ObjectId(request_id), 'created_by': ObjectId(user_id)}
     )
+    invalidate_donation_request(request_id)
     return result.deleted_count > 0
 
 # Routes
@@ -474,14 +531,45 @@ def home():
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'message': 'Backend is running'})
+    return jsonify({
+        'status': 'healthy',
+        'message': 'Backend is running',
+        'config': config_name,
+        'mongo_client': effective_client_settings(mongo.cx, app.config),
+        'caches': {
+            'campaigns': campaign_cache.stats(),
+            'donation_requests': donation_request_cache.stats()
+        },
+        'request_log': request_logger.stats(),
+        'slow_queries': SLOW_QUERY_LISTENER.stats(),
+        'password_hashing': password_hasher.stats(),
+        'rate_limit': auth_limiter.stats(),
+        'idempotency': idempotency.stats(),
+        'server': server_stats()
+    })
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    # The process is up and serving requests; deliberately doesn't touch MongoDB
+    return jsonify({'status': 'alive'}), 200
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    status = health_probe.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return metrics_response()
 
 @app.route('/api/auth/signup', methods=['POST'])
+@auth_limiter.limit('signup')
 def signup():
     try:
         print("🔥 SIGNUP REQUEST RECEIVED")
         data = request.get_json()
-        print(f"📧 Data received: {data}")
         
         # Validate required fields
         required_fields = ['name', 'email', 'password', 'user_type']
@@ -527,15 +615,17 @@ def signup():
             'user': serialized_user
         }), 201
         
+    except HashingBusy as e:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
+@auth_limiter.limit('login')
 def login():
     try:
         print("🔑 LOGIN REQUEST RECEIVED")
         data = request.get_json()
-        print(f"📧 Login data received: {data}")
         
         # Validate required fields
         if not data.get('email') or not data.get('password'):
@@ -555,10 +645,13 @@ def login():
         
         print(f"👤 User found: {user['name']} ({user['email']})")
         
-        # Check password
-        if not check_password_hash(user['password'], password):
+        # Check password (in the password pool), upgrading an outdated hash
+        matches, upgraded_hash = password_hasher.check(user['password'], password)
+        if not matches:
             print("❌ Password doesn't match")
             return jsonify({'error': 'Invalid email or password'}), 401
+        if upgraded_hash:
+            upgrade_password_hash(user, upgraded_hash)
         
         print("✅ Password matches! Login successful")
         
@@ -573,6 +666,8 @@ def login():
             'user': serialized_user
         }), 200
         
+    except HashingBusy as e:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         print(f"💥 Login error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -680,23 +775,53 @@ def get_user_campaigns():
 @app.route('/api/campaigns/all', methods=['GET'])
 def get_all_campaigns():
     try:
-        campaigns = get_all_active_campaigns()
-        
-        return jsonify(campaigns), 200
-        
+        version, last_modified = get_list_version(mongo.db, 'campaigns')
+        etag = make_etag('campaigns', version)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        # Clients that don't ask for a page still get the bare list
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            projection = parse_fields('campaign', request.args.get('fields'))
+            campaigns = get_all_active_campaigns(projection)
+            return with_validators(stream_json_list(campaigns), etag, last_modified), 200
+        
+        limit = clamp_limit(request.args.get('limit', type=int))
+        projection = parse_fields('campaign', request.args.get('fields'), always=('created_at',))
+        campaigns, next_cursor = get_active_campaigns_page(limit, request.args.get('cursor'), projection)
+        
+        return with_validators(jsonify({
+            'campaigns': campaigns,
+            'next_cursor': next_cursor,
+            'limit': limit
+        }), etag, last_modified), 200
+        
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 422
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/campaigns/<campaign_id>', methods=['GET'])
 def get_campaign(campaign_id):
     try:
+        projection = parse_fields('campaign', request.args.get('fields'))
         campaign = get_campaign_by_id(campaign_id)
         
         if not campaign:
             return jsonify({'error': 'Campaign not found'}), 404
         
-        return jsonify(campaign), 200
+        # Validators come from the full document, not the projected one
+        etag, last_modified = document_validators(campaign)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        campaign = apply_projection(campaign, projection)
+        return with_validators(jsonify(campaign), etag, last_modified), 200
         
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -739,6 +864,7 @@ def delete_campaign_route(campaign_id):
 # Enhanced Donation routes
 @app.route('/api/campaigns/<campaign_id>/donations', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent('create_donation')
 def create_donation_route(campaign_id):
     try:
         user_id = get_jwt_identity()
@@ -760,7 +886,7 @@ def create_donation_route(campaign_id):
         
         # Add transaction ID if not provided
         if not data.get('transaction_id'):
-            data['transaction_id'] = f"DON_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{user_id[:8]}"
+            data['transaction_id'] = new_transaction_id('DON')
         
         donation = create_donation(campaign_id, data, user_id)
         if not donation:
@@ -771,6 +897,8 @@ def create_donation_route(campaign_id):
             'donation': donation
         }), 201
         
+    except DuplicateKeyError:
+        return jsonify({'error': 'Donation already recorded', 'transaction_id': data['transaction_id']}), 409
     except Exception as e:
         print(f"Error in create donation route: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -779,12 +907,60 @@ def create_donation_route(campaign_id):
 def get_campaign_donations_route(campaign_id):
     try:
         limit = request.args.get('limit', 50, type=int)
-        donations = get_campaign_donations(campaign_id, limit)
-        return jsonify(donations), 200
+        projection = parse_fields('donation', request.args.get('fields'))
+        donations = get_campaign_donations(campaign_id, limit, projection)
+        return stream_json_list(donations), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         print(f"Error fetching campaign donations: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/campaigns/<campaign_id>/donations/export', methods=['GET'])
+@jwt_required()
+def export_campaign_donations_route(campaign_id):
+    try:
+        user_id = get_jwt_identity()
+        fmt = export_format(request.args.get('format'))
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+        
+        # Only the campaign's creator may export its donors' records
+        campaign = get_campaign_by_id(campaign_id)
+        if not campaign:
+            return jsonify({'error': 'Campaign not found'}), 404
+        if str(campaign['created_by']) != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        return export_response(mongo.db, campaign_id, fmt, start, end), 200
+    except (InvalidExportFormat, InvalidDateRange) as e:
+        return jsonify({'error': str(e)}), 422
+    except Exception as e:
+        print(f"Error exporting campaign donations: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/donations/import', methods=['POST'])
+@jwt_required()
+def import_donations_route():
+    try:
+        user_id = get_jwt_identity()
+        # A CSV/JSON file upload, or the sheet as the request body
+        upload = request.files.get('file')
+        if upload:
+            rows = parse_import(upload.read(), upload.mimetype, upload.filename)
+        else:
+            rows = parse_import(request.get_data(), request.content_type)
+        
+        report = import_donations(mongo.db, rows, user_id)
+        for campaign in report['campaigns']:
+            invalidate_campaign(campaign['campaign_id'])
+        
+        return jsonify(report), 201 if report['imported'] else 422
+    except InvalidImport as e:
+        return jsonify({'error': str(e)}), 422
+    except Exception as e:
+        print(f"Error importing donations: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/donations/user', methods=['GET'])
 @jwt_required()
 def get_user_donations_route():
@@ -792,7 +968,7 @@ def get_user_donations_route():
         user_id = get_jwt_identity()
         limit = request.args.get('limit', 50, type=int)
         donations = get_user_donations(user_id, limit)
-        return jsonify(donations), 200
+        return stream_json_list(donations), 200
     except Exception as e:
         print(f"Error fetching user donations: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -800,8 +976,11 @@ def get_user_donations_route():
 @app.route('/api/campaigns/<campaign_id>/donation-stats', methods=['GET'])
 def get_donation_stats_route(campaign_id):
     try:
-        stats = get_donation_stats(campaign_id)
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+        stats = get_donation_stats(campaign_id, start, end)
         return jsonify(stats), 200
+    except InvalidDateRange as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         print(f"Error fetching donation stats: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -809,6 +988,7 @@ def get_donation_stats_route(campaign_id):
 # UPI Payment route for campaigns
 @app.route('/api/campaigns/<campaign_id>/upi-payment', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent('upi_payment')
 def upi_payment_route(campaign_id):
     try:
         user_id = get_jwt_identity()
@@ -850,6 +1030,8 @@ def upi_payment_route(campaign_id):
                 'status': payment_status
             }
         }), 200
+    except DuplicateKeyError:
+        return jsonify({'error': 'Payment already recorded', 'transaction_id': transaction_id}), 409
     except Exception as e:
         print(f"Error in UPI payment route: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -857,6 +1039,7 @@ def upi_payment_route(campaign_id):
 # Campaign donation route (volunteer contribution)
 @app.route('/api/campaigns/<campaign_id>/donate', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent('donate')
 def donate_to_campaign_route(campaign_id):
     try:
         user_id = get_jwt_identity()
@@ -877,6 +1060,8 @@ def donate_to_campaign_route(campaign_id):
             return jsonify({'error': 'Campaign not found'}), 404
 
         return jsonify(updated_campaign), 200
+    except DuplicateKeyError:
+        return jsonify({'error': 'Donation already recorded'}), 409
     except Exception:
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -897,10 +1082,7 @@ def create_donation_request_route():
         # Create donation request
         donation_request = create_donation_request(data, user_id)
         
-        # Serialize donation request for JSON response
-        serialized_request = serialize_donation_request(donation_request)
-        
-        return jsonify(serialized_request), 201
+        return jsonify(donation_request), 201
         
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
@@ -920,10 +1102,18 @@ def get_user_donation_requests():
 @app.route('/api/donation-requests/all', methods=['GET'])
 def get_all_donation_requests():
     try:
-        requests = get_all_active_donation_requests()
+        version, last_modified = get_list_version(mongo.db, 'donation_requests')
+        etag = make_etag('donation_requests', version)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
         
-        return jsonify(requests), 200
+        projection = parse_fields('donation_request', request.args.get('fields'))
+        requests = get_all_active_donation_requests(projection)
         
+        return with_validators(stream_json_list(requests), etag, last_modified), 200
+        
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -935,7 +1125,11 @@ def get_donation_request(request_id):
         if not donation_request:
             return jsonify({'error': 'Donation request not found'}), 404
         
-        return jsonify(donation_request), 200
+        etag, last_modified = document_validators(donation_request)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        return with_validators(jsonify(donation_request), etag, last_modified), 200
         
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
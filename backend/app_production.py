@@ -2,53 +2,143 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_pymongo import PyMongo
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import os
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import ConfigurationError, DuplicateKeyError
+from cache import TTLCache, apply_projection
+from config import effective_client_settings, load_config, mongo_client_options
+from donation_stats import (
+    InvalidDateRange, add_donation_to_stats, aggregate_donation_stats,
+    format_donation_stats, get_campaign_stats, new_campaign_stats, parse_date_range
+)
+from conditional import (
+    bump_list_version, document_validators, get_list_version, is_not_modified,
+    make_etag, not_modified_response, with_validators
+)
+from donation_import import InvalidImport, import_donations, parse_import
+from export import InvalidExportFormat, export_format, export_response
+from health import POOL_LISTENER, HealthProbe
+from idempotency import init_idempotency, new_transaction_id, stamp_idempotency_key
+from json_provider import init_json
+from startup import Startup, warm_pool
+from metrics import COMMAND_LISTENER, init_metrics, metrics_authorized, metrics_response
+from passwords import HashingBusy, PasswordHasher
+from pagination import KEYSET_SORT, InvalidCursor, clamp_limit, fetch_page
+from projection import InvalidFields, parse_fields, public_document, read_projection
+from rate_limit import init_rate_limiting
+from recent_donations import recent_donations_push
+from server_stats import server_stats
+from slow_query import SLOW_QUERY_LISTENER
+from streaming import stream_collection, stream_json_list
+from request_log import init_request_logging
+from transactions import run_write
 
 app = Flask(__name__)
 
-# Configuration - Use environment variables for production
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-jwt-secret-key-change-this-in-production')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
-
-# MongoDB configuration - Use MongoDB Atlas for production
-MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/connect_contribute')
-app.config['MONGO_URI'] = MONGO_URI
+# Configuration - ProductionConfig from config.py unless APP_CONFIG/FLASK_ENV
+# say otherwise; secrets, MONGO_URI and pool tuning come from the environment
+config_name = load_config(app, default='production')
 
 # Initialize extensions
 CORS(app, resources={
     r"/api/*": {
         "origins": ["*"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "If-Modified-Since", "Idempotency-Key"],
+        "expose_headers": ["ETag", "Last-Modified", "Content-Disposition", "Idempotent-Replayed"]
     }
 })
 jwt = JWTManager(app)
-mongo = PyMongo(app)
-
-# Test MongoDB connection at startup
-print("🔗 Testing MongoDB connection...")
-try:
-    mongo.db.admin.command('ping')
-    print("✅ MongoDB Atlas connection successful!")
-    print(f"📊 Database name: {mongo.db.name}")
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    print(f"🔗 MONGO_URI set: {'MONGO_URI' in os.environ}")
-    if 'MONGO_URI' in os.environ:
-        mongo_uri = os.environ.get('MONGO_URI')
-        # Don't print the full URI for security, just check if it looks right
-        has_cluster = 'cluster' in mongo_uri.lower()
-        has_mongodb = mongo_uri.startswith('mongodb')
-        print(f"🔗 URI format check - starts with mongodb: {has_mongodb}, contains cluster: {has_cluster}")
-    raise e
+mongo = PyMongo()
+
+# Background MongoDB ping; health endpoints read its cached result
+health_probe = HealthProbe(None)
+
+def init_mongo(raise_errors=False):
+    """Create the MongoClient and point the slow query log and health probe at it.
+
+    Runs at import, and again in every gunicorn worker after fork when the
+    app is preloaded (see gunicorn.conf.py), since a MongoClient must not be
+    shared across a fork. The client connects lazily, so the copy created
+    in the master never opens a socket.
+
+    A mongodb+srv:// URI is still resolved here, with a synchronous DNS
+    lookup. If that fails the process keeps booting without a client
+    (mongo.cx is None) and the 'mongodb_client' warm-up phase retries.
+    """
+    try:
+        mongo.init_app(app, event_listeners=[COMMAND_LISTENER, SLOW_QUERY_LISTENER, POOL_LISTENER],
+                       **mongo_client_options(app.config))
+    except ConfigurationError as e:
+        # pymongo raises DNS failures of the SRV lookup as ConfigurationError
+        mongo.cx = mongo.db = None
+        health_probe.client = None
+        if raise_errors:
+            raise
+        print(f"❌ Could not create the MongoDB client, retrying in the background: {e}")
+        return False
+    SLOW_QUERY_LISTENER.attach(mongo.cx)
+    health_probe.client = mongo.cx
+    # init_app installs flask_pymongo's BSON provider on app.json; replace it
+    init_json(app)
+    return True
+
+def connect_mongo():
+    """Warm-up phase: create the MongoClient if init_mongo couldn't"""
+    if mongo.cx is None:
+        init_mongo(raise_errors=True)
+
+init_mongo()
+init_metrics(app)
+
+# Per-worker caches for single-document reads, invalidated by the write helpers
+campaign_cache = TTLCache('campaigns')
+donation_request_cache = TTLCache('donation_requests')
+
+# Entries per cache loaded during warm-up
+WARMUP_CACHE_SIZE = int(os.environ.get('WARMUP_CACHE_SIZE', 100))
+
+# Structured, sampled request logging (written by a background thread)
+request_logger = init_request_logging(app)
+
+# Password hashing/verification in a bounded process pool (see passwords.py)
+password_hasher = PasswordHasher()
+
+# Per-IP/per-email throttling of login and signup (see rate_limit.py)
+auth_limiter = init_rate_limiting(mongo, proxy_hops=app.config['RATE_LIMIT_PROXY_HOPS'])
+
+# Replays of retried donation/payment POSTs by Idempotency-Key (see idempotency.py)
+idempotency = init_idempotency(mongo)
+
+def report_warmup_failure(phase, error):
+    """Log a failed warm-up attempt; it is retried in the background"""
+    print(f"❌ Warm-up phase '{phase}' failed: {error}")
+    if phase in ('mongodb_client', 'mongodb_pool'):
+        print(f"🔗 MONGO_URI set: {'MONGO_URI' in os.environ}")
+        if 'MONGO_URI' in os.environ:
+            mongo_uri = os.environ.get('MONGO_URI')
+            # Don't print the full URI for security, just check if it looks right
+            has_cluster = 'cluster' in mongo_uri.lower()
+            has_mongodb = mongo_uri.startswith('mongodb')
+            print(f"🔗 URI format check - starts with mongodb: {has_mongodb}, contains cluster: {has_cluster}")
+
+# MongoDB is not contacted at import time: the client connects lazily and the
+# pool and caches are warmed in the background once per worker. Readiness
+# stays false until warm-up has finished.
+startup = Startup([
+    ('mongodb_client', connect_mongo),
+    ('mongodb_pool', lambda: warm_pool(mongo.cx)),
+    ('caches', lambda: warm_caches()),
+    ('password_pool', lambda: password_hasher.warm())
+], on_failure=report_warmup_failure)
+app.before_request(startup.start)
+health_probe.startup = startup
 
 # User model helper functions
 def serialize_user(user):
-    """Convert user object to JSON-serializable format"""
+    """Prepare a user for a JSON response"""
     if not user:
         print("⚠️ Warning: serialize_user called with None user")
         return None
@@ -56,18 +146,6 @@ def serialize_user(user):
     print(f"📦 Serializing user: {user.get('name', 'Unknown')}")
     
     try:
-        # Convert _id to string
-        if '_id' in user:
-            user['_id'] = str(user['_id'])
-        
-        # Convert datetime fields to ISO format strings
-        if user.get('created_at'):
-            if hasattr(user['created_at'], 'isoformat'):
-                user['created_at'] = user['created_at'].isoformat()
-        if user.get('updated_at'):
-            if hasattr(user['updated_at'], 'isoformat'):
-                user['updated_at'] = user['updated_at'].isoformat()
-        
         # Remove password from response
         user.pop('password', None)
         
@@ -81,7 +159,8 @@ def create_user(name, email, password, user_type):
     """Create a new user in the database"""
     print(f"🔧 Creating user: {name} ({email}) - Type: {user_type}")
     
-    hashed_password = generate_password_hash(password)
+    # Hashed in the password pool, not this request thread
+    hashed_password = password_hasher.hash(password)
     user = {
         'name': name.strip(),
         'email': email.lower().strip(),  # Normalize email to lowercase
@@ -114,6 +193,21 @@ def get_user_by_email(email):
         print(f"❌ No user found with email: {email}")
     return user
 
+def upgrade_password_hash(user, new_hash):
+    """Store a rehashed password after a successful login.
+
+    Only replaces the hash that was verified, so a password changed in the
+    meantime is never overwritten.
+    """
+    try:
+        mongo.db.users.update_one(
+            {'_id': user['_id'], 'password': user['password']},
+            {'$set': {'password': new_hash}}
+        )
+    except Exception as e:
+        # The old hash still works; the next login retries
+        print(f"⚠️ Could not upgrade password hash for {user['_id']}: {e}")
+
 def get_user_by_id(user_id):
     """Get user by ID"""
     try:
@@ -133,33 +227,8 @@ def update_user(user_id, data):
 
 # Fundraising Campaign model helper functions
 def serialize_campaign(campaign):
-    """Convert campaign object to JSON-serializable format"""
-    try:
-        if not campaign:
-            return None
-        
-        print(f"[DEBUG] Serializing campaign: {campaign.get('title', 'N/A')}")
-        
-        campaign['_id'] = str(campaign['_id'])
-        campaign['created_by'] = str(campaign['created_by'])
-        
-        if campaign.get('created_at'):
-            campaign['created_at'] = campaign['created_at'].isoformat()
-        if campaign.get('updated_at'):
-            campaign['updated_at'] = campaign['updated_at'].isoformat()
-        
-        # Handle end_date serialization
-        if campaign.get('end_date'):
-            if isinstance(campaign['end_date'], datetime):
-                campaign['end_date'] = campaign['end_date'].isoformat()
-        
-        print(f"[DEBUG] Serialized campaign successfully: {campaign.get('title', 'N/A')}")
-        return campaign
-    except Exception as e:
-        print(f"[DEBUG] Error serializing campaign: {e}")
-        import traceback
-        print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
-        return None
+    """Prepare a campaign for a JSON response (drops campaign_stats)"""
+    return public_document('campaign', campaign)
 
 def create_campaign(data, user_id):
     """Create a new fundraising campaign"""
@@ -175,9 +244,11 @@ def create_campaign(data, user_id):
         'created_at': datetime.utcnow(),
         'updated_at': datetime.utcnow(),
         'payment_details': data.get('payment_details', {}),
+        'campaign_stats': new_campaign_stats(datetime.utcnow()),
     }
     result = mongo.db.campaigns.insert_one(campaign)
     campaign['_id'] = result.inserted_id
+    bump_list_version(mongo.db, 'campaigns')
     return campaign
 
 def get_campaigns_by_user(user_id):
@@ -186,7 +257,7 @@ def get_campaigns_by_user(user_id):
         print(f"[DEBUG] get_campaigns_by_user called with user_id={user_id}, type={type(user_id)}")
         user_object_id = ObjectId(user_id)
         print(f"[DEBUG] Converted to ObjectId: {user_object_id}")
-        campaigns = list(mongo.db.campaigns.find({'created_by': user_object_id}))
+        campaigns = list(mongo.db.campaigns.find({'created_by': user_object_id}, read_projection('campaign')))
         print(f"[DEBUG] Found {len(campaigns)} campaigns in database")
         serialized_campaigns = [serialize_campaign(campaign) for campaign in campaigns]
         print(f"[DEBUG] Serialized {len(serialized_campaigns)} campaigns")
@@ -197,19 +268,37 @@ def get_campaigns_by_user(user_id):
         print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
         return []
 
-def get_all_active_campaigns():
-    """Get all active campaigns"""
-    campaigns = list(mongo.db.campaigns.find({'status': 'active'}))
-    return [serialize_campaign(campaign) for campaign in campaigns]
+def get_all_active_campaigns(projection=None):
+    """Cursor over all active campaigns, for stream_json_list"""
+    return stream_collection(mongo.db.campaigns).find({'status': 'active'}, read_projection('campaign', projection))
+
+def get_active_campaigns_page(limit, cursor=None, projection=None):
+    """Get one keyset page of active campaigns, newest first.
+
+    Returns (campaigns, next_cursor); next_cursor is None on the last page.
+    """
+    campaigns, next_cursor = fetch_page(
+        mongo.db.campaigns, {'status': 'active'}, limit, cursor, read_projection('campaign', projection)
+    )
+    return [serialize_campaign(campaign) for campaign in campaigns], next_cursor
 
-def get_campaign_by_id(campaign_id):
-    """Get a specific campaign by ID"""
+def get_campaign_by_id(campaign_id, projection=None):
+    """Get a specific campaign by ID (served from campaign_cache when possible)"""
     try:
-        campaign = mongo.db.campaigns.find_one({'_id': ObjectId(campaign_id)})
-        return serialize_campaign(campaign) if campaign else None
+        key = str(ObjectId(campaign_id))
+        campaign = campaign_cache.get(key)
+        if campaign is None:
+            campaign = mongo.db.campaigns.find_one({'_id': ObjectId(campaign_id)}, read_projection('campaign'))
+            campaign_cache.set(key, campaign)
+        return apply_projection(campaign, projection)
     except:
         return None
 
+def invalidate_campaign(campaign_id):
+    """Drop a changed campaign from the read cache and bump the list ETag"""
+    campaign_cache.invalidate(str(ObjectId(campaign_id)))
+    bump_list_version(mongo.db, 'campaigns')
+
 def update_campaign(campaign_id, data):
     """Update campaign data"""
     try:
@@ -218,6 +307,7 @@ def update_campaign(campaign_id, data):
             {'_id': ObjectId(campaign_id)},
             {'$set': data}
         )
+        invalidate_campaign(campaign_id)
         return result.modified_count > 0
     except:
         return False
@@ -226,29 +316,110 @@ def delete_campaign(campaign_id):
     """Delete a campaign"""
     try:
         result = mongo.db.campaigns.delete_one({'_id': ObjectId(campaign_id)})
+        invalidate_campaign(campaign_id)
         return result.deleted_count > 0
     except:
         return False
 
-# Donation Request model helper functions
-def serialize_donation_request(request_obj):
-    """Convert donation request object to JSON-serializable format"""
-    if not request_obj:
-        return None
+# Campaign fields the app shows right after a donation or UPI payment
+DONATION_RESULT_PROJECTION = {
+    'raised_amount': 1,
+    'target_amount': 1,
+    'total_donations': 1,
+    'updated_at': 1
+}
+
+def increment_campaign_raised(campaign_id, amount, count_donation=False, payment_method=None):
+    """Add amount to a campaign's raised_amount in one round trip.
+
+    Set count_donation when a matching record goes into the donations
+    collection, so campaign_stats counts it too.
+    Returns the updated campaign, projected to DONATION_RESULT_PROJECTION,
+    or None if the campaign doesn't exist.
+    """
+    update = {
+        '$inc': {'raised_amount': float(amount)},
+        '$set': {'updated_at': datetime.utcnow()}
+    }
+    if count_donation:
+        add_donation_to_stats(update, amount, payment_method)
+    updated = mongo.db.campaigns.find_one_and_update(
+        {'_id': ObjectId(campaign_id)},
+        update,
+        projection=DONATION_RESULT_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is not None:
+        invalidate_campaign(campaign_id)
+    return updated
+
+def record_and_count(record, payment_method):
+    """Insert a donation record, then add it to its campaign's counters.
+
+    The insert comes first, so a duplicate record fails before any counter
+    moves; if the campaign is missing or its update fails, the record is
+    deleted again. Returns the updated campaign (DONATION_RESULT_PROJECTION
+    fields only) or None if the campaign doesn't exist.
+    """
+    record_id = mongo.db.donations.insert_one(stamp_idempotency_key(record)).inserted_id
+    try:
+        campaign = increment_campaign_raised(record['campaign_id'], record['amount'],
+                                             count_donation=True, payment_method=payment_method)
+    except Exception:
+        mongo.db.donations.delete_one({'_id': record_id})
+        raise
+    if campaign is None:
+        mongo.db.donations.delete_one({'_id': record_id})
+    return campaign
+
+def record_donation(campaign_id, donation):
+    """Apply a donation to its campaign and store the donation record.
+
+    Costs two round trips: the donation insert and one campaign update
+    (which also checks that the campaign exists). With DONATION_TRANSACTIONS
+    enabled both run in one transaction; otherwise the donation is deleted
+    again if the campaign is missing or its update fails. Inserting first
+    means a duplicate donation fails before any counter moves. Returns
+    False if the campaign doesn't exist.
+    """
+    amount = donation['amount']
+    stamp_idempotency_key(donation)
+    recent_entry = {
+        'amount': amount,
+        'donor_name': donation.get('donor_name', 'Anonymous'),
+        'created_at': donation['created_at']
+    }
     
-    request_obj['_id'] = str(request_obj['_id'])
-    request_obj['created_by'] = str(request_obj['created_by'])
+    campaign_update = add_donation_to_stats({
+        '$inc': {'raised_amount': amount, 'total_donations': 1},
+        '$set': {'updated_at': donation['created_at']},
+        '$push': {'recent_donations': recent_donations_push(recent_entry)}
+    }, amount, donation.get('payment_method'))
     
-    if request_obj.get('created_at'):
-        request_obj['created_at'] = request_obj['created_at'].isoformat()
-    if request_obj.get('updated_at'):
-        request_obj['updated_at'] = request_obj['updated_at'].isoformat()
-    if request_obj.get('deadline'):
-        if isinstance(request_obj['deadline'], datetime):
-            request_obj['deadline'] = request_obj['deadline'].isoformat()
+    def write(session):
+        result = mongo.db.donations.insert_one(donation, session=session)
+        try:
+            update_result = mongo.db.campaigns.update_one(
+                {'_id': ObjectId(campaign_id)},
+                campaign_update,
+                session=session
+            )
+        except Exception:
+            if session is None:
+                # No transaction to abort: take the donation out again
+                mongo.db.donations.delete_one({'_id': result.inserted_id})
+            raise
+        if update_result.matched_count == 0:
+            mongo.db.donations.delete_one({'_id': result.inserted_id}, session=session)
+            return False
+        return True
     
-    return request_obj
+    if not run_write(mongo.cx, write):
+        return False
+    invalidate_campaign(campaign_id)
+    return True
 
+# Donation Request model helper functions
 def create_donation_request(data, user_id):
     """Create a new donation request"""
     deadline = None
@@ -273,26 +444,42 @@ def create_donation_request(data, user_id):
     }
     result = mongo.db.donation_requests.insert_one(request_obj)
     request_obj['_id'] = result.inserted_id
+    bump_list_version(mongo.db, 'donation_requests')
     return request_obj
 
 def get_donation_requests_by_user(user_id):
     """Get all donation requests created by a specific user"""
-    requests = list(mongo.db.donation_requests.find({'created_by': ObjectId(user_id)}))
-    return [serialize_donation_request(req) for req in requests]
+    return list(mongo.db.donation_requests.find({'created_by': ObjectId(user_id)}))
 
-def get_all_active_donation_requests():
-    """Get all active donation requests"""
-    requests = list(mongo.db.donation_requests.find({'status': 'active'}))
-    return [serialize_donation_request(req) for req in requests]
+def get_all_active_donation_requests(projection=None):
+    """Cursor over all active donation requests, for stream_json_list"""
+    return stream_collection(mongo.db.donation_requests).find({'status': 'active'}, projection)
 
 def get_donation_request_by_id(request_id):
-    """Get a specific donation request by ID"""
+    """Get a specific donation request by ID (served from donation_request_cache when possible)"""
     try:
-        request_obj = mongo.db.donation_requests.find_one({'_id': ObjectId(request_id)})
-        return serialize_donation_request(request_obj) if request_obj else None
+        key = str(ObjectId(request_id))
+        request_obj = donation_request_cache.get(key)
+        if request_obj is None:
+            request_obj = mongo.db.donation_requests.find_one({'_id': ObjectId(request_id)})
+            donation_request_cache.set(key, request_obj)
+        return request_obj
     except:
         return None
 
+def warm_caches(limit=WARMUP_CACHE_SIZE):
+    """Pre-load the newest active campaigns and donation requests into the read caches"""
+    campaigns = mongo.db.campaigns.find({'status': 'active'}, read_projection('campaign'))
+    for campaign in campaigns.sort(KEYSET_SORT).limit(limit):
+        campaign_cache.set(str(campaign['_id']), campaign)
+    for request_obj in mongo.db.donation_requests.find({'status': 'active'}).sort(KEYSET_SORT).limit(limit):
+        donation_request_cache.set(str(request_obj['_id']), request_obj)
+
+def invalidate_donation_request(request_id):
+    """Drop a changed donation request from the read cache and bump the list ETag"""
+    donation_request_cache.invalidate(str(ObjectId(request_id)))
+    bump_list_version(mongo.db, 'donation_requests')
+
 def update_donation_request(request_id, data):
     """Update donation request data"""
     try:
@@ -301,6 +488,7 @@ def update_donation_request(request_id, data):
             {'_id': ObjectId(request_id)},
             {'$set': data}
         )
+        invalidate_donation_request(request_id)
         return result.modified_count > 0
     except:
         return False
@@ -309,6 +497,7 @@ def delete_donation_request(request_id):
     """Delete a donation request"""
     try:
         result = mongo.db.donation_requests.delete_one({'_id': ObjectId(request_id)})
+        invalidate_donation_request(request_id)
         return result.deleted_count > 0
     except:
         return False
@@ -317,8 +506,10 @@ def delete_donation_request(request_id):
 @app.route('/api/health', methods=['GET'])
 def health_check():
     try:
-        # Test database connection
-        mongo.db.admin.command('ping')
+        # Cached result of the background ping, not a round trip per call
+        readiness = health_probe.status()
+        if readiness['database'] != 'connected':
+            raise RuntimeError(readiness.get('error', 'MongoDB probe not ready'))
         
         # Get some database info
         db_name = mongo.db.name
@@ -332,7 +523,20 @@ def health_check():
             'environment': os.environ.get('FLASK_ENV', 'development'),
             'mongo_uri_set': 'cluster0.2dqh6mp.mongodb.net' in mongo_uri,
             'timestamp': datetime.utcnow().isoformat(),
-            'version': '2.1.0'
+            'version': '2.1.0',
+            'config': config_name,
+            'mongo_client': effective_client_settings(mongo.cx, app.config),
+            'readiness': readiness,
+            'caches': {
+                'campaigns': campaign_cache.stats(),
+                'donation_requests': donation_request_cache.stats()
+            },
+            'request_log': request_logger.stats(),
+            'slow_queries': SLOW_QUERY_LISTENER.stats(),
+            'password_hashing': password_hasher.stats(),
+            'rate_limit': auth_limiter.stats(),
+            'idempotency': idempotency.stats(),
+            'server': server_stats()
         }), 200
     except Exception as e:
         return jsonify({
@@ -343,13 +547,29 @@ def health_check():
             'timestamp': datetime.utcnow().isoformat()
         }), 500
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    # The process is up and serving requests; deliberately doesn't touch MongoDB
+    return jsonify({'status': 'alive'}), 200
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    status = health_probe.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return metrics_response()
+
 # Authentication routes
 @app.route('/api/auth/signup', methods=['POST'])
+@auth_limiter.limit('signup')
 def signup():
     try:
         print("🔥 SIGNUP REQUEST RECEIVED")
         data = request.get_json()
-        print(f"📧 Request data: {data}")
         
         # Validate required fields
         required_fields = ['name', 'email', 'password', 'user_type']
@@ -406,6 +626,8 @@ def signup():
             'user': user_data
         }), 201
         
+    except HashingBusy as e:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         print(f"❌ Signup error: {e}")
         import traceback
@@ -413,6 +635,7 @@ def signup():
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
+@auth_limiter.limit('login')
 def login():
     try:
         print("🔐 LOGIN REQUEST RECEIVED")
@@ -436,9 +659,13 @@ def login():
         
         # Check password
         print(f"🔑 Checking password for user: {user.get('name', 'Unknown')}")
-        if not check_password_hash(user['password'], password):
+        matches, upgraded_hash = password_hasher.check(user['password'], password)
+        if not matches:
             print(f"❌ Invalid password for user: {email}")
             return jsonify({'error': 'Invalid credentials'}), 401
+        if upgraded_hash:
+            print(f"🔁 Upgrading password hash for user: {email}")
+            upgrade_password_hash(user, upgraded_hash)
         
         # Serialize user for response
         print(f"📦 Serializing user data for login response...")
@@ -455,6 +682,8 @@ def login():
             'user': user_data
         }), 200
         
+    except HashingBusy as e:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         print(f"❌ Login error: {e}")
         import traceback
@@ -524,8 +753,29 @@ def get_user_campaigns():
 @app.route('/api/campaigns/all', methods=['GET'])
 def get_all_campaigns():
     try:
-        campaigns = get_all_active_campaigns()
-        return jsonify(campaigns), 200
+        version, last_modified = get_list_version(mongo.db, 'campaigns')
+        etag = make_etag('campaigns', version)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        # Clients that don't ask for a page still get the bare list
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            projection = parse_fields('campaign', request.args.get('fields'))
+            campaigns = get_all_active_campaigns(projection)
+            return with_validators(stream_json_list(campaigns), etag, last_modified), 200
+        
+        limit = clamp_limit(request.args.get('limit', type=int))
+        projection = parse_fields('campaign', request.args.get('fields'), always=('created_at',))
+        campaigns, next_cursor = get_active_campaigns_page(limit, request.args.get('cursor'), projection)
+        return with_validators(jsonify({
+            'campaigns': campaigns,
+            'next_cursor': next_cursor,
+            'limit': limit
+        }), etag, last_modified), 200
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 422
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         print(f"Get all campaigns error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -533,13 +783,22 @@ def get_all_campaigns():
 @app.route('/api/campaigns/<campaign_id>', methods=['GET'])
 def get_campaign(campaign_id):
     try:
+        projection = parse_fields('campaign', request.args.get('fields'))
         campaign = get_campaign_by_id(campaign_id)
         
         if not campaign:
             return jsonify({'error': 'Campaign not found'}), 404
         
-        return jsonify(campaign), 200
+        # Validators come from the full document, not the projected one
+        etag, last_modified = document_validators(campaign)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        campaign = apply_projection(campaign, projection)
+        return with_validators(jsonify(campaign), etag, last_modified), 200
         
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         print(f"Get campaign error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -556,7 +815,7 @@ def update_fundraising_campaign(campaign_id):
         if not campaign:
             return jsonify({'error': 'Campaign not found'}), 404
         
-        if campaign['created_by'] != user_id:
+        if str(campaign['created_by']) != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Update campaign
@@ -583,7 +842,7 @@ def delete_fundraising_campaign(campaign_id):
         if not campaign:
             return jsonify({'error': 'Campaign not found'}), 404
         
-        if campaign['created_by'] != user_id:
+        if str(campaign['created_by']) != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Delete campaign
@@ -600,6 +859,7 @@ def delete_fundraising_campaign(campaign_id):
 # Campaign donation routes
 @app.route('/api/campaigns/<campaign_id>/donations', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent('create_donation')
 def create_donation(campaign_id):
     try:
         user_id = get_jwt_identity()
@@ -613,9 +873,7 @@ def create_donation(campaign_id):
         if amount <= 0:
             return jsonify({'error': 'Amount must be positive'}), 422
         
-        # Check if campaign exists
-        campaign = get_campaign_by_id(campaign_id)
-        if not campaign:
+        if not ObjectId.is_valid(campaign_id):
             return jsonify({'error': 'Campaign not found'}), 404
         
         # Create donation record
@@ -629,19 +887,16 @@ def create_donation(campaign_id):
             'status': 'completed',
             'created_at': datetime.utcnow(),
         }
-        result = mongo.db.donations.insert_one(donation)
-        
-        # Update campaign raised amount
-        new_raised_amount = campaign['raised_amount'] + amount
-        update_campaign(campaign_id, {'raised_amount': new_raised_amount})
         
-        donation['_id'] = str(result.inserted_id)
-        donation['campaign_id'] = str(donation['campaign_id'])
-        donation['donor_id'] = str(donation['donor_id'])
-        donation['created_at'] = donation['created_at'].isoformat()
+        # Update the campaign and insert the donation (404 if no campaign)
+        if not record_donation(campaign_id, donation):
+            return jsonify({'error': 'Campaign not found'}), 404
         
-        return jsonify(donation), 201
+        return jsonify(public_document('donation', donation)), 201
         
+    except DuplicateKeyError:
+        # record_donation inserts first, so the counters weren't touched
+        return jsonify({'error': 'Donation already recorded', 'transaction_id': data.get('transaction_id')}), 409
     except Exception as e:
         print(f"Create donation error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -649,49 +904,74 @@ def create_donation(campaign_id):
 @app.route('/api/campaigns/<campaign_id>/donations', methods=['GET'])
 def get_campaign_donations(campaign_id):
     try:
-        donations = list(mongo.db.donations.find({'campaign_id': ObjectId(campaign_id)}))
+        projection = parse_fields('donation', request.args.get('fields'))
+        donations = stream_collection(mongo.db.donations).find({'campaign_id': ObjectId(campaign_id)},
+                                                               read_projection('donation', projection))
+        return stream_json_list(donations), 200
         
-        # Serialize donations
-        serialized_donations = []
-        for donation in donations:
-            donation['_id'] = str(donation['_id'])
-            donation['campaign_id'] = str(donation['campaign_id'])
-            donation['donor_id'] = str(donation['donor_id'])
-            donation['created_at'] = donation['created_at'].isostring()
-            serialized_donations.append(donation)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
+    except Exception as e:
+        print(f"Get campaign donations error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/campaigns/<campaign_id>/donations/export', methods=['GET'])
+@jwt_required()
+def export_campaign_donations(campaign_id):
+    try:
+        user_id = get_jwt_identity()
+        fmt = export_format(request.args.get('format'))
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
         
-        return jsonify(serialized_donations), 200
+        # Only the campaign's creator may export its donors' records
+        campaign = get_campaign_by_id(campaign_id)
+        if not campaign:
+            return jsonify({'error': 'Campaign not found'}), 404
+        if str(campaign['created_by']) != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
         
+        return export_response(mongo.db, campaign_id, fmt, start, end), 200
+    except (InvalidExportFormat, InvalidDateRange) as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
-        print(f"Get campaign donations error: {e}")
+        print(f"Export campaign donations error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/campaigns/<campaign_id>/donation-stats', methods=['GET'])
 def get_donation_stats(campaign_id):
     try:
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+        
         # Get campaign
         campaign = get_campaign_by_id(campaign_id)
         if not campaign:
             return jsonify({'error': 'Campaign not found'}), 404
         
-        # Get donation count
-        donation_count = mongo.db.donations.count_documents({'campaign_id': ObjectId(campaign_id)})
-        
-        stats = {
+        # All-time count and breakdown come from the incrementally maintained
+        # campaign_stats (not in the cached campaign); a from/to window
+        # aggregates just that window
+        if start or end:
+            stats = aggregate_donation_stats(mongo.db, ObjectId(campaign_id), start, end)
+        else:
+            stats = get_campaign_stats(mongo.db, ObjectId(campaign_id)) or format_donation_stats(None)
+        stats.update({
             'total_raised': campaign['raised_amount'],
             'target_amount': campaign['target_amount'],
-            'donation_count': donation_count,
+            'donation_count': stats['total_donations'],
             'percentage_raised': (campaign['raised_amount'] / campaign['target_amount']) * 100 if campaign['target_amount'] > 0 else 0
-        }
+        })
         
         return jsonify(stats), 200
         
+    except InvalidDateRange as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         print(f"Get donation stats error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/campaigns/<campaign_id>/upi-payment', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent('upi_payment')
 def record_upi_payment(campaign_id):
     try:
         user_id = get_jwt_identity()
@@ -707,9 +987,7 @@ def record_upi_payment(campaign_id):
         if amount <= 0:
             return jsonify({'error': 'Amount must be positive'}), 422
         
-        # Check if campaign exists
-        campaign = get_campaign_by_id(campaign_id)
-        if not campaign:
+        if not ObjectId.is_valid(campaign_id):
             return jsonify({'error': 'Campaign not found'}), 404
         
         # Create donation record
@@ -718,25 +996,26 @@ def record_upi_payment(campaign_id):
             'donor_id': ObjectId(user_id),
             'amount': amount,
             'payment_method': data['payment_method'],
-            'transaction_id': data.get('transaction_id', f"UPI_{datetime.now().timestamp()}"),
+            'transaction_id': data.get('transaction_id') or new_transaction_id('UPI'),
             'payment_status': data.get('payment_status', 'completed'),
-            'payment_time': data.get('payment_time', datetime.utcnow().isostring()),
+            'payment_time': data.get('payment_time', datetime.utcnow().isoformat()),
             'created_at': datetime.utcnow(),
         }
-        result = mongo.db.donations.insert_one(donation)
-        
-        # Update campaign raised amount
-        new_raised_amount = campaign['raised_amount'] + amount
-        update_campaign(campaign_id, {'raised_amount': new_raised_amount})
         
-        donation['_id'] = str(result.inserted_id)
-        donation['campaign_id'] = str(donation['campaign_id'])
-        donation['donor_id'] = str(donation['donor_id'])
-        donation['created_at'] = donation['created_at'].isostring()
+        # Insert, then update raised amount and read back the new totals
+        try:
+            campaign = record_and_count(donation, data['payment_method'])
+        except DuplicateKeyError:
+            # Recorded before under this transaction_id or Idempotency-Key;
+            # nothing was counted
+            return jsonify({'error': 'Payment already recorded', 'transaction_id': donation['transaction_id']}), 409
+        if not campaign:
+            return jsonify({'error': 'Campaign not found'}), 404
         
         return jsonify({
             'message': 'Payment recorded successfully',
-            'donation': donation
+            'donation': public_document('donation', donation),
+            'campaign': serialize_campaign(campaign)
         }), 201
         
     except Exception as e:
@@ -745,6 +1024,7 @@ def record_upi_payment(campaign_id):
 
 @app.route('/api/campaigns/<campaign_id>/donate', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent('donate')
 def donate_to_campaign(campaign_id):
     try:
         user_id = get_jwt_identity()
@@ -758,9 +1038,7 @@ def donate_to_campaign(campaign_id):
         if amount <= 0:
             return jsonify({'error': 'Amount must be positive'}), 422
         
-        # Check if campaign exists
-        campaign = get_campaign_by_id(campaign_id)
-        if not campaign:
+        if not ObjectId.is_valid(campaign_id):
             return jsonify({'error': 'Campaign not found'}), 404
         
         # Create donation record
@@ -772,16 +1050,21 @@ def donate_to_campaign(campaign_id):
             'status': 'completed',
             'created_at': datetime.utcnow(),
         }
-        result = mongo.db.donations.insert_one(donation)
         
-        # Update campaign raised amount
-        new_raised_amount = campaign['raised_amount'] + amount
-        update_campaign(campaign_id, {'raised_amount': new_raised_amount})
+        # Insert, then update raised amount and read back the new totals
+        try:
+            campaign = record_and_count(donation, 'online')
+        except DuplicateKeyError:
+            # Already recorded under this Idempotency-Key; nothing was counted
+            return jsonify({'error': 'Donation already recorded'}), 409
+        if not campaign:
+            return jsonify({'error': 'Campaign not found'}), 404
         
         return jsonify({
             'message': 'Donation successful',
-            'donation_id': str(result.inserted_id),
-            'new_total': new_raised_amount
+            'donation_id': str(donation['_id']),
+            'new_total': campaign['raised_amount'],
+            'campaign': serialize_campaign(campaign)
         }), 200
         
     except Exception as e:
@@ -805,10 +1088,7 @@ def create_donation_request_route():
         # Create donation request
         request_obj = create_donation_request(data, user_id)
         
-        # Serialize request for JSON response
-        serialized_request = serialize_donation_request(request_obj)
-        
-        return jsonify(serialized_request), 201
+        return jsonify(request_obj), 201
         
     except Exception as e:
         print(f"Create donation request error: {e}")
@@ -828,8 +1108,16 @@ def get_user_donation_requests():
 @app.route('/api/donation-requests/all', methods=['GET'])
 def get_all_donation_requests():
     try:
-        requests = get_all_active_donation_requests()
-        return jsonify(requests), 200
+        version, last_modified = get_list_version(mongo.db, 'donation_requests')
+        etag = make_etag('donation_requests', version)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        projection = parse_fields('donation_request', request.args.get('fields'))
+        requests = get_all_active_donation_requests(projection)
+        return with_validators(stream_json_list(requests), etag, last_modified), 200
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 422
     except Exception as e:
         print(f"Get all donation requests error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -842,7 +1130,11 @@ def get_donation_request(request_id):
         if not request_obj:
             return jsonify({'error': 'Donation request not found'}), 404
         
-        return jsonify(request_obj), 200
+        etag, last_modified = document_validators(request_obj)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        return with_validators(jsonify(request_obj), etag, last_modified), 200
         
     except Exception as e:
         print(f"Get donation request error: {e}")
@@ -860,7 +1152,7 @@ def update_donation_request_route(request_id):
         if not request_obj:
             return jsonify({'error': 'Donation request not found'}), 404
         
-        if request_obj['created_by'] != user_id:
+        if str(request_obj['created_by']) != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Update request
@@ -887,7 +1179,7 @@ def delete_donation_request_route(request_id):
         if not request_obj:
             return jsonify({'error': 'Donation request not found'}), 404
         
-        if request_obj['created_by'] != user_id:
+        if str(request_obj['created_by']) != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Delete request
@@ -901,24 +1193,38 @@ def delete_donation_request_route(request_id):
         print(f"Delete donation request error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/donations/import', methods=['POST'])
+@jwt_required()
+def import_donations_route():
+    try:
+        user_id = get_jwt_identity()
+        # A CSV/JSON file upload, or the sheet as the request body
+        upload = request.files.get('file')
+        if upload:
+            rows = parse_import(upload.read(), upload.mimetype, upload.filename)
+        else:
+            rows = parse_import(request.get_data(), request.content_type)
+        
+        report = import_donations(mongo.db, rows, user_id)
+        for campaign in report['campaigns']:
+            invalidate_campaign(campaign['campaign_id'])
+        
+        return jsonify(report), 201 if report['imported'] else 422
+    except InvalidImport as e:
+        return jsonify({'error': str(e)}), 422
+    except Exception as e:
+        print(f"Import donations error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 # Get user donations
 @app.route('/api/donations/user', methods=['GET'])
 @jwt_required()
 def get_user_donations():
     try:
         user_id = get_jwt_identity()
-        donations = list(mongo.db.donations.find({'donor_id': ObjectId(user_id)}))
-        
-        # Serialize donations
-        serialized_donations = []
-        for donation in donations:
-            donation['_id'] = str(donation['_id'])
-            donation['campaign_id'] = str(donation['campaign_id'])
-            donation['donor_id'] = str(donation['donor_id'])
-            donation['created_at'] = donation['created_at'].isostring()
-            serialized_donations.append(donation)
-        
-        return jsonify(serialized_donations), 200
+        donations = stream_collection(mongo.db.donations).find({'donor_id': ObjectId(user_id)},
+                                                               read_projection('donation'))
+        return stream_json_list(donations), 200
         
     except Exception as e:
         print(f"Get user donations error: {e}")
@@ -933,6 +1239,9 @@ def root():
         'status': 'running',
         'endpoints': {
             'health': '/api/health',
+            'liveness': '/api/health/live',
+            'readiness': '/api/health/ready',
+            'metrics': '/api/metrics',
             'auth': {
                 'signup': '/api/auth/signup',
                 'login': '/api/auth/login',
@@ -941,12 +1250,14 @@ def root():
             'campaigns': {
                 'create': '/api/campaigns (POST)',
                 'user_campaigns': '/api/campaigns (GET)',
-                'all_campaigns': '/api/campaigns/all (GET)',
+                'all_campaigns': '/api/campaigns/all (GET, ?limit=&cursor=)',
                 'get_campaign': '/api/campaigns/<id> (GET)',
                 'update_campaign': '/api/campaigns/<id> (PUT)',
                 'delete_campaign': '/api/campaigns/<id> (DELETE)',
                 'donate': '/api/campaigns/<id>/donate (POST)',
                 'donations': '/api/campaigns/<id>/donations (GET)',
+                'export_donations': '/api/campaigns/<id>/donations/export (GET, ?format=ndjson|csv&from=&to=)',
+                'import_donations': '/api/donations/import (POST, JSON array or CSV)',
                 'upi_payment': '/api/campaigns/<id>/upi-payment (POST)',
                 'stats': '/api/campaigns/<id>/donation-stats (GET)'
             },
@@ -970,6 +1281,8 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+startup.mark('app_loaded')
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_ENV') != 'production')
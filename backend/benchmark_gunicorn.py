@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Compare gunicorn worker profiles (see gunicorn.conf.py) under load.
+
+Starts `gunicorn -c gunicorn.conf.py app_production:app` once per profile,
+drives it with concurrent HTTP clients for a fixed time and prints the
+throughput and latency percentiles of each.
+
+Usage:
+    python benchmark_gunicorn.py
+    python benchmark_gunicorn.py --profiles sync,gthread --path /api/campaigns/all \\
+        --concurrency 64 --duration 20
+
+The default path (/api/health/live) never touches MongoDB, so it measures
+the server itself. Point --path at a MongoDB-backed route with MONGO_URI
+set to a real cluster to see how each profile copes with I/O-bound requests.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_load(url, concurrency, duration):
+    """Hit url from `concurrency` threads for `duration` seconds"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(url, timeout=30).read()
+                local.append(time.perf_counter() - start)
+            except Exception:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000
+    }
+
+
+def benchmark_profile(profile, args):
+    env = dict(os.environ, GUNICORN_PROFILE=profile, PORT=str(args.port),
+               REQUEST_LOG='off', GUNICORN_LOG_LEVEL='warning')
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app_production:app'],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f'http://127.0.0.1:{args.port}'
+        if not wait_until_up(base + '/api/health/live'):
+            print(f"❌ {profile}: server did not start")
+            return None
+        run_load(base + args.path, args.concurrency, min(args.duration, 2))  # warm-up
+        return run_load(base + args.path, args.concurrency, args.duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='sync,gthread,gevent')
+    parser.add_argument('--path', default='/api/health/live')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, help='Override WEB_CONCURRENCY for every profile')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    print(f"🏁 {args.path}, {args.concurrency} clients, {args.duration}s per profile")
+    print(f"{'profile':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for profile in args.profiles.split(','):
+        result = benchmark_profile(profile.strip(), args)
+        if result:
+            print(f"{profile:<10}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+                  f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Serialization cost of a campaign list response, before and after
+json_provider.py.
+
+Builds N campaign documents shaped like the ones MongoDB returns (ObjectIds,
+datetimes, recent_donations, campaign_stats) and times turning the list
+into a response body, with the peak memory that took on top of the
+documents themselves:
+
+    bson + convert    the old path: serialize_campaign's str()/isoformat()
+                      pass, then flask_pymongo's BSONProvider (bson.json_util)
+    json + convert    the same pass, then the standard library json module
+    provider          MongoJSONProvider on the raw documents (orjson when
+                      installed, else json; no conversion pass)
+    streamed          the provider in STREAM_BATCH_SIZE batches, as
+                      streaming.py sends list responses; chunks are
+                      discarded as a server would after writing them
+
+Usage:
+    python benchmark_json.py
+    python benchmark_json.py --campaigns 5000 --repeat 20
+
+Doesn't need MongoDB.
+"""
+import argparse
+import copy
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask_pymongo.helpers import BSONProvider
+
+from json_provider import HAS_ORJSON, MongoJSONProvider
+from streaming import STREAM_BATCH_SIZE, json_array_chunks
+
+
+def make_campaigns(count, seed=7):
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    campaigns = []
+    for i in range(count):
+        created_at = now - timedelta(days=rng.randint(0, 365), milliseconds=rng.randint(0, 86400000))
+        campaigns.append({
+            '_id': ObjectId(),
+            'title': f'Campaign {i}',
+            'description': 'Help us reach our goal for the community ' * 4,
+            'category': rng.choice(['Education', 'Health', 'Environment', 'Community']),
+            'target_amount': float(rng.randint(1000, 100000)),
+            'raised_amount': float(rng.randint(0, 50000)),
+            'end_date': created_at + timedelta(days=60),
+            'created_by': ObjectId(),
+            'status': 'active',
+            'total_donations': rng.randint(0, 500),
+            'created_at': created_at,
+            'updated_at': created_at + timedelta(hours=rng.randint(0, 48)),
+            'recent_donations': [
+                {'donor_id': ObjectId(), 'amount': float(rng.randint(10, 1000)),
+                 'created_at': created_at + timedelta(hours=h)}
+                for h in range(5)
+            ],
+            'campaign_stats': {
+                'count': rng.randint(0, 500),
+                'total': float(rng.randint(0, 50000)),
+                'payment_methods': {'upi': {'count': 3, 'total': 1500.0}, 'online': {'count': 2, 'total': 300.0}}
+            }
+        })
+    return campaigns
+
+
+def convert(campaign):
+    """The per-document pass serialize_campaign used to make"""
+    campaign['_id'] = str(campaign['_id'])
+    if campaign.get('created_by'):
+        campaign['created_by'] = str(campaign['created_by'])
+    if campaign.get('created_at'):
+        campaign['created_at'] = campaign['created_at'].isoformat()
+    if campaign.get('updated_at'):
+        campaign['updated_at'] = campaign['updated_at'].isoformat()
+    if isinstance(campaign.get('end_date'), datetime):
+        campaign['end_date'] = campaign['end_date'].isoformat()
+    for donation in campaign.get('recent_donations', []):
+        donation['donor_id'] = str(donation['donor_id'])
+        donation['created_at'] = donation['created_at'].isoformat()
+    return campaign
+
+
+def stream(provider, documents):
+    """Total size of the streamed body; each chunk is dropped once counted"""
+    iterator = iter(documents)
+    size = 0
+    for chunk in json_array_chunks(iterator, next(iterator), provider.encode, STREAM_BATCH_SIZE):
+        size += len(chunk)
+    return size
+
+
+def time_best(function, campaigns, repeat):
+    """Best wall time of `repeat` runs; each run gets a fresh deep copy"""
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        documents = copy.deepcopy(campaigns)
+        start = time.perf_counter()
+        body = function(documents)
+        best = min(best, time.perf_counter() - start)
+        size = body if isinstance(body, int) else len(body)
+    return best, size
+
+
+def peak_memory(function, campaigns):
+    """Peak bytes allocated while building the body, documents excluded"""
+    documents = copy.deepcopy(campaigns)
+    tracemalloc.start()
+    function(documents)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--campaigns', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    bson_provider = BSONProvider(app)
+    provider = MongoJSONProvider(app)
+    campaigns = make_campaigns(args.campaigns)
+
+    variants = [
+        ('bson + convert', lambda docs: bson_provider.dumps([convert(c) for c in docs]).encode('utf-8')),
+        ('json + convert', lambda docs: json.dumps([convert(c) for c in docs]).encode('utf-8')),
+        (f"provider ({'orjson' if HAS_ORJSON else 'json'})", lambda docs: provider.encode(docs)),
+        ('streamed', lambda docs: stream(provider, docs)),
+    ]
+
+    print(f"🏁 {args.campaigns} campaigns, best of {args.repeat}")
+    print(f"{'variant':<20}{'ms':>10}{'us/doc':>10}{'KiB':>10}{'speedup':>10}{'peak KiB':>10}")
+    baseline = None
+    for name, function in variants:
+        seconds, size = time_best(function, campaigns, args.repeat)
+        baseline = baseline or seconds
+        peak = peak_memory(function, campaigns)
+        print(f"{name:<20}{seconds * 1000:>10.2f}{seconds * 1e6 / args.campaigns:>10.1f}"
+              f"{size / 1024:>10.1f}{baseline / seconds:>9.1f}x{peak / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Small in-process LRU + TTL object cache.
+
+Used in front of the single-document campaign and donation-request reads,
+which the Flutter app re-fetches on every screen refresh. Write helpers
+invalidate the affected entry; the TTL bounds staleness for writes made by
+other gunicorn workers, since each worker has its own cache.
+"""
+import copy
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = float(os.environ.get('OBJECT_CACHE_TTL', 30))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('OBJECT_CACHE_MAX_ENTRIES', 2048))
+DEFAULT_MAX_BYTES = int(os.environ.get('OBJECT_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+
+def approximate_size(value):
+    """Rough deep size of a serialized document, in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + approximate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += approximate_size(item)
+    return size
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and a memory cap"""
+
+    def __init__(self, name, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return a copy of the cached value, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers (and serializers) mutate what they get back, including
+            # nested values such as recent_donations
+            return copy.deepcopy(value)
+
+    def set(self, key, value):
+        """Cache a copy of value; oversized values are not cached"""
+        if self.ttl <= 0 or value is None:
+            return
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, copy.deepcopy(value))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop one entry after the underlying document changed"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for the health/metrics endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+def apply_projection(document, projection):
+    """Filter a cached full document down to a `fields=` projection"""
+    if not projection or document is None:
+        return document
+    return {key: value for key, value in document.items()
+            if key == '_id' or key in projection}
@@ -0,0 +1,89 @@
+"""
+Conditional GET support (ETag / If-None-Match / Last-Modified).
+
+Single documents get a strong ETag built from `_id` + `updated_at`.
+List endpoints use a per-collection version counter stored in the
+`collection_versions` collection: every write bumps it, so a poll with a
+matching If-None-Match is answered with 304 without running the list query.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from flask import make_response, request
+from pymongo import WriteConcern
+
+VERSIONS_COLLECTION = 'collection_versions'
+
+
+def make_etag(*parts):
+    """Hash the given parts plus the query string into an ETag value.
+
+    The query string is included because `fields=`, `limit=` and `cursor=`
+    change the representation.
+    """
+    digest = hashlib.sha1()
+    for part in parts + (request.query_string,):
+        if isinstance(part, datetime):
+            # Documents reach here unconverted; keep the ETag of the ISO string
+            part = part.isoformat()
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def document_validators(document):
+    """Return (etag, last_modified) for a serialized document"""
+    updated_at = document.get('updated_at')
+    last_modified = None
+    if isinstance(updated_at, str):
+        last_modified = datetime.fromisoformat(updated_at)
+    elif isinstance(updated_at, datetime):
+        last_modified = updated_at
+    return make_etag(document.get('_id'), updated_at), last_modified
+
+
+def get_list_version(db, name):
+    """Return (version, updated_at) for a collection's list representation"""
+    doc = db[VERSIONS_COLLECTION].find_one({'_id': name})
+    if not doc:
+        return 0, None
+    return doc.get('version', 0), doc.get('updated_at')
+
+
+def bump_list_version(db, name):
+    """Record that a document in `name` changed.
+
+    Sent unacknowledged (w=0) so it doesn't add a round trip to every write;
+    the worst case is one poll answered with a stale 304.
+    """
+    versions = db.get_collection(VERSIONS_COLLECTION, write_concern=WriteConcern(w=0))
+    versions.update_one(
+        {'_id': name},
+        {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def is_not_modified(etag, last_modified=None):
+    """Check the request's validators; If-None-Match wins over If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have one second resolution and our datetimes are naive UTC
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and ask clients to revalidate every time"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    """Empty 304 carrying the same validators as the full response"""
+    return with_validators(make_response('', 304), etag, last_modified)
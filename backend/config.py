@@ -1,27 +1,75 @@
+import importlib.util
 import os
 from datetime import timedelta
 
+from dotenv import load_dotenv
+
+# Config classes read the environment at import time, so load .env first
+load_dotenv()
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration value is invalid"""
+
+
+def _env(name, default, cast=int):
+    """Read an environment override; an empty value means "use the default"."""
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    if value.lower() == 'none':
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ConfigError(f'{name} has an invalid value: {value!r}')
+
+
 class Config:
     """Base configuration class"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-this-in-production'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'your-jwt-secret-key-change-this-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
-    
+
     # MongoDB configuration
     MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://localhost:27017/connect_contribute'
-    
+
+    # MongoDB client tuning. Every value can be overridden by the environment
+    # variable of the same name; timeouts are in milliseconds, None means the
+    # driver default (no limit for the socket and wait queue timeouts).
+    MONGO_MAX_POOL_SIZE = _env('MONGO_MAX_POOL_SIZE', 100)
+    MONGO_MIN_POOL_SIZE = _env('MONGO_MIN_POOL_SIZE', 0)
+    MONGO_MAX_IDLE_TIME_MS = _env('MONGO_MAX_IDLE_TIME_MS', None)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _env('MONGO_WAIT_QUEUE_TIMEOUT_MS', None)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000)
+    MONGO_CONNECT_TIMEOUT_MS = _env('MONGO_CONNECT_TIMEOUT_MS', 20000)
+    MONGO_SOCKET_TIMEOUT_MS = _env('MONGO_SOCKET_TIMEOUT_MS', None)
+    MONGO_COMPRESSORS = _env('MONGO_COMPRESSORS', '', str)
+    MONGO_READ_CONCERN = _env('MONGO_READ_CONCERN', None, str)
+    MONGO_WRITE_CONCERN = _env('MONGO_WRITE_CONCERN', None, str)
+    MONGO_RETRY_WRITES = _env('MONGO_RETRY_WRITES', True, lambda value: value.lower() in ('1', 'true', 'on', 'yes'))
+
     # CORS settings
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']  # Add your Flutter app URL
-    
+
     # Security settings
     JWT_TOKEN_LOCATION = ['headers']
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
 
+    # Reverse proxies in front of the app whose X-Forwarded-For entries the
+    # auth rate limiter trusts for the client IP (see rate_limit.py)
+    RATE_LIMIT_PROXY_HOPS = _env('RATE_LIMIT_PROXY_HOPS', 0)
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
-    MONGO_URI = 'mongodb://localhost:27017/connect_contribute_dev'
+    MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://localhost:27017/connect_contribute_dev'
+
+    # One developer, one process: a small pool, and fail fast when the
+    # local server isn't running
+    MONGO_MAX_POOL_SIZE = _env('MONGO_MAX_POOL_SIZE', 10)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -31,10 +79,31 @@ class ProductionConfig(Config):
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     MONGO_URI = os.environ.get('MONGO_URI')
 
+    # Sized for a few gunicorn workers sharing an Atlas connection limit:
+    # keep a few warm connections, recycle idle ones, and fail a request
+    # quickly instead of queueing it behind a saturated pool
+    MONGO_MAX_POOL_SIZE = _env('MONGO_MAX_POOL_SIZE', 50)
+    MONGO_MIN_POOL_SIZE = _env('MONGO_MIN_POOL_SIZE', 5)
+    MONGO_MAX_IDLE_TIME_MS = _env('MONGO_MAX_IDLE_TIME_MS', 300000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _env('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)
+    MONGO_CONNECT_TIMEOUT_MS = _env('MONGO_CONNECT_TIMEOUT_MS', 10000)
+    MONGO_SOCKET_TIMEOUT_MS = _env('MONGO_SOCKET_TIMEOUT_MS', 20000)
+    MONGO_COMPRESSORS = _env('MONGO_COMPRESSORS', 'zstd,snappy,zlib', str)
+    MONGO_READ_CONCERN = _env('MONGO_READ_CONCERN', 'majority', str)
+    MONGO_WRITE_CONCERN = _env('MONGO_WRITE_CONCERN', 'majority', str)
+
+    # Render (and Railway) put one router in front of the app: without
+    # trusting its X-Forwarded-For entry every client shares the router's IP
+    # bucket. Set 0 when the app is reached directly.
+    RATE_LIMIT_PROXY_HOPS = _env('RATE_LIMIT_PROXY_HOPS', 1)
+
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     MONGO_URI = 'mongodb://localhost:27017/connect_contribute_test'
+    MONGO_MAX_POOL_SIZE = _env('MONGO_MAX_POOL_SIZE', 5)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000)
 
 # Configuration dictionary
 config = {
@@ -42,4 +111,132 @@ config = {
     'production': ProductionConfig,
     'testing': TestingConfig,
     'default': DevelopmentConfig
-} 
\ No newline at end of file
+}
+
+# Wire compressors pymongo supports, and the module each one needs
+COMPRESSOR_MODULES = {'zlib': 'zlib', 'snappy': 'snappy', 'zstd': 'zstandard'}
+READ_CONCERN_LEVELS = {'local', 'available', 'majority', 'linearizable', 'snapshot'}
+
+# Settings that must be positive or zero when set
+MONGO_TIMEOUT_SETTINGS = (
+    'MONGO_MAX_IDLE_TIME_MS', 'MONGO_WAIT_QUEUE_TIMEOUT_MS', 'MONGO_SERVER_SELECTION_TIMEOUT_MS',
+    'MONGO_CONNECT_TIMEOUT_MS', 'MONGO_SOCKET_TIMEOUT_MS'
+)
+
+
+def available_compressors(names):
+    """Keep the requested compressors whose Python module is installed.
+
+    Production asks for zstd/snappy first but they need optional packages;
+    zlib is always available.
+    """
+    return [name for name in names if importlib.util.find_spec(COMPRESSOR_MODULES[name])]
+
+
+def configured_compressors(settings):
+    """The MONGO_COMPRESSORS the client is given: requested and installed"""
+    return available_compressors(
+        [name.strip() for name in (settings['MONGO_COMPRESSORS'] or '').split(',') if name.strip()]
+    )
+
+
+def validate_config(settings):
+    """Check the MongoDB client settings; raises ConfigError"""
+    max_pool = settings['MONGO_MAX_POOL_SIZE']
+    min_pool = settings['MONGO_MIN_POOL_SIZE']
+    if not isinstance(max_pool, int) or max_pool < 1:
+        raise ConfigError(f'MONGO_MAX_POOL_SIZE must be a positive integer, got {max_pool!r}')
+    if not isinstance(min_pool, int) or min_pool < 0 or min_pool > max_pool:
+        raise ConfigError(f'MONGO_MIN_POOL_SIZE must be between 0 and MONGO_MAX_POOL_SIZE ({max_pool}), got {min_pool!r}')
+    for name in MONGO_TIMEOUT_SETTINGS:
+        value = settings[name]
+        if value is not None and (not isinstance(value, int) or value < 0):
+            raise ConfigError(f'{name} must be a non-negative integer (milliseconds), got {value!r}')
+
+    compressors = [name.strip() for name in (settings['MONGO_COMPRESSORS'] or '').split(',') if name.strip()]
+    unknown = [name for name in compressors if name not in COMPRESSOR_MODULES]
+    if unknown:
+        raise ConfigError(f"Unknown MONGO_COMPRESSORS: {', '.join(unknown)} "
+                          f"(supported: {', '.join(COMPRESSOR_MODULES)})")
+
+    read_concern = settings['MONGO_READ_CONCERN']
+    if read_concern is not None and read_concern not in READ_CONCERN_LEVELS:
+        raise ConfigError(f"MONGO_READ_CONCERN must be one of {', '.join(sorted(READ_CONCERN_LEVELS))}, got {read_concern!r}")
+
+    write_concern = settings['MONGO_WRITE_CONCERN']
+    if write_concern is not None and write_concern != 'majority':
+        if not write_concern.isdigit():
+            raise ConfigError(f"MONGO_WRITE_CONCERN must be 'majority' or a number of nodes, got {write_concern!r}")
+
+
+def selected_config(default='development'):
+    """The (name, class) picked by APP_CONFIG, then FLASK_ENV, then default"""
+    name = os.environ.get('APP_CONFIG') or os.environ.get('FLASK_ENV') or default
+    if name not in config:
+        raise ConfigError(f"Unknown configuration '{name}' (expected one of {', '.join(config)})")
+    return name, config[name]
+
+
+def load_config(app, default='development'):
+    """Apply the config class for APP_CONFIG (or FLASK_ENV) to app and validate it.
+
+    Returns the config name that was used.
+    """
+    name, config_class = selected_config(default)
+    app.config.from_object(config_class)
+
+    # ProductionConfig leaves these to the environment; keep the apps
+    # booting with the base defaults when they are missing
+    for key in ('SECRET_KEY', 'JWT_SECRET_KEY', 'MONGO_URI'):
+        if not app.config.get(key):
+            print(f"⚠️ {key} is not set; falling back to the default")
+            app.config[key] = getattr(Config, key)
+
+    validate_config(app.config)
+    return name
+
+
+def mongo_client_options(settings):
+    """MongoClient keyword arguments for the configured tuning"""
+    options = {
+        'maxPoolSize': settings['MONGO_MAX_POOL_SIZE'],
+        'minPoolSize': settings['MONGO_MIN_POOL_SIZE'],
+        'maxIdleTimeMS': settings['MONGO_MAX_IDLE_TIME_MS'],
+        'waitQueueTimeoutMS': settings['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        'serverSelectionTimeoutMS': settings['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        'connectTimeoutMS': settings['MONGO_CONNECT_TIMEOUT_MS'],
+        'socketTimeoutMS': settings['MONGO_SOCKET_TIMEOUT_MS'],
+        'retryWrites': settings['MONGO_RETRY_WRITES']
+    }
+    compressors = configured_compressors(settings)
+    if compressors:
+        options['compressors'] = ','.join(compressors)
+    if settings['MONGO_READ_CONCERN']:
+        options['readConcernLevel'] = settings['MONGO_READ_CONCERN']
+    write_concern = settings['MONGO_WRITE_CONCERN']
+    if write_concern:
+        options['w'] = int(write_concern) if write_concern.isdigit() else write_concern
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def effective_client_settings(client, settings):
+    """The settings the MongoClient actually runs with (URI options included).
+
+    pymongo has no public accessor for the compressors, so those are the
+    configured ones (configured_compressors).
+    """
+    options = client.options
+    pool = options.pool_options
+    return {
+        'max_pool_size': pool.max_pool_size,
+        'min_pool_size': pool.min_pool_size,
+        'max_idle_time_seconds': pool.max_idle_time_seconds,
+        'wait_queue_timeout_seconds': pool.wait_queue_timeout,
+        'connect_timeout_seconds': pool.connect_timeout,
+        'socket_timeout_seconds': pool.socket_timeout,
+        'server_selection_timeout_seconds': options.server_selection_timeout,
+        'compressors': configured_compressors(settings),
+        'read_concern': options.read_concern.level,
+        'write_concern': options.write_concern.document,
+        'retry_writes': options.retry_writes
+    }
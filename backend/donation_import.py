@@ -0,0 +1,254 @@
+"""
+Bulk import of offline (cash, cheque, event) donations.
+
+Entering event donations one at a time through
+POST /api/campaigns/<id>/donations costs a campaign update and an insert
+per donation. `import_donations` takes a whole sheet instead:
+
+    1. validate every row in one pass: campaign_id and amount > 0 are
+       required; donor_name, donor_email, donor_phone, payment_method
+       (default cash), transaction_id, message and an ISO donated_at
+       are optional;
+    2. check in one query that the importer created every campaign named;
+    3. insert the valid rows with one insert_many(ordered=False), so a bad
+       row (e.g. a duplicate transaction_id) doesn't stop the rest;
+    4. apply one combined update per campaign in a single unordered
+       bulk_write: $inc raised_amount/total_donations, campaign_stats
+       (add_donations_to_stats) and the newest rows pushed onto
+       recent_donations. With DONATION_TRANSACTIONS enabled the updates
+       run in one transaction (transactions.py).
+
+If a campaign's update fails, that campaign's imported donations are
+deleted again and its rows are reported as failed (the same compensation
+create_donation uses without a transaction). Updates that were applied
+stand, so only the failed campaigns are taken out: the write errors of
+the unordered bulk_write say which ones. Every imported row carries
+`import_id`, so an import can be found or undone later.
+
+Rows arrive as a JSON array (or {"donations": [...]}) or as CSV with a
+header row; `parse_import` handles both.
+
+Configuration (environment):
+    IMPORT_MAX_ROWS       rows accepted per request (default 10000)
+"""
+import csv
+import io
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from donation_stats import add_donations_to_stats
+from recent_donations import RECENT_DONATIONS_LIMIT, recent_donations_push
+from transactions import run_write, transactions_enabled
+
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 10000))
+DEFAULT_PAYMENT_METHOD = 'cash'
+
+
+class InvalidImport(ValueError):
+    """Raised when the upload as a whole can't be read or is too large"""
+
+
+def parse_import(body, content_type, filename=None):
+    """Turn an uploaded JSON array or CSV sheet into a list of row dicts"""
+    if not body:
+        raise InvalidImport('No donations to import')
+    if 'csv' in (content_type or '') or (filename or '').lower().endswith('.csv'):
+        text = body.decode('utf-8-sig') if isinstance(body, bytes) else body
+        rows = [
+            {key.strip(): value.strip() if isinstance(value, str) else value
+             for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise InvalidImport('Body must be a JSON array of donations or a CSV file')
+        if isinstance(rows, dict):
+            rows = rows.get('donations')
+        if not isinstance(rows, list):
+            raise InvalidImport('Body must be a JSON array of donations or a CSV file')
+    if not rows:
+        raise InvalidImport('No donations to import')
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise InvalidImport(f'At most {IMPORT_MAX_ROWS} donations can be imported at once, got {len(rows)}')
+    return rows
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def validate_row(row, importer_id, import_id, now):
+    """Build a donation document from a row; raises ValueError with the reason"""
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object')
+    campaign_id = row.get('campaign_id')
+    if _blank(campaign_id) or not ObjectId.is_valid(str(campaign_id)):
+        raise ValueError('Invalid or missing campaign_id')
+    try:
+        amount = float(row.get('amount'))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid or missing amount')
+    if not amount > 0:
+        raise ValueError('Amount must be positive')
+
+    created_at = now
+    if not _blank(row.get('donated_at')):
+        try:
+            created_at = datetime.fromisoformat(str(row['donated_at']).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Invalid donated_at date: {row['donated_at']}")
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def text(field, default=None):
+        value = row.get(field)
+        return default if _blank(value) else str(value).strip()
+
+    return {
+        'campaign_id': ObjectId(str(campaign_id)),
+        'donor_id': None,
+        'donor_name': text('donor_name', 'Anonymous'),
+        'donor_email': text('donor_email'),
+        'donor_phone': text('donor_phone'),
+        'amount': amount,
+        'payment_method': text('payment_method', DEFAULT_PAYMENT_METHOD),
+        'status': 'completed',
+        'transaction_id': text('transaction_id'),
+        'message': text('message'),
+        'is_anonymous': False,
+        'additional_info': {},
+        'source': 'import',
+        'import_id': import_id,
+        'imported_by': ObjectId(importer_id),
+        'created_at': created_at,
+        'updated_at': now
+    }
+
+
+def campaign_update(donations, now):
+    """One campaign update covering all of a campaign's imported donations"""
+    newest = sorted(donations, key=lambda d: d['created_at'], reverse=True)[:RECENT_DONATIONS_LIMIT]
+    return add_donations_to_stats({
+        '$inc': {
+            'raised_amount': sum(d['amount'] for d in donations),
+            'total_donations': len(donations)
+        },
+        '$set': {'updated_at': now},
+        '$push': {'recent_donations': recent_donations_push(*[
+            {'amount': d['amount'], 'donor_name': d['donor_name'], 'created_at': d['created_at']}
+            for d in newest
+        ])}
+    }, [(d['amount'], d['payment_method']) for d in donations])
+
+
+def apply_campaign_updates(db, import_id, by_campaign, now):
+    """Apply every campaign's counter update; returns the campaigns that failed.
+
+    The failed campaigns' donations from this import have been deleted.
+    Raises (with all of the import's donations deleted) when no update can
+    be known to have been applied.
+    """
+    campaign_ids = list(by_campaign)
+    requests = [UpdateOne({'_id': campaign_id}, campaign_update(by_campaign[campaign_id], now))
+                for campaign_id in campaign_ids]
+    in_transaction = transactions_enabled(db.client)
+    try:
+        run_write(db.client, lambda session: db.campaigns.bulk_write(requests, ordered=False, session=session))
+        return []
+    except BulkWriteError as e:
+        if in_transaction:
+            # The aborted transaction applied nothing
+            db.donations.delete_many({'import_id': import_id})
+            raise
+        failed = [campaign_ids[error['index']] for error in e.details.get('writeErrors', [])]
+        print(f"⚠️ Import {import_id}: counter update failed for {len(failed)} campaign(s)")
+        db.donations.delete_many({'import_id': import_id, 'campaign_id': {'$in': failed}})
+        return failed
+    except Exception:
+        # Nothing says which updates landed; the bulk_write is retried once
+        # by retryable writes, so treat it as not applied
+        db.donations.delete_many({'import_id': import_id})
+        raise
+
+
+def import_donations(db, rows, importer_id):
+    """Validate, insert and count a batch of offline donations.
+
+    Returns the per-row report; its `campaigns` are the ones whose counters
+    changed, for cache invalidation by the caller.
+    """
+    now = datetime.utcnow()
+    import_id = ObjectId()
+    results = [None] * len(rows)
+    pending = []  # (row index, donation)
+
+    for index, row in enumerate(rows):
+        try:
+            pending.append((index, validate_row(row, importer_id, import_id, now)))
+        except ValueError as e:
+            results[index] = {'row': index + 1, 'status': 'error', 'error': str(e)}
+
+    # Only the campaigns' creators may import into them
+    campaign_ids = list({donation['campaign_id'] for _, donation in pending})
+    owned = {
+        campaign['_id'] for campaign in db.campaigns.find(
+            {'_id': {'$in': campaign_ids}, 'created_by': ObjectId(importer_id)}, {'_id': 1}
+        )
+    } if campaign_ids else set()
+    valid = []
+    for index, donation in pending:
+        if donation['campaign_id'] in owned:
+            valid.append((index, donation))
+        else:
+            results[index] = {'row': index + 1, 'status': 'error',
+                              'error': 'Campaign not found or unauthorized'}
+
+    failed_inserts = {}
+    if valid:
+        try:
+            db.donations.insert_many([donation for _, donation in valid], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed_inserts[error['index']] = (
+                    'Duplicate transaction_id' if error.get('code') == 11000 else error.get('errmsg', 'Insert failed')
+                )
+
+    by_campaign = OrderedDict()
+    row_of = {}  # donation _id -> row index
+    for position, (index, donation) in enumerate(valid):
+        if position in failed_inserts:
+            results[index] = {'row': index + 1, 'status': 'error', 'error': failed_inserts[position]}
+            continue
+        # insert_many sets _id on each document, including after a partial failure
+        by_campaign.setdefault(donation['campaign_id'], []).append(donation)
+        row_of[donation['_id']] = index
+        results[index] = {'row': index + 1, 'status': 'imported', 'donation_id': donation['_id']}
+
+    if by_campaign:
+        for campaign_id in apply_campaign_updates(db, import_id, by_campaign, now):
+            # Deleted again: the campaign's counters don't include them
+            for donation in by_campaign.pop(campaign_id):
+                index = row_of[donation['_id']]
+                results[index] = {'row': index + 1, 'status': 'error', 'error': 'Campaign update failed'}
+
+    imported = sum(len(donations) for donations in by_campaign.values())
+    return {
+        'import_id': import_id,
+        'total': len(rows),
+        'imported': imported,
+        'failed': len(rows) - imported,
+        'campaigns': [
+            {'campaign_id': campaign_id, 'donations': len(donations),
+             'amount': sum(d['amount'] for d in donations)}
+            for campaign_id, donations in by_campaign.items()
+        ],
+        'rows': results
+    }
@@ -0,0 +1,290 @@
+"""
+Incrementally maintained per-campaign donation statistics.
+
+Each campaign document carries a small `campaign_stats` sub-document:
+
+    {'count': 12, 'sum': 5400.0, 'max': 2000.0, 'sum_squares': 8120000.0,
+     'payment_methods': {'UPI': 9, 'card': 3}}
+
+It is updated in the same campaign update that bumps raised_amount, so it is
+atomic with the counters and costs no extra round trip, and the
+/donation-stats endpoint answers from one small read instead of scanning
+every donation. `rebuild_donation_stats` recomputes it from the `donations`
+collection (`python manage.py rebuild-stats`).
+
+The totals are only complete when they started from a known state, so new
+campaigns get `new_campaign_stats()` and every rebuild stamps `rebuilt_at`.
+Campaigns created before campaign_stats existed have no stamp (a donation
+since then only $inc'd a partial sub-document). The release step runs
+`rebuild-stats --missing` to backfill them; until then `get_campaign_stats`
+answers for such a campaign with a read-only aggregation of its donations.
+
+A rebuild only overwrites a campaign's stats if its `campaign_stats.count`
+is still the one read before aggregating, so a donation counted meanwhile
+isn't lost; changed campaigns are aggregated again (REBUILD_ATTEMPTS).
+
+Stats for a date window can't come from the running totals; those use
+`aggregate_donation_stats`, a single $facet pass over the window's donations
+on the (campaign_id, created_at) index.
+"""
+import math
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+STATS_FIELD = 'campaign_stats'
+UNKNOWN_METHOD = 'unknown'
+REBUILD_ATTEMPTS = 3
+
+
+def payment_method_key(payment_method):
+    """Make a payment method safe to use as a MongoDB field name"""
+    if not payment_method:
+        return UNKNOWN_METHOD
+    key = str(payment_method).replace('.', '_').lstrip('$')
+    return key or UNKNOWN_METHOD
+
+
+def new_campaign_stats(now):
+    """campaign_stats for a campaign without donations, e.g. a new one"""
+    return {'count': 0, 'sum': 0.0, 'max': 0.0, 'sum_squares': 0.0, 'payment_methods': {},
+            'rebuilt_at': now}
+
+
+def stats_complete(stats):
+    """Whether a campaign_stats sub-document covers all of its donations"""
+    return bool(stats) and 'rebuilt_at' in stats
+
+
+def add_donation_to_stats(update, amount, payment_method):
+    """Merge the campaign_stats changes for one donation into a campaign update.
+
+    There is no reverse: $max can't be undone, so writers insert the
+    donation first and only then apply this update.
+    """
+    amount = float(amount)
+    inc = update.setdefault('$inc', {})
+    inc[f'{STATS_FIELD}.count'] = 1
+    inc[f'{STATS_FIELD}.sum'] = amount
+    inc[f'{STATS_FIELD}.sum_squares'] = amount * amount
+    inc[f'{STATS_FIELD}.payment_methods.{payment_method_key(payment_method)}'] = 1
+    update.setdefault('$max', {})[f'{STATS_FIELD}.max'] = amount
+    return update
+
+
+def add_donations_to_stats(update, donations):
+    """Merge the campaign_stats changes for many donations into one update.
+
+    donations is an iterable of (amount, payment_method); the result is the
+    same as applying add_donation_to_stats once per donation.
+    """
+    inc = update.setdefault('$inc', {})
+    highest = None
+    for amount, payment_method in donations:
+        amount = float(amount)
+        for field, value in (('count', 1), ('sum', amount), ('sum_squares', amount * amount),
+                             (f'payment_methods.{payment_method_key(payment_method)}', 1)):
+            key = f'{STATS_FIELD}.{field}'
+            inc[key] = inc.get(key, 0) + value
+        highest = amount if highest is None else max(highest, amount)
+    if highest is not None:
+        update.setdefault('$max', {})[f'{STATS_FIELD}.max'] = highest
+    return update
+
+
+def format_donation_stats(stats):
+    """Turn a campaign_stats sub-document into the /donation-stats response"""
+    stats = stats or {}
+    count = stats.get('count', 0)
+    total = stats.get('sum', 0)
+    average = total / count if count else 0
+    variance = stats.get('sum_squares', 0) / count - average * average if count else 0
+    return {
+        'total_amount': total,
+        'total_donations': count,
+        'average_donation': round(average, 2),
+        'highest_donation': stats.get('max', 0),
+        'donation_stddev': round(math.sqrt(max(variance, 0)), 2),
+        'payment_methods': stats.get('payment_methods', {})
+    }
+
+
+class InvalidDateRange(ValueError):
+    """Raised for a malformed or inverted from/to window"""
+
+
+def parse_date_range(raw_from, raw_to):
+    """Parse ISO 8601 `from`/`to` query values into naive UTC datetimes.
+
+    The window is [from, to); either end may be omitted.
+    """
+    def parse(name, raw):
+        if not raw:
+            return None
+        try:
+            value = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+        except ValueError:
+            raise InvalidDateRange(f"Invalid '{name}' date: {raw}")
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    start = parse('from', raw_from)
+    end = parse('to', raw_to)
+    if start and end and start >= end:
+        raise InvalidDateRange("'from' must be before 'to'")
+    return start, end
+
+
+def aggregate_donation_stats(db, campaign_id, start=None, end=None):
+    """Compute stats for donations created in [start, end) in one aggregation.
+
+    The $facet returns the totals and one row per payment method, so the
+    worker only ever receives a handful of small documents.
+    """
+    match = {'campaign_id': campaign_id}
+    created_at = {}
+    if start:
+        created_at['$gte'] = start
+    if end:
+        created_at['$lt'] = end
+    if created_at:
+        match['created_at'] = created_at
+
+    pipeline = [
+        {'$match': match},
+        {'$project': {'_id': 0, 'amount': 1, 'payment_method': 1}},
+        {'$facet': {
+            'totals': [{'$group': {
+                '_id': None,
+                'count': {'$sum': 1},
+                'sum': {'$sum': '$amount'},
+                'max': {'$max': '$amount'},
+                'sum_squares': {'$sum': {'$multiply': ['$amount', '$amount']}}
+            }}],
+            'payment_methods': [{'$group': {
+                '_id': '$payment_method',
+                'count': {'$sum': 1}
+            }}]
+        }}
+    ]
+    result = next(db.donations.aggregate(pipeline), {})
+
+    totals = result.get('totals') or [{}]
+    stats = {key: totals[0].get(key) or 0 for key in ('count', 'sum', 'max', 'sum_squares')}
+    stats['payment_methods'] = {}
+    for row in result.get('payment_methods', []):
+        key = payment_method_key(row['_id'])
+        stats['payment_methods'][key] = stats['payment_methods'].get(key, 0) + row['count']
+    return format_donation_stats(stats)
+
+
+def get_campaign_stats(db, campaign_id):
+    """Read one campaign's stats; returns None if the campaign doesn't exist.
+
+    Stats that predate campaign_stats are aggregated from the donations
+    without being written back; `rebuild-stats --missing` stores them.
+    """
+    campaign = db.campaigns.find_one({'_id': campaign_id}, {STATS_FIELD: 1})
+    if campaign is None:
+        return None
+    stats = campaign.get(STATS_FIELD)
+    if not stats_complete(stats):
+        return aggregate_donation_stats(db, campaign_id)
+    return format_donation_stats(stats)
+
+
+def _stats_counts(db, campaign_ids=None):
+    """campaign_stats.count per campaign (None without stats)"""
+    query = {'_id': {'$in': campaign_ids}} if campaign_ids is not None else {}
+    return {
+        campaign['_id']: (campaign.get(STATS_FIELD) or {}).get('count')
+        for campaign in db.campaigns.find(query, {f'{STATS_FIELD}.count': 1})
+    }
+
+
+def _rebuild_once(db, counts, batch_size, all_donations=False):
+    """Aggregate and write the stats of the campaigns in counts.
+
+    Returns (campaigns written, ids of campaigns whose count changed since
+    counts was read and so were left alone).
+    """
+    match = {} if all_donations else {'campaign_id': {'$in': list(counts)}}
+    pipeline = [
+        {'$match': match},
+        {'$group': {
+            '_id': {'campaign_id': '$campaign_id', 'payment_method': '$payment_method'},
+            'count': {'$sum': 1},
+            'sum': {'$sum': '$amount'},
+            'max': {'$max': '$amount'},
+            'sum_squares': {'$sum': {'$multiply': ['$amount', '$amount']}}
+        }}
+    ]
+
+    # Stored with millisecond precision; matched again below
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    # Campaigns without donations get empty (but complete) stats
+    rebuilt = {campaign_id: new_campaign_stats(now) for campaign_id in counts}
+    # One row per (campaign, payment method): roll them up per campaign
+    for row in db.donations.aggregate(pipeline, allowDiskUse=True):
+        stats = rebuilt.get(row['_id']['campaign_id'])
+        if stats is None:
+            # Donations of a campaign that is gone
+            continue
+        stats['count'] += row['count']
+        stats['sum'] += row['sum'] or 0
+        stats['max'] = max(stats['max'], row['max'] or 0)
+        stats['sum_squares'] += row['sum_squares'] or 0
+        key = payment_method_key(row['_id']['payment_method'])
+        stats['payment_methods'][key] = stats['payment_methods'].get(key, 0) + row['count']
+
+    written = 0
+    changed = []
+    campaign_ids = list(rebuilt)
+    for offset in range(0, len(campaign_ids), batch_size):
+        batch = campaign_ids[offset:offset + batch_size]
+        # {count: None} also matches campaigns without stats
+        result = db.campaigns.bulk_write([
+            UpdateOne({'_id': campaign_id, f'{STATS_FIELD}.count': counts[campaign_id]},
+                      {'$set': {STATS_FIELD: rebuilt[campaign_id]}})
+            for campaign_id in batch
+        ], ordered=False)
+        written += result.matched_count
+        if result.matched_count < len(batch):
+            changed += [campaign['_id'] for campaign in db.campaigns.find(
+                {'_id': {'$in': batch}, f'{STATS_FIELD}.rebuilt_at': {'$ne': now}}, {'_id': 1}
+            )]
+    return written, changed
+
+
+def rebuild_donation_stats(db, campaign_id=None, batch_size=500, missing_only=False):
+    """Recompute campaign_stats from the donations collection.
+
+    Rebuilds every campaign, just campaign_id, or with missing_only the
+    campaigns whose stats were never rebuilt. A campaign that receives a
+    donation while it is being aggregated isn't overwritten but aggregated
+    again, up to REBUILD_ATTEMPTS times. Returns the number of campaigns
+    written.
+    """
+    if campaign_id:
+        campaign_ids = [campaign_id]
+    elif missing_only:
+        campaign_ids = [campaign['_id'] for campaign in db.campaigns.find(
+            {f'{STATS_FIELD}.rebuilt_at': {'$exists': False}}, {'_id': 1}
+        )]
+        if not campaign_ids:
+            return 0
+    else:
+        campaign_ids = None
+
+    written = 0
+    for _ in range(REBUILD_ATTEMPTS):
+        counts = _stats_counts(db, campaign_ids)
+        done, changed = _rebuild_once(db, counts, batch_size, all_donations=campaign_ids is None)
+        written += done
+        if not changed:
+            return written
+        campaign_ids = changed
+    print(f"⚠️ {len(changed)} campaign(s) kept receiving donations during the stats rebuild; run it again")
+    return written
@@ -0,0 +1,139 @@
+"""
+Gunicorn configuration for the production API.
+
+    gunicorn -c gunicorn.conf.py app_production:app
+
+GUNICORN_PROFILE picks the worker model:
+    sync     one request per worker process; workers = 2 x CPU + 1
+    gthread  (default) a thread pool per worker, so a slow MongoDB query
+             only ties up one thread; workers = CPU + 1, GUNICORN_THREADS each
+    gevent   cooperative greenlets, many concurrent requests per worker;
+             needs the gevent package, falls back to gthread without it
+
+Sizes come from serve.server_sizing() and can be pinned with
+WEB_CONCURRENCY (workers), GUNICORN_THREADS and GUNICORN_WORKER_CONNECTIONS.
+Threads (or gevent worker connections) per worker are capped by the
+worker's own MongoDB pool (MONGO_MAX_POOL_SIZE of the app's config), so a
+request never waits on the driver for a connection. `python serve.py`
+starts gunicorn with this file too.
+
+Workers are recycled after GUNICORN_MAX_REQUESTS requests (with jitter so
+they don't all restart together). The app is preloaded in the master and
+each worker creates its own MongoClient after fork.
+"""
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import sys
+
+# Let this file import serve/server_stats wherever gunicorn is started from
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+cpu_count = multiprocessing.cpu_count()
+app_module = os.environ.get('APP_MODULE', 'app_production')
+
+profile = os.environ.get('GUNICORN_PROFILE', 'gthread').lower()
+if profile not in ('sync', 'gthread', 'gevent'):
+    raise ValueError(f"GUNICORN_PROFILE must be sync, gthread or gevent, got {profile!r}")
+if profile == 'gevent' and importlib.util.find_spec('gevent') is None:
+    print("⚠️ gevent is not installed; using the gthread profile")
+    profile = 'gthread'
+if profile == 'gevent':
+    # Patch before the app (and pymongo) is preloaded, not in the worker
+    from gevent import monkey
+    monkey.patch_all()
+
+# prometheus_client multiprocess mode needs the directory before the app loads
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+bind = f"{os.environ.get('GUNICORN_BIND_HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+backlog = int(os.environ.get('GUNICORN_BACKLOG', 2048))
+
+# Imported after any gevent monkey-patching above
+from serve import server_sizing  # noqa: E402
+
+sizing = server_sizing('gunicorn', profile, app_module=app_module, cpu_count=cpu_count)
+worker_class = profile
+workers = sizing['workers']
+if profile == 'gthread':
+    threads = sizing['threads']
+elif profile == 'gevent':
+    worker_connections = sizing['worker_connections']
+
+# Load the app once in the master; workers fork from it
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'on', 'yes')
+
+# Recycle workers to bound memory growth; jitter staggers the restarts
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = None  # request_log.py already logs requests
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def _app_module(server):
+    """The module that defines the WSGI app (e.g. app_production)"""
+    return sys.modules.get(server.app.wsgi().import_name)
+
+
+def on_starting(server):
+    # Start each deploy with an empty prometheus_client multiprocess directory
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+    server.log.info(
+        "Profile %s: %s worker(s), worker_class=%s, threads=%s, worker_connections=%s, "
+        "max_requests=%s (+/-%s), preload_app=%s",
+        profile, workers, worker_class, globals().get('threads', 1),
+        globals().get('worker_connections', '-'), max_requests, max_requests_jitter, preload_app
+    )
+    if sizing['capped']:
+        server.log.warning("Per-worker concurrency capped to fit a MongoDB pool of %s connection(s)",
+                           sizing['mongo_max_pool_size'])
+
+
+def post_fork(server, worker):
+    # The preloaded app's MongoClient was created in the master; give this
+    # worker its own (without preload the worker imports the app itself)
+    if server.cfg.preload_app:
+        module = _app_module(server)
+        if module is not None and hasattr(module, 'init_mongo'):
+            module.init_mongo()
+
+
+def post_worker_init(worker):
+    # Report this worker's queues in /api/health
+    from server_stats import SERVER_STATS
+    SERVER_STATS.attach_gunicorn_worker(worker, sizing)
+
+    # Start warm-up (pool + caches) now instead of on the first request
+    module = sys.modules.get(worker.wsgi.import_name)
+    startup = getattr(module, 'startup', None)
+    if startup is not None:
+        startup.start()
+    worker.log.info("Worker %s ready", worker.pid)
+
+
+def worker_exit(server, worker):
+    # Covers max_requests recycling as well as shutdowns
+    worker.log.info("Worker %s exiting after serving %s request(s)",
+                    worker.pid, getattr(worker, 'nr', 'unknown'))
+
+
+def worker_abort(worker):
+    worker.log.warning("Worker %s aborted (timeout after %ss)", worker.pid, timeout)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live metrics files in multiprocess mode
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from metrics import mark_process_dead
+        mark_process_dead(worker.pid)
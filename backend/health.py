@@ -0,0 +1,187 @@
+"""
+Cached liveness/readiness probes.
+
+A background thread pings MongoDB every HEALTH_PROBE_INTERVAL seconds and
+caches the result, so health endpoints answer from memory instead of adding
+a database round trip (and hanging on a slow cluster) per monitor hit.
+
+    /api/health/live   the process is up and serving requests; never touches MongoDB
+    /api/health/ready  the last probe succeeded and is recent; 503 otherwise
+
+When given a `startup.Startup`, readiness also waits for warm-up to finish.
+
+`POOL_LISTENER` is a pymongo ConnectionPoolListener (pass it to PyMongo's
+event_listeners) that tracks connections in use and waiting checkouts, so
+readiness also reports pool saturation.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from pymongo import monitoring
+
+HEALTH_PROBE_INTERVAL = float(os.environ.get('HEALTH_PROBE_INTERVAL', 10))
+
+# A probe older than this many intervals counts as failed
+STALE_AFTER_INTERVALS = 3
+
+# How long a new worker's first status() call waits for the first probe
+FIRST_PROBE_WAIT = 2
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Counts open, in-use and waiting connections across all servers"""
+
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+        self._lock = threading.Lock()
+
+    def _add(self, attribute, delta):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + delta)
+
+    def connection_created(self, event):
+        self._add('open', 1)
+
+    def connection_closed(self, event):
+        self._add('open', -1)
+
+    def connection_check_out_started(self, event):
+        self._add('waiting', 1)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        self._add('in_use', -1)
+
+    def pool_cleared(self, event):
+        self._add('pool_clears', 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def stats(self, max_pool_size=None):
+        with self._lock:
+            stats = {
+                'open': self.open,
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears
+            }
+        if max_pool_size:
+            stats['max_pool_size'] = max_pool_size
+            stats['saturation'] = round(stats['in_use'] / max_pool_size, 4)
+        return stats
+
+
+POOL_LISTENER = PoolListener()
+
+
+class HealthProbe:
+    """Pings MongoDB in the background and caches the outcome"""
+
+    def __init__(self, client, interval=HEALTH_PROBE_INTERVAL, pool_listener=POOL_LISTENER,
+                 startup=None):
+        self.client = client
+        self.interval = interval
+        self.pool_listener = pool_listener
+        self.startup = startup
+        self.ok = False
+        self.latency_ms = None
+        self.checked_at = None
+        self.checked_monotonic = None
+        self.error = None
+        self.consecutive_failures = 0
+        self._probed = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def probe(self):
+        """Ping once and record the result"""
+        start = time.perf_counter()
+        try:
+            if self.client is None:
+                raise RuntimeError('MongoDB client not created yet')
+            self.client.admin.command('ping')
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        with self._lock:
+            self.ok = ok
+            self.error = error
+            self.latency_ms = latency_ms
+            self.checked_at = datetime.utcnow()
+            self.checked_monotonic = time.monotonic()
+            self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+        self._probed.set()
+        return ok
+
+    def _run(self):
+        while True:
+            self.probe()
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start the probe thread in this process (lazily, after any fork)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._probed.clear()
+        threading.Thread(target=self._run, name='health-probe', daemon=True).start()
+
+    def status(self):
+        """The cached readiness status.
+
+        Only a worker's first call blocks, for at most FIRST_PROBE_WAIT
+        seconds, so it can answer with a real result.
+        """
+        if self._pid != os.getpid():
+            self.start()
+        if self.startup is not None:
+            self.startup.start()
+        self._probed.wait(FIRST_PROBE_WAIT)
+        with self._lock:
+            age = time.monotonic() - self.checked_monotonic if self.checked_monotonic else None
+            connected = self.ok and age is not None and age < self.interval * STALE_AFTER_INTERVALS
+            warm = self.startup is None or self.startup.done
+            status = {
+                'ready': connected and warm,
+                'database': 'connected' if connected else 'unavailable',
+                'probe_latency_ms': self.latency_ms,
+                'probe_age_seconds': round(age, 2) if age is not None else None,
+                'checked_at': self.checked_at.isoformat() if self.checked_at else None,
+                'consecutive_failures': self.consecutive_failures,
+                'probe_interval_seconds': self.interval
+            }
+            if self.error:
+                status['error'] = self.error
+        if self.client is not None:
+            status['pool'] = self.pool_listener.stats(self.client.options.pool_options.max_pool_size)
+        if self.startup is not None:
+            status['startup'] = self.startup.status()
+        return status
@@ -0,0 +1,232 @@
+"""
+Idempotent donation and payment writes.
+
+The Flutter app retries POSTs on flaky mobile networks, and every retry of
+a donation or payment used to insert another record and bump raised_amount
+again. A client that sends an `Idempotency-Key` header (any unique string
+per logical payment, e.g. a UUID made when the user taps "Donate") gets
+exactly one write per key:
+
+    first request     claims the key in the idempotency_keys collection,
+                      runs the view and stores its status and body
+    same key again    the stored response is replayed with
+                      `Idempotent-Replayed: true`; the view doesn't run, so
+                      the campaign counters aren't touched
+    still running     409 with Retry-After while the first request is in
+                      flight
+    different body    422: a key belongs to one request
+
+Keys are scoped per user and route, and hashed before they are stored.
+5xx responses aren't stored (the claim is released so the client can
+retry). Stored responses expire through the TTL index on expires_at.
+
+The hashed key is also written into the donation or payment record itself
+(`stamp_idempotency_key`), where a unique index on idempotency_key allows
+one record per key. That is what makes a claim safe to take over after
+IDEMPOTENCY_LOCK_SECONDS: the first request may have died, but it may also
+still be running, or have written its record and then failed to store its
+response. The re-run then can't insert a second record; it gets the
+route's "already recorded" 409, which is stored and replayed from then on.
+
+Retries without a key are caught by the unique transaction_id indexes on
+donations and payments (indexes.py); `new_transaction_id` makes ids that
+don't collide for those the server generates.
+
+Configuration (environment):
+    IDEMPOTENCY_TTL           seconds a response is replayable (default 86400)
+    IDEMPOTENCY_LOCK_SECONDS  seconds before an unfinished claim can be
+                              taken over and re-run (default 30)
+"""
+import hashlib
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from pymongo.errors import DuplicateKeyError
+
+from metrics import IDEMPOTENCY_REQUESTS
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 30))
+MAX_KEY_LENGTH = 255
+
+
+def new_transaction_id(prefix):
+    """A server-generated transaction id, unique even within one second"""
+    return f"{prefix}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:12]}"
+
+
+def stamp_idempotency_key(record):
+    """Add the current request's hashed Idempotency-Key to a record to insert"""
+    key_id = g.get('idempotency_key')
+    if key_id:
+        record['idempotency_key'] = key_id
+    return record
+
+
+class KeyInProgress(Exception):
+    """The key's first request hasn't finished yet"""
+
+
+class KeyReused(Exception):
+    """The key was already used for a different request"""
+
+
+class IdempotencyStore:
+    """Claims and stored responses in the idempotency_keys collection"""
+
+    def __init__(self, collection, ttl=IDEMPOTENCY_TTL, lock_seconds=IDEMPOTENCY_LOCK_SECONDS):
+        # collection: a callable returning the pymongo collection, since the
+        # production app recreates its MongoClient after fork
+        self.collection = collection
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+
+    def claim(self, key_id, fingerprint, retry=True):
+        """Claim key_id; returns the stored record to replay, or None if claimed"""
+        now = datetime.utcnow()
+        try:
+            self.collection().insert_one({
+                '_id': key_id,
+                'state': 'processing',
+                'fingerprint': fingerprint,
+                'locked_until': now + timedelta(seconds=self.lock_seconds),
+                'created_at': now,
+                'expires_at': now + timedelta(seconds=self.ttl)
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        existing = self.collection().find_one({'_id': key_id})
+        if existing is None:
+            # Released or expired in between
+            if retry:
+                return self.claim(key_id, fingerprint, retry=False)
+            raise KeyInProgress()
+        if existing['fingerprint'] != fingerprint:
+            raise KeyReused()
+        if existing['state'] == 'completed':
+            return existing
+
+        # The first request may have died: take over its claim once it lapses.
+        # Its record, if written, carries the key, so the re-run can't add another
+        taken = self.collection().update_one(
+            {'_id': key_id, 'state': 'processing', 'locked_until': {'$lt': now}},
+            {'$set': {'locked_until': now + timedelta(seconds=self.lock_seconds)}}
+        )
+        if taken.modified_count:
+            return None
+        raise KeyInProgress()
+
+    def complete(self, key_id, response):
+        self.collection().update_one({'_id': key_id}, {
+            '$set': {
+                'state': 'completed',
+                'status': response.status_code,
+                'mimetype': response.mimetype,
+                'body': response.get_data()
+            },
+            '$unset': {'locked_until': ''}
+        })
+
+    def release(self, key_id):
+        self.collection().delete_one({'_id': key_id, 'state': 'processing'})
+
+
+class IdempotencyGuard:
+    """Replays the stored response for a repeated Idempotency-Key"""
+
+    def __init__(self, store):
+        self.store = store
+        self.replayed = 0
+        self.conflicts = 0
+        self.store_errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, attribute, route, outcome):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+        IDEMPOTENCY_REQUESTS.labels(route, outcome).inc()
+
+    def _replay(self, record):
+        response = current_app.response_class(record['body'], status=record['status'],
+                                              mimetype=record['mimetype'])
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+    def idempotent(self, route):
+        """Decorator (under @jwt_required): one write per Idempotency-Key"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+                if not key:
+                    return view(*args, **kwargs)
+                if len(key) > MAX_KEY_LENGTH:
+                    return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 422
+
+                scope = f'{get_jwt_identity()}:{route}:{request.path}:{key}'
+                key_id = hashlib.sha256(scope.encode()).hexdigest()
+                fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+                try:
+                    record = self.store.claim(key_id, fingerprint)
+                except KeyInProgress:
+                    self._count('conflicts', route, 'in_progress')
+                    return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409, {
+                        'Retry-After': '1'
+                    }
+                except KeyReused:
+                    self._count('conflicts', route, 'key_reused')
+                    return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+                except Exception as e:
+                    # Without the store, behave as if no key had been sent
+                    self._count('store_errors', route, 'store_error')
+                    print(f"⚠️ Idempotency store failed, running request without it: {e}")
+                    return view(*args, **kwargs)
+
+                if record is not None:
+                    self._count('replayed', route, 'replayed')
+                    print(f"🔁 {route} replayed for a repeated Idempotency-Key")
+                    return self._replay(record)
+
+                g.idempotency_key = key_id
+                try:
+                    response = current_app.make_response(view(*args, **kwargs))
+                except Exception:
+                    self.store.release(key_id)
+                    raise
+                try:
+                    if response.status_code >= 500:
+                        self.store.release(key_id)
+                        IDEMPOTENCY_REQUESTS.labels(route, 'released').inc()
+                    else:
+                        self.store.complete(key_id, response)
+                        IDEMPOTENCY_REQUESTS.labels(route, 'stored').inc()
+                except Exception as e:
+                    # The claim lapses and a retry re-runs the view, which
+                    # the record's unique idempotency_key stops at the insert
+                    self._count('store_errors', route, 'store_error')
+                    print(f"⚠️ Could not store idempotent response: {e}")
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ttl_seconds': self.store.ttl,
+                'replayed': self.replayed,
+                'conflicts': self.conflicts,
+                'store_errors': self.store_errors
+            }
+
+
+def init_idempotency(mongo):
+    """The idempotency guard, backed by mongo.db.idempotency_keys"""
+    return IdempotencyGuard(IdempotencyStore(lambda: mongo.db.idempotency_keys))
@@ -0,0 +1,204 @@
+"""
+Declarative MongoDB index registry.
+
+INDEXES lists every index the API relies on; `ensure_indexes` creates them
+idempotently (run at deploy time via `python manage.py ensure-indexes`).
+A unique index added after the collection already had data names the field
+it deduplicates under 'dedupe': if existing duplicates stop it from being
+built, that is reported with the duplicate values (`find_duplicates`)
+instead of failing the deploy, until `manage.py dedupe-transactions` has
+cleaned them up.
+QUERY_PLANS lists the hot query shapes; `verify_query_plans` explains each
+one and reports whether the winning plan is an IXSCAN or a COLLSCAN.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from pagination import KEYSET_SORT
+
+INDEXES = {
+    'users': [
+        {'keys': [('email', ASCENDING)], 'name': 'email_unique', 'unique': True},
+    ],
+    'campaigns': [
+        # _id is the keyset pagination tie-breaker, so it is part of the index
+        {'keys': [('status', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+         'name': 'status_created_at'},
+        {'keys': [('created_by', ASCENDING)], 'name': 'created_by'},
+    ],
+    'donations': [
+        {'keys': [('campaign_id', ASCENDING), ('created_at', DESCENDING)],
+         'name': 'campaign_id_created_at'},
+        {'keys': [('donor_id', ASCENDING), ('created_at', DESCENDING)],
+         'name': 'donor_id_created_at'},
+        # A retried donation can't be recorded twice; records without a
+        # transaction_id (null or missing) are not constrained
+        {'keys': [('transaction_id', ASCENDING)], 'name': 'transaction_id_unique', 'unique': True,
+         'partialFilterExpression': {'transaction_id': {'$type': 'string'}}, 'dedupe': 'transaction_id'},
+        # One record per Idempotency-Key, even when a lapsed claim is re-run
+        {'keys': [('idempotency_key', ASCENDING)], 'name': 'idempotency_key_unique', 'unique': True,
+         'partialFilterExpression': {'idempotency_key': {'$type': 'string'}}},
+    ],
+    # UPI payment records (record_upi_payment); read by the donation export
+    'payments': [
+        {'keys': [('campaign_id', ASCENDING), ('created_at', DESCENDING)],
+         'name': 'campaign_id_created_at'},
+        {'keys': [('transaction_id', ASCENDING)], 'name': 'transaction_id_unique', 'unique': True,
+         'partialFilterExpression': {'transaction_id': {'$type': 'string'}}, 'dedupe': 'transaction_id'},
+        {'keys': [('idempotency_key', ASCENDING)], 'name': 'idempotency_key_unique', 'unique': True,
+         'partialFilterExpression': {'idempotency_key': {'$type': 'string'}}},
+    ],
+    'donation_requests': [
+        {'keys': [('status', ASCENDING), ('deadline', ASCENDING)], 'name': 'status_deadline'},
+        {'keys': [('created_by', ASCENDING)], 'name': 'created_by'},
+    ],
+    # Shared auth rate limit buckets (RATE_LIMIT_STORE=mongodb); removed
+    # once they would have refilled
+    'rate_limits': [
+        {'keys': [('expires_at', ASCENDING)], 'name': 'expires_at_ttl', 'expireAfterSeconds': 0},
+    ],
+    # Stored responses for Idempotency-Key replays (idempotency.py)
+    'idempotency_keys': [
+        {'keys': [('expires_at', ASCENDING)], 'name': 'expires_at_ttl', 'expireAfterSeconds': 0},
+    ],
+}
+
+# Options in an INDEXES entry that are ours, not create_index's
+REGISTRY_KEYS = ('keys', 'dedupe')
+
+# Query shapes issued by the API, keyed by the helper that issues them.
+# Values are placeholders: only the shape matters to the planner.
+QUERY_PLANS = [
+    {'name': 'get_user_by_email', 'collection': 'users',
+     'filter': {'email': 'probe@example.com'}},
+    {'name': 'get_campaigns_by_user', 'collection': 'campaigns',
+     'filter': {'created_by': ObjectId()}},
+    {'name': 'get_all_active_campaigns', 'collection': 'campaigns',
+     'filter': {'status': 'active'}, 'sort': KEYSET_SORT},
+    {'name': 'get_campaign_donations', 'collection': 'donations',
+     'filter': {'campaign_id': ObjectId()}, 'sort': [('created_at', -1)]},
+    {'name': 'aggregate_donation_stats', 'collection': 'donations',
+     'filter': {'campaign_id': ObjectId(), 'created_at': {'$gte': datetime(2000, 1, 1)}}},
+    {'name': 'export_donations', 'collection': 'donations',
+     'filter': {'campaign_id': ObjectId(), 'created_at': {'$gte': datetime(2000, 1, 1)}},
+     'sort': [('created_at', 1)]},
+    {'name': 'export_payments', 'collection': 'payments',
+     'filter': {'campaign_id': ObjectId()}, 'sort': [('created_at', 1)]},
+    {'name': 'get_user_donations', 'collection': 'donations',
+     'filter': {'donor_id': ObjectId()}, 'sort': [('created_at', -1)]},
+    {'name': 'get_all_active_donation_requests', 'collection': 'donation_requests',
+     'filter': {'status': 'active'}},
+    {'name': 'get_donation_requests_by_user', 'collection': 'donation_requests',
+     'filter': {'created_by': ObjectId()}},
+]
+
+
+def ensure_indexes(db):
+    """Create every declared index; existing identical indexes are a no-op.
+
+    Returns a list of (collection, index name, error or None, duplicates).
+    duplicates is only set when a 'dedupe' index couldn't be built because
+    existing documents share a value: a list of find_duplicates groups.
+    """
+    results = []
+    for collection, specs in INDEXES.items():
+        for spec in specs:
+            options = {key: value for key, value in spec.items() if key not in REGISTRY_KEYS}
+            try:
+                db[collection].create_index(spec['keys'], **options)
+                results.append((collection, spec['name'], None, None))
+            except OperationFailure as e:
+                # e.g. duplicate emails blocking the unique index, or an
+                # older index with the same keys under another name
+                duplicates = None
+                if spec.get('dedupe') and (isinstance(e, DuplicateKeyError) or e.code == 11000):
+                    duplicates = find_duplicates(db, collection, spec['dedupe'])
+                results.append((collection, spec['name'], str(e), duplicates))
+    return results
+
+
+def find_duplicates(db, collection, field, limit=None):
+    """Values of a string field shared by more than one document.
+
+    Returns dicts with the value, how many documents share it and their
+    _ids oldest first; the most duplicated values come first.
+    """
+    pipeline = [
+        {'$match': {field: {'$type': 'string'}}},
+        {'$sort': {'created_at': 1, '_id': 1}},
+        {'$group': {'_id': f'${field}', 'count': {'$sum': 1}, 'ids': {'$push': '$_id'}}},
+        {'$match': {'count': {'$gt': 1}}},
+        {'$sort': {'count': -1, '_id': 1}},
+    ]
+    if limit:
+        pipeline.append({'$limit': limit})
+    return [
+        {'value': group['_id'], 'count': group['count'], 'ids': group['ids']}
+        for group in db[collection].aggregate(pipeline, allowDiskUse=True)
+    ]
+
+
+def dedupe_field(db, collection, field, dry_run=False):
+    """Make a field unique again without losing any record.
+
+    The oldest document keeps the value; every later one gets a numbered
+    suffix (`DON_20240101120000-dup1`) and keeps the original under
+    `original_<field>`. Nothing is deleted and no amounts change, so the
+    campaign counters stay right. Returns the number of documents renamed.
+    """
+    renamed = 0
+    for group in find_duplicates(db, collection, field):
+        for number, document_id in enumerate(group['ids'][1:], start=1):
+            renamed += 1
+            if not dry_run:
+                db[collection].update_one({'_id': document_id}, {'$set': {
+                    field: f"{group['value']}-dup{number}",
+                    f'original_{field}': group['value']
+                }})
+    return renamed
+
+
+def plan_stages(plan):
+    """Collect every stage name in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def explain_query(db, collection, filter, sort=None):
+    """Return the queryPlanner winning plan for a find() shape"""
+    command = {'find': collection, 'filter': filter, 'limit': 1}
+    if sort:
+        command['sort'] = dict(sort)
+    explanation = db.command('explain', command, verbosity='queryPlanner')
+    return explanation['queryPlanner']['winningPlan']
+
+
+def verify_query_plans(db):
+    """Explain every declared query shape.
+
+    Returns a list of dicts with the query name, the plan stages and whether
+    the winning plan uses an index scan.
+    """
+    report = []
+    for shape in QUERY_PLANS:
+        winning_plan = explain_query(db, shape['collection'], shape['filter'], shape.get('sort'))
+        stages = plan_stages(winning_plan)
+        report.append({
+            'name': shape['name'],
+            'collection': shape['collection'],
+            'stages': stages,
+            'uses_index': 'IXSCAN' in stages or 'IDHACK' in stages,
+            'collscan': 'COLLSCAN' in stages
+        })
+    return report
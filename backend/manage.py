@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Database maintenance commands for the Connect & Contribute backend.
+
+Usage:
+    python manage.py ensure-indexes [--verify] [--allow-missing-unique]
+    python manage.py verify-indexes
+    python manage.py compact-campaigns [--batch-size 500] [--dry-run]
+    python manage.py rebuild-stats [--campaign-id ID | --missing]
+    python manage.py dedupe-transactions [--apply]
+"""
+import argparse
+import os
+import sys
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from conditional import bump_list_version
+from donation_stats import rebuild_donation_stats
+from indexes import INDEXES, dedupe_field, ensure_indexes, find_duplicates, verify_query_plans
+from recent_donations import RECENT_DONATIONS_LIMIT, compact_recent_donations
+
+
+# Duplicate values listed per index by ensure-indexes
+DUPLICATES_SHOWN = 10
+
+
+def get_database():
+    """Connect using the same MONGO_URI as the Flask apps"""
+    load_dotenv()
+    mongo_uri = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/connect_contribute')
+    client = MongoClient(mongo_uri)
+    return client.get_default_database('connect_contribute')
+
+
+def ensure_indexes_command(args):
+    """Create the declared indexes (safe to run on every deploy)"""
+    db = get_database()
+    print("🔧 Ensuring MongoDB indexes...")
+    failed = 0
+    for collection, name, error, duplicates in ensure_indexes(db):
+        if duplicates:
+            # Without the index nothing stops more duplicate records, so this
+            # fails the release unless the operator accepts that explicitly
+            if args.allow_missing_unique:
+                print(f"⚠️ {collection}.{name} not created (--allow-missing-unique): ", end='')
+            else:
+                failed += 1
+                print(f"❌ {collection}.{name} not created: ", end='')
+            print(f"{len(duplicates)} value(s) are shared by several documents. "
+                  f"Run `python manage.py dedupe-transactions` to review and fix them.")
+            for group in duplicates[:DUPLICATES_SHOWN]:
+                ids = ', '.join(str(document_id) for document_id in group['ids'])
+                print(f"   {group['value']!r} x{group['count']}: {ids}")
+        elif error:
+            failed += 1
+            print(f"❌ {collection}.{name}: {error}")
+        else:
+            print(f"✅ {collection}.{name}")
+    if failed:
+        return 1
+    return verify_indexes_command(args) if args.verify else 0
+
+
+def verify_indexes_command(args):
+    """Explain the hot query shapes and flag collection scans"""
+    db = get_database()
+    print("🔍 Checking query plans...")
+    collscans = 0
+    for result in verify_query_plans(db):
+        stages = ' > '.join(result['stages'])
+        if result['uses_index'] and not result['collscan']:
+            print(f"✅ {result['name']} ({result['collection']}): {stages}")
+        else:
+            collscans += 1
+            print(f"❌ {result['name']} ({result['collection']}): {stages}")
+    return 1 if collscans else 0
+
+
+def compact_campaigns(args):
+    """Trim recent_donations on existing campaign documents"""
+    db = get_database()
+    print(f"🔧 Keeping the newest {RECENT_DONATIONS_LIMIT} recent_donations per campaign...")
+    trimmed = compact_recent_donations(db, batch_size=args.batch_size, dry_run=args.dry_run)
+    if trimmed and not args.dry_run:
+        # Listings embed recent_donations, so cached list ETags are stale now
+        bump_list_version(db, 'campaigns')
+    print(f"✅ {'Would trim' if args.dry_run else 'Trimmed'} {trimmed} campaign(s)")
+    return 0
+
+
+def rebuild_stats(args):
+    """Recompute campaign_stats from the donations collection"""
+    db = get_database()
+    campaign_id = ObjectId(args.campaign_id) if args.campaign_id else None
+    print(f"🔧 Rebuilding {'missing ' if args.missing else ''}campaign_stats from donations...")
+    written = rebuild_donation_stats(db, campaign_id=campaign_id, batch_size=args.batch_size,
+                                     missing_only=args.missing)
+    if written:
+        bump_list_version(db, 'campaigns')
+    print(f"✅ Rebuilt stats for {written} campaign(s)")
+    return 0
+
+
+def dedupe_transactions(args):
+    """Report (or with --apply, rename) records sharing a transaction id"""
+    db = get_database()
+    total = 0
+    for collection, specs in INDEXES.items():
+        for field in [spec['dedupe'] for spec in specs if spec.get('dedupe')]:
+            duplicates = find_duplicates(db, collection, field)
+            for group in duplicates:
+                ids = ', '.join(str(document_id) for document_id in group['ids'])
+                print(f"🔍 {collection}.{field} {group['value']!r} x{group['count']}: {ids}")
+            if args.apply:
+                renamed = dedupe_field(db, collection, field)
+                print(f"✅ {collection}: renamed {field} on {renamed} document(s)")
+            total += sum(group['count'] - 1 for group in duplicates)
+    if not args.apply:
+        print(f"ℹ️ {total} document(s) would be renamed; run with --apply, then ensure-indexes")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ensure = subparsers.add_parser(
+        'ensure-indexes',
+        help='Create the indexes declared in indexes.py'
+    )
+    ensure.add_argument('--verify', action='store_true',
+                        help='Also check that the hot queries use an IXSCAN')
+    ensure.add_argument('--allow-missing-unique', action='store_true',
+                        help="Don't fail when existing duplicates block a unique index")
+    ensure.set_defaults(func=ensure_indexes_command)
+
+    verify = subparsers.add_parser(
+        'verify-indexes',
+        help='Report whether each declared query plan uses an IXSCAN'
+    )
+    verify.set_defaults(func=verify_indexes_command)
+
+    compact = subparsers.add_parser(
+        'compact-campaigns',
+        help='Trim recent_donations arrays to the ring buffer size'
+    )
+    compact.add_argument('--batch-size', type=int, default=500)
+    compact.add_argument('--dry-run', action='store_true')
+    compact.set_defaults(func=compact_campaigns)
+
+    rebuild = subparsers.add_parser(
+        'rebuild-stats',
+        help='Recompute campaign_stats from the donations collection'
+    )
+    target = rebuild.add_mutually_exclusive_group()
+    target.add_argument('--campaign-id', help='Only rebuild this campaign')
+    target.add_argument('--missing', action='store_true',
+                        help='Only campaigns whose stats were never rebuilt (safe on every deploy)')
+    rebuild.add_argument('--batch-size', type=int, default=500)
+    rebuild.set_defaults(func=rebuild_stats)
+
+    dedupe = subparsers.add_parser(
+        'dedupe-transactions',
+        help='Find records sharing a transaction_id before the unique indexes are built'
+    )
+    dedupe.add_argument('--apply', action='store_true',
+                        help='Suffix the later duplicates (-dup1, ...) instead of only reporting them')
+    dedupe.set_defaults(func=dedupe_transactions)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Prometheus metrics for the Flask apps and their MongoDB traffic.
+
+Recorded:
+    http_requests_total                 count per endpoint, method and status
+    http_request_duration_seconds       latency histogram per endpoint and method
+    mongodb_command_duration_seconds    latency histogram per collection and command
+    mongodb_command_failures_total      failed commands per collection and command
+    password_hash_queue_depth           password jobs queued or running in the hashing pool
+    password_hash_duration_seconds      hash/verify latency, queue wait included
+    password_hash_rejected_total        jobs turned away because the pool was full
+    password_rehashes_total             stored hashes upgraded to the current method on login
+    auth_rate_limit_decisions_total     login/signup throttling decisions per route and bucket
+
+`init_metrics(app)` installs the request hooks; pass `COMMAND_LISTENER` to
+PyMongo (`event_listeners=[COMMAND_LISTENER]`) for the MongoDB metrics.
+`/api/metrics` renders `metrics_response()`.
+
+Under gunicorn every worker has its own counters. Set
+PROMETHEUS_MULTIPROC_DIR to an empty directory before the server starts and
+the workers share them through prometheus_client's multiprocess mode, so a
+scrape hitting any worker sees the totals. Call `mark_process_dead(pid)`
+from gunicorn's child_exit hook. METRICS_TOKEN, when set, is required as a
+Bearer token to read /api/metrics.
+"""
+import os
+import threading
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+from pymongo import monitoring
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Driver-internal commands that would only add noise
+IGNORED_COMMANDS = {
+    'hello', 'ismaster', 'isMaster', 'ping', 'saslStart', 'saslContinue',
+    'authenticate', 'endSessions', 'buildInfo', 'getnonce'
+}
+
+REQUEST_COUNT = Counter(
+    'http_requests_total', 'HTTP requests',
+    ['endpoint', 'method', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['endpoint', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+MONGO_LATENCY = Histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency',
+    ['collection', 'command'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+MONGO_FAILURES = Counter(
+    'mongodb_command_failures_total', 'Failed MongoDB commands',
+    ['collection', 'command']
+)
+
+# Recorded by passwords.PasswordHasher
+PASSWORD_HASH_QUEUE = Gauge(
+    'password_hash_queue_depth', 'Password hash/verify jobs queued or running',
+    multiprocess_mode='livesum'
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    'password_hash_duration_seconds', 'Password hash/verify latency including queue wait',
+    ['operation'],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+PASSWORD_HASH_REJECTED = Counter(
+    'password_hash_rejected_total', 'Password jobs rejected because the pool was full',
+    ['operation']
+)
+PASSWORD_REHASHES = Counter(
+    'password_rehashes_total', 'Stored password hashes upgraded on login'
+)
+
+# Recorded by rate_limit.AuthRateLimiter; scope is ip, email or all (allowed)
+RATE_LIMIT_DECISIONS = Counter(
+    'auth_rate_limit_decisions_total', 'Auth rate limiter decisions',
+    ['route', 'scope', 'decision']
+)
+
+# Recorded by idempotency.IdempotencyGuard for requests with an Idempotency-Key;
+# outcome is stored, released, replayed, in_progress, key_reused or store_error
+IDEMPOTENCY_REQUESTS = Counter(
+    'idempotency_requests_total', 'Requests carrying an Idempotency-Key',
+    ['route', 'outcome']
+)
+
+
+def command_collection(command_name, command):
+    """The collection a command targets, or '' for database commands"""
+    if command_name == 'getMore':
+        return command.get('collection', '')
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ''
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name"""
+
+    def __init__(self):
+        # Started events carry the command (and so the collection); the
+        # matching succeeded/failed events only carry the duration
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _key(self, event):
+        return (event.request_id, event.connection_id, event.operation_id)
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = command_collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[self._key(event)] = (collection, event.command_name)
+
+    def _finish(self, event):
+        with self._lock:
+            return self._pending.pop(self._key(event), None)
+
+    def succeeded(self, event):
+        labels = self._finish(event)
+        if labels:
+            MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self._finish(event)
+        if labels:
+            MONGO_LATENCY.labels(*labels).observe(event.duration_micros / 1e6)
+            MONGO_FAILURES.labels(*labels).inc()
+
+
+COMMAND_LISTENER = MongoCommandListener()
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    # Endpoint names, not paths, so ids don't explode the label set
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_COUNT.labels(endpoint, request.method, str(response.status_code)).inc()
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - start)
+    return response
+
+
+def init_metrics(app):
+    """Install the request timing hooks on app"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def metrics_registry():
+    """The registry to render: all workers' files in multiprocess mode"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_authorized():
+    if not METRICS_TOKEN:
+        return True
+    return request.headers.get('Authorization') == f'Bearer {METRICS_TOKEN}'
+
+
+def metrics_response():
+    """Render the metrics in Prometheus text format"""
+    return Response(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid):
+    """Clean up a dead worker's live gauges (gunicorn child_exit hook)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
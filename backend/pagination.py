@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination helpers shared by app.py and app_production.py.
+
+Pages are ordered newest first on (created_at, _id). The cursor handed to
+clients is an opaque base64url token holding the sort key of the last
+document on the previous page, so fetching page N costs the same index
+seek as fetching page 1 (no skip()).
+"""
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Sort order used by every keyset-paginated listing
+KEYSET_SORT = [('created_at', -1), ('_id', -1)]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that we did not issue"""
+
+
+def clamp_limit(limit, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Keep a client supplied page size within sane bounds"""
+    if limit is None:
+        return default
+    return max(1, min(int(limit), maximum))
+
+
+def encode_cursor(document):
+    """Build an opaque cursor pointing just after the given raw document"""
+    payload = {
+        'c': document['created_at'].isoformat(),
+        'i': str(document['_id'])
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, _id) pair stored in a cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['c']), ObjectId(payload['i'])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor(str(e))
+
+
+def keyset_query(base_query, cursor=None):
+    """Extend a query so it only matches documents after the cursor"""
+    if not cursor:
+        return dict(base_query)
+
+    created_at, last_id = decode_cursor(cursor)
+    query = dict(base_query)
+    query['$or'] = [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': last_id}}
+    ]
+    return query
+
+
+def fetch_page(collection, base_query, limit, cursor=None, projection=None):
+    """Fetch one page of raw documents.
+
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    One extra document is requested to find out whether another page exists.
+    A projection must keep `created_at` so the next cursor can be built.
+    """
+    documents = list(
+        collection.find(keyset_query(base_query, cursor), projection)
+        .sort(KEYSET_SORT)
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1])
+    return documents, next_cursor
@@ -0,0 +1,219 @@
+"""
+Password hashing and verification off the request threads.
+
+scrypt/PBKDF2 burn 100-300 ms of CPU per call with the GIL held, so a burst
+of logins hashing in request threads stalls every other request in the
+process. `PasswordHasher` runs werkzeug's hashing in a small process pool
+instead; the request thread only waits on the result.
+
+The pool is bounded: once PASSWORD_HASH_QUEUE_SIZE jobs are queued or
+running in this process, `hash()`/`check()` raise `HashingBusy` and the auth
+routes answer 503 with Retry-After instead of piling up more work.
+
+Configuration (environment):
+    PASSWORD_HASH_METHOD      werkzeug method and cost for new hashes (default
+                              scrypt:32768:8:1; e.g. pbkdf2:sha256:600000)
+    PASSWORD_SALT_LENGTH      salt characters (default 16)
+    PASSWORD_HASH_WORKERS     pool processes (default min(2, CPU)); 0 hashes
+                              in the request thread
+    PASSWORD_HASH_QUEUE_SIZE  jobs per process before rejecting (default 8 x workers)
+    PASSWORD_HASH_TIMEOUT     seconds to wait for a result (default 10)
+
+`check()` also says when the stored hash uses another method or cost than
+PASSWORD_HASH_METHOD and returns a fresh hash to store, so existing users
+are upgraded as they log in.
+
+This module only imports the standard library and werkzeug at load time,
+since the pool processes import it too. As with any multiprocessing code,
+a script that runs the app directly must keep its entry point under
+`if __name__ == '__main__':` (the pool processes re-import the main module).
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+RETRY_AFTER_SECONDS = 1
+
+
+class HashingBusy(RuntimeError):
+    """The hashing pool is full (or too slow); retry later"""
+
+    retry_after = RETRY_AFTER_SECONDS
+
+
+def normalize_method(method):
+    """Spell out werkzeug's defaults, e.g. 'pbkdf2' -> 'pbkdf2:sha256:1000000'.
+
+    Stored hashes always carry the full method, so this is what they are
+    compared against to decide whether to rehash.
+    """
+    name, *args = method.strip().split(':')
+    try:
+        if name == 'scrypt':
+            n, r, p = (int(value) for value in args) if args else (2 ** 15, 8, 1)
+            return f'scrypt:{n}:{r}:{p}'
+        if name == 'pbkdf2' and len(args) <= 2:
+            hash_name = args[0] if args else 'sha256'
+            iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+            return f'pbkdf2:{hash_name}:{iterations}'
+    except ValueError:
+        pass
+    raise ValueError(f'Unsupported password hash method: {method!r}')
+
+
+def stored_method(pwhash):
+    """The method part of a stored 'method$salt$hash' string, or None"""
+    if not isinstance(pwhash, str) or pwhash.count('$') < 2:
+        return None
+    try:
+        return normalize_method(pwhash.split('$', 1)[0])
+    except ValueError:
+        return None
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _check(pwhash, password, method, salt_length):
+    """(matches, upgraded hash or None); runs in the pool"""
+    if not isinstance(pwhash, str) or not check_password_hash(pwhash, password):
+        return False, None
+    if stored_method(pwhash) == method:
+        return True, None
+    return True, generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _pool_context():
+    # A fresh forkserver child doesn't inherit the app's threads, locks or
+    # MongoClient; preload only this module so it doesn't re-import the app
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class PasswordHasher:
+    """Bounded process pool for hashing and checking passwords"""
+
+    def __init__(self, method=None, salt_length=None, workers=None, queue_size=None, timeout=None):
+        self.method = normalize_method(method or os.environ.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD)
+        self.salt_length = salt_length or int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+        if workers is None:
+            workers = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+        self.workers = workers
+        self.queue_size = queue_size or int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', max(1, workers) * 8))
+        self.timeout = timeout or float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        # Imported here rather than at module level so the pool processes,
+        # which import this module, don't load Flask and prometheus_client
+        from metrics import (
+            PASSWORD_HASH_LATENCY, PASSWORD_HASH_QUEUE, PASSWORD_HASH_REJECTED, PASSWORD_REHASHES
+        )
+        self._latency = PASSWORD_HASH_LATENCY
+        self._queue_gauge = PASSWORD_HASH_QUEUE
+        self._rejected_counter = PASSWORD_HASH_REJECTED
+        self._rehash_counter = PASSWORD_REHASHES
+
+    def _pool(self):
+        """This process's executor, created lazily (and again after a fork)"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset_pool(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+
+    def _run(self, operation, function, *args):
+        start = time.perf_counter()
+        if self.workers <= 0:
+            result = function(*args)
+            self._latency.labels(operation).observe(time.perf_counter() - start)
+            return result
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            self._rejected_counter.labels(operation).inc()
+            raise HashingBusy(f'{self.queue_size} password jobs already queued')
+        with self._lock:
+            self.queued += 1
+        self._queue_gauge.inc()
+        try:
+            for attempt in (1, 2):
+                executor = self._pool()
+                try:
+                    result = executor.submit(function, *args).result(timeout=self.timeout)
+                    break
+                except BrokenProcessPool:
+                    # A pool process died (e.g. OOM-killed); start a new pool once
+                    self._reset_pool(executor)
+                    if attempt == 2:
+                        raise
+                except FutureTimeout:
+                    raise HashingBusy(f'password {operation} took longer than {self.timeout}s')
+        finally:
+            with self._lock:
+                self.queued -= 1
+                self.completed += 1
+            self._queue_gauge.dec()
+            self._slots.release()
+        self._latency.labels(operation).observe(time.perf_counter() - start)
+        return result
+
+    def warm(self):
+        """Start the pool processes ahead of the first login"""
+        if self.workers > 0:
+            executor = self._pool()
+            for future in [executor.submit(stored_method, None) for _ in range(self.workers)]:
+                future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        """Hash a new password with the configured method"""
+        return self._run('hash', _hash, password, self.method, self.salt_length)
+
+    def check(self, pwhash, password):
+        """Verify password against a stored hash.
+
+        Returns (matches, upgraded): upgraded is a new hash to store when the
+        password matched but pwhash used another method or cost, else None.
+        """
+        matches, upgraded = self._run('verify', _check, pwhash, password, self.method, self.salt_length)
+        if upgraded:
+            with self._lock:
+                self.rehashed += 1
+            self._rehash_counter.inc()
+        return matches, upgraded
+
+    def stats(self):
+        with self._lock:
+            return {
+                'method': self.method.split(':', 1)[0],
+                'cost': self.method.split(':', 1)[1],
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'queued': self.queued,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'rehashed': self.rehashed
+            }
@@ -0,0 +1,82 @@
+"""
+Sparse fieldset support (`?fields=title,raised_amount`) for read endpoints.
+
+The requested names are checked against a per-resource allowlist and turned
+into a MongoDB projection, so list screens only pull the fields they render
+instead of whole documents (description, payment_details, cover_image,
+recent_donations, ...).
+
+Some stored fields are for the server only (INTERNAL_FIELDS): reads without
+`fields` leave them out by projection (`read_projection`), and
+`public_document` drops them from documents that didn't come from such a
+read, e.g. one just inserted.
+"""
+
+# Fields a client may ask for, per resource. `_id` is always returned.
+FIELD_ALLOWLISTS = {
+    'campaign': {
+        'title', 'description', 'category', 'target_amount', 'raised_amount',
+        'end_date', 'cover_image', 'payment_details', 'status', 'created_by',
+        'created_at', 'updated_at', 'total_donations', 'recent_donations'
+    },
+    'donation_request': {
+        'title', 'description', 'category', 'quantity_needed',
+        'quantity_received', 'unit', 'deadline', 'item_image', 'status',
+        'created_by', 'created_at', 'updated_at'
+    },
+    'donation': {
+        'campaign_id', 'donor_id', 'donor_name', 'donor_email', 'donor_phone',
+        'amount', 'payment_method', 'status', 'payment_status', 'payment_time',
+        'transaction_id', 'message', 'is_anonymous', 'additional_info',
+        'created_at', 'updated_at'
+    }
+}
+
+# Stored fields that are never sent to clients, per resource
+INTERNAL_FIELDS = {
+    'campaign': ('campaign_stats',),
+    'donation': ('idempotency_key',)
+}
+
+
+class InvalidFields(ValueError):
+    """Raised when a client asks for fields outside the allowlist"""
+
+
+def parse_fields(resource, raw, always=()):
+    """Turn a comma separated `fields` value into a MongoDB projection.
+
+    Returns None (fetch the whole document) when no fields were requested.
+    `always` lists fields the caller needs regardless of the request, e.g.
+    the keyset pagination sort key.
+    """
+    if not raw:
+        return None
+
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    if not requested:
+        return None
+
+    unknown = requested - FIELD_ALLOWLISTS[resource]
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(sorted(unknown))}")
+
+    projection = {name: 1 for name in requested}
+    for name in always:
+        projection[name] = 1
+    return projection
+
+
+def read_projection(resource, projection=None):
+    """The projection for a read: the requested fields, or all but the internal ones"""
+    if projection is not None:
+        return projection
+    return {name: 0 for name in INTERNAL_FIELDS.get(resource, ())} or None
+
+
+def public_document(resource, document):
+    """Drop the resource's internal fields from a document for a response"""
+    if document:
+        for name in INTERNAL_FIELDS.get(resource, ()):
+            document.pop(name, None)
+    return document
@@ -0,0 +1,263 @@
+"""
+Token-bucket throttling for the auth endpoints.
+
+Login and signup are the most expensive requests the API serves (a password
+hash plus a user lookup), so a credential-stuffing burst can tie up every
+worker. `AuthRateLimiter.limit(route)` wraps a view and checks a per-IP and
+a per-email bucket before the view runs; over the limit it answers 429 with
+Retry-After without touching the password pool or the users collection.
+
+Each bucket holds up to N tokens and refills at N per period; a request
+takes one token. Limits are "N/seconds", e.g. "10/60" allows bursts of 10
+and 10 requests a minute after that.
+
+Configuration (environment):
+    RATE_LIMIT                on/off (default on)
+    RATE_LIMIT_LOGIN_IP       default 20/60
+    RATE_LIMIT_LOGIN_EMAIL    default 10/300
+    RATE_LIMIT_SIGNUP_IP      default 5/300
+    RATE_LIMIT_SIGNUP_EMAIL   default 3/3600
+    RATE_LIMIT_STORE          memory (default, per process) or mongodb, which
+                              shares the buckets across gunicorn workers and
+                              instances through the rate_limits collection
+    RATE_LIMIT_PROXY_HOPS     reverse proxies in front of the app whose
+                              X-Forwarded-For entries to trust (read by
+                              config.py: 1 in production, 0 elsewhere)
+    RATE_LIMIT_MAX_KEYS       buckets kept in memory (default 100000)
+
+A limit of "off" disables that bucket. If the shared store fails, requests
+are let through (and counted) rather than locking everyone out.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from metrics import RATE_LIMIT_DECISIONS
+
+DEFAULT_LIMITS = {
+    ('login', 'ip'): '20/60',
+    ('login', 'email'): '10/300',
+    ('signup', 'ip'): '5/300',
+    ('signup', 'email'): '3/3600'
+}
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+
+# Seconds between sweeps of refilled (and so forgettable) memory buckets
+SWEEP_INTERVAL = 60
+
+
+def parse_limit(raw):
+    """'N/seconds' -> (capacity, tokens per second); None for 'off'"""
+    if raw is None or raw.strip().lower() in ('', 'off', 'none', '0'):
+        return None
+    try:
+        capacity, period = raw.split('/')
+        capacity, period = int(capacity), float(period)
+    except ValueError:
+        raise ValueError(f"Rate limits look like '10/60', got {raw!r}")
+    if capacity < 1 or period <= 0:
+        raise ValueError(f"Rate limit {raw!r} must allow at least 1 request per positive period")
+    return capacity, capacity / period
+
+
+class MemoryBucketStore:
+    """Buckets in this process's memory, LRU-capped at max_keys"""
+
+    name = 'memory'
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at, capacity, rate)
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def take(self, key, capacity, rate):
+        """Take a token; returns (allowed, seconds until one is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _, _ = self._buckets.pop(key, (capacity, now, capacity, rate))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, capacity, rate)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            if now - self._last_sweep > SWEEP_INTERVAL:
+                self._sweep(now)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def _sweep(self, now):
+        # A bucket that has refilled completely is the same as no bucket
+        self._last_sweep = now
+        for key, (tokens, updated_at, capacity, rate) in list(self._buckets.items()):
+            if tokens + (now - updated_at) * rate >= capacity:
+                del self._buckets[key]
+
+    def size(self):
+        return len(self._buckets)
+
+
+class MongoBucketStore:
+    """Buckets in the rate_limits collection, shared by every worker.
+
+    One findOneAndUpdate per check: an update pipeline refills the bucket
+    from the server clock ($$NOW) and takes a token atomically, so
+    concurrent workers never double-spend. Documents expire through the TTL
+    index on expires_at once the bucket would be full again.
+    """
+
+    name = 'mongodb'
+
+    def __init__(self, collection):
+        # collection: a callable returning the pymongo collection, since the
+        # production app recreates its MongoClient after fork
+        self.collection = collection
+
+    def take(self, key, capacity, rate):
+        try:
+            return self._take(key, capacity, rate)
+        except DuplicateKeyError:
+            # Two workers upserted the same new bucket; the loser retries
+            # against the document the winner created
+            return self._take(key, capacity, rate)
+
+    def _take(self, key, capacity, rate):
+        elapsed = {'$divide': [{'$subtract': ['$$NOW', {'$ifNull': ['$updated_at', '$$NOW']}]}, 1000]}
+        refilled = {'$min': [capacity, {'$add': [{'$ifNull': ['$tokens', capacity]}, {'$multiply': [elapsed, rate]}]}]}
+        document = self.collection().find_one_and_update(
+            {'_id': key},
+            [
+                {'$set': {'tokens': refilled, 'updated_at': '$$NOW'}},
+                {'$set': {
+                    'allowed': {'$gte': ['$tokens', 1]},
+                    'tokens': {'$cond': [{'$gte': ['$tokens', 1]}, {'$subtract': ['$tokens', 1]}, '$tokens']},
+                    'expires_at': {'$add': ['$$NOW', int(capacity / rate * 1000)]}
+                }}
+            ],
+            projection={'allowed': 1, 'tokens': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if document['allowed']:
+            return True, 0
+        return False, (1 - document['tokens']) / rate
+
+    def size(self):
+        return None
+
+
+def client_ip(proxy_hops=0):
+    """The caller's address, trusting proxy_hops X-Forwarded-For entries"""
+    if proxy_hops > 0:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= proxy_hops:
+            return forwarded[-proxy_hops]
+    return request.remote_addr or 'unknown'
+
+
+def request_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+class AuthRateLimiter:
+    """Per-IP and per-email token buckets for the auth routes"""
+
+    def __init__(self, store=None, enabled=None, limits=None, proxy_hops=0):
+        if enabled is None:
+            enabled = os.environ.get('RATE_LIMIT', 'on').lower() in ('1', 'true', 'on', 'yes')
+        self.enabled = enabled
+        self.store = store or MemoryBucketStore()
+        self.proxy_hops = proxy_hops
+        self.limits = {}
+        for (route, scope), default in DEFAULT_LIMITS.items():
+            raw = (limits or {}).get((route, scope))
+            if raw is None:
+                raw = os.environ.get(f'RATE_LIMIT_{route.upper()}_{scope.upper()}', default)
+            self.limits[(route, scope)] = parse_limit(raw)
+        self.allowed = 0
+        self.limited = 0
+        self.store_errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, attribute):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def _take(self, route, scope, value):
+        limit = self.limits.get((route, scope))
+        if limit is None or value is None:
+            return True, 0
+        # Hashed so the shared store never holds addresses or emails
+        key = hashlib.sha256(f'{route}:{scope}:{value}'.encode()).hexdigest()
+        try:
+            return self.store.take(key, *limit)
+        except Exception as e:
+            self._count('store_errors')
+            RATE_LIMIT_DECISIONS.labels(route, scope, 'store_error').inc()
+            print(f"⚠️ Rate limit store failed, allowing request: {e}")
+            return True, 0
+
+    def check(self, route, ip, email):
+        """Returns (allowed, retry_after seconds, scope that was exceeded)"""
+        for scope, value in (('ip', ip), ('email', email)):
+            allowed, retry_after = self._take(route, scope, value)
+            if not allowed:
+                self._count('limited')
+                RATE_LIMIT_DECISIONS.labels(route, scope, 'limited').inc()
+                return False, retry_after, scope
+        self._count('allowed')
+        RATE_LIMIT_DECISIONS.labels(route, 'all', 'allowed').inc()
+        return True, 0, None
+
+    def limit(self, route):
+        """Decorator: throttle a view before it runs"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.enabled and request.method != 'OPTIONS':
+                    allowed, retry_after, scope = self.check(route, client_ip(self.proxy_hops), request_email())
+                    if not allowed:
+                        print(f"🚦 {route} throttled by {scope} limit")
+                        return jsonify({'error': 'Too many attempts, please try again later'}), 429, {
+                            'Retry-After': str(max(1, math.ceil(retry_after)))
+                        }
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'store': self.store.name,
+                'proxy_hops': self.proxy_hops,
+                'buckets': self.store.size(),
+                'limits': {
+                    f'{route}_{scope}': f'{limit[0]}/{limit[0] / limit[1]:g}s' if limit else 'off'
+                    for (route, scope), limit in self.limits.items()
+                },
+                'allowed': self.allowed,
+                'limited': self.limited,
+                'store_errors': self.store_errors
+            }
+
+
+def init_rate_limiting(mongo, proxy_hops=0):
+    """The auth limiter for RATE_LIMIT_STORE, backed by mongo.db for 'mongodb'"""
+    store_name = os.environ.get('RATE_LIMIT_STORE', 'memory').lower()
+    if store_name == 'mongodb':
+        return AuthRateLimiter(MongoBucketStore(lambda: mongo.db.rate_limits), proxy_hops=proxy_hops)
+    if store_name != 'memory':
+        raise ValueError(f"RATE_LIMIT_STORE must be memory or mongodb, got {store_name!r}")
+    return AuthRateLimiter(proxy_hops=proxy_hops)
@@ -0,0 +1,61 @@
+"""
+Bounded `recent_donations` ring buffer kept on each campaign document.
+
+Campaigns only embed the newest few donations for quick display; the full
+history lives in the `donations` collection (GET /api/campaigns/<id>/donations).
+Keeping the array bounded stops popular campaigns from growing towards the
+16 MB document limit and keeps every campaign read small.
+"""
+import os
+
+from pymongo import UpdateOne
+
+RECENT_DONATIONS_LIMIT = int(os.environ.get('RECENT_DONATIONS_LIMIT', 10))
+
+
+def recent_donations_push(*entries):
+    """Build the `$push` value that adds entries and keeps the newest N.
+
+    Usable directly in an update document:
+        {'$push': {'recent_donations': recent_donations_push(entry)}}
+    Calling it without entries just re-sorts and trims the existing array.
+    """
+    return {
+        '$each': list(entries),
+        '$sort': {'created_at': -1},
+        '$slice': RECENT_DONATIONS_LIMIT
+    }
+
+
+def compact_recent_donations(db, batch_size=500, dry_run=False):
+    """Trim every oversized `recent_donations` array to the ring buffer size.
+
+    Campaigns are processed in `_id` order, `batch_size` at a time, with one
+    unordered bulk_write per batch. Returns the number of campaigns trimmed
+    (or that would be trimmed with dry_run).
+    """
+    oversized = {f'recent_donations.{RECENT_DONATIONS_LIMIT}': {'$exists': True}}
+    trimmed = 0
+    last_id = None
+
+    while True:
+        query = dict(oversized)
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+
+        batch = [doc['_id'] for doc in db.campaigns.find(query, {'_id': 1})
+                 .sort('_id', 1).limit(batch_size)]
+        if not batch:
+            break
+        last_id = batch[-1]
+
+        if not dry_run:
+            db.campaigns.bulk_write([
+                UpdateOne({'_id': campaign_id},
+                          {'$push': {'recent_donations': recent_donations_push()}})
+                for campaign_id in batch
+            ], ordered=False)
+        trimmed += len(batch)
+        print(f"{'Would trim' if dry_run else 'Trimmed'} {trimmed} campaigns so far...")
+
+    return trimmed
@@ -0,0 +1,227 @@
+"""
+Structured, sampled request logging off the request thread.
+
+`init_request_logging(app)` records one JSON line per sampled request:
+
+    {"ts": "...", "method": "POST", "path": "/api/auth/login",
+     "route": "/api/auth/login", "status": 200, "duration_ms": 41.7,
+     "remote_addr": "10.0.0.7", "body": {"email": "a@b.c", "password": "***"}}
+
+The request thread only copies a few attributes into a record and puts it on
+a bounded queue; a QueueListener thread parses, redacts and writes it. When
+the queue is full, records are dropped and counted rather than blocking.
+
+Configuration (environment):
+    REQUEST_LOG                 on/off (default on)
+    REQUEST_LOG_SAMPLE_RATE     default sampling rate, 0.0-1.0 (default 1.0)
+    REQUEST_LOG_ROUTE_SAMPLES   per-route overrides keyed by Flask rule,
+                                e.g. "/api/health=0,/api/campaigns/all=0.1"
+    REQUEST_LOG_BODY            include request bodies, on/off (default off)
+    REQUEST_LOG_BODY_MAX_BYTES  bodies larger than this are not logged (default 2048)
+    REQUEST_LOG_REDACT          extra comma separated field names to redact
+    REQUEST_LOG_QUEUE_SIZE      records buffered before dropping (default 10000)
+
+Server errors (5xx) are always logged regardless of sampling.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import parse_qsl
+
+from flask import g, request
+
+REDACTED = '***'
+
+# Field names (case-insensitive) whose values never reach the log
+REDACT_FIELDS = {
+    'password', 'current_password', 'new_password', 'token', 'access_token',
+    'refresh_token', 'authorization', 'secret', 'upi_id', 'card_number', 'cvv'
+}
+
+
+def _flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'on', 'yes')
+
+
+def parse_route_samples(raw):
+    """Parse "rule=rate,rule=rate" into {rule: rate}"""
+    samples = {}
+    for item in (raw or '').split(','):
+        if '=' not in item:
+            continue
+        rule, rate = item.rsplit('=', 1)
+        try:
+            samples[rule.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return samples
+
+
+def redact(value, fields=REDACT_FIELDS):
+    """Replace the values of sensitive keys, recursively"""
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in fields else redact(item, fields)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Formats request records as one JSON object per line.
+
+    Runs on the listener thread, so body parsing and redaction cost the
+    request nothing.
+    """
+
+    def __init__(self, redact_fields):
+        super().__init__()
+        self.redact_fields = redact_fields
+
+    def format(self, record):
+        entry = dict(record.request)
+        query = entry.pop('query', b'')
+        if query:
+            entry['query'] = redact(dict(parse_qsl(query.decode('utf-8', 'replace'))),
+                                    self.redact_fields)
+        body = entry.pop('body', None)
+        if body:
+            try:
+                entry['body'] = redact(json.loads(body), self.redact_fields)
+            except ValueError:
+                entry['body_unparsed'] = True
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The default prepare() formats the message on the calling thread;
+        # formatting is the listener's job here
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestLogger:
+    """Per-process request log pipeline: hooks, queue and listener thread"""
+
+    def __init__(self, name='request_log', stream=None):
+        self.enabled = _flag('REQUEST_LOG', 'on')
+        self.default_rate = min(max(float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', 1.0)), 0.0), 1.0)
+        self.route_rates = parse_route_samples(os.environ.get('REQUEST_LOG_ROUTE_SAMPLES'))
+        self.log_bodies = _flag('REQUEST_LOG_BODY', 'off')
+        self.body_max_bytes = int(os.environ.get('REQUEST_LOG_BODY_MAX_BYTES', 2048))
+        extra = {name.strip().lower() for name in
+                 os.environ.get('REQUEST_LOG_REDACT', '').split(',') if name.strip()}
+        self.redact_fields = REDACT_FIELDS | extra
+
+        self.queue = queue.Queue(int(os.environ.get('REQUEST_LOG_QUEUE_SIZE', 10000)))
+        self.handler = DroppingQueueHandler(self.queue)
+        self.output = logging.StreamHandler(stream or sys.stdout)
+        self.output.setFormatter(JsonLineFormatter(self.redact_fields))
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+
+        self.sampled_out = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the listener thread in this process.
+
+        Called lazily from the first request, because threads started before
+        a gunicorn fork don't exist in the workers.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._listener = QueueListener(self.queue, self.output)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def sample_rate(self, rule):
+        return self.route_rates.get(rule, self.default_rate)
+
+    def before_request(self):
+        g.request_log_start = time.perf_counter()
+
+    def after_request(self, response):
+        start = g.pop('request_log_start', None)
+        if start is None:
+            return response
+        rule = request.url_rule.rule if request.url_rule else None
+        if response.status_code < 500 and random.random() >= self.sample_rate(rule):
+            self.sampled_out += 1
+            return response
+
+        if self._pid != os.getpid():
+            self.start()
+
+        entry = {
+            'ts': datetime.utcnow().isoformat() + 'Z',
+            'method': request.method,
+            'path': request.path,
+            'route': rule,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'remote_addr': request.remote_addr,
+            'query': request.query_string
+        }
+        if self.log_bodies and request.is_json:
+            length = request.content_length or 0
+            if length > self.body_max_bytes:
+                entry['body_bytes'] = length
+            elif length:
+                # Cached by the route's get_json(); parsed on the listener thread
+                entry['body'] = request.get_data(cache=True)
+        self.logger.info('', extra={'request': entry})
+        return response
+
+    def stats(self):
+        """Counters for the health endpoint"""
+        return {
+            'enabled': self.enabled,
+            'queued': self.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'sampled_out': self.sampled_out,
+            'default_sample_rate': self.default_rate
+        }
+
+
+def init_request_logging(app, stream=None):
+    """Install the request log hooks on app and return the RequestLogger"""
+    request_logger = RequestLogger(f'request_log.{app.import_name}', stream)
+    if request_logger.enabled:
+        app.before_request(request_logger.before_request)
+        app.after_request(request_logger.after_request)
+        atexit.register(request_logger.stop)
+    return request_logger
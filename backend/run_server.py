@@ -1,29 +1,7 @@
 # backend/run_server.py
-from waitress import serve
-from app import app
-import os
+# Kept for existing instructions; serve.py is the launcher. Threads are now
+# sized from the CPU count and the MongoDB pool instead of a fixed 4.
+from serve import main
 
 if __name__ == '__main__':
-    # Get the port from environment or default to 5000
-    port = int(os.environ.get('PORT', 5000))
-    
-    # Configure CORS to be more permissive for development
-    app.config['CORS_ORIGINS'] = ['*']
-    
-    print(f"Starting server on http://0.0.0.0:{port}")
-    print("Backend will be accessible from:")
-    print(f"  - http://localhost:{port}")
-    print(f"  - http://192.168.0.136:{port}")
-    print("  - Any device on your network")
-    print("-" * 50)
-    
-    # Serve with Waitress
-    serve(
-        app, 
-        host='0.0.0.0', 
-        port=port,
-        threads=4,
-        connection_limit=1000,
-        cleanup_interval=30,
-        channel_timeout=120
-    )
\ No newline at end of file
+    main(server='waitress', app_module='app')
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+One entry point for running the API under waitress, gunicorn or the Flask
+development server.
+
+Usage:
+    python serve.py                         # auto: gunicorn on Linux/macOS, waitress elsewhere
+    python serve.py --server waitress --app app
+    python serve.py --server gunicorn       # same as the Procfile
+    python serve.py --server dev --app app  # Flask reloader and debugger
+
+Threads and workers are sized from the CPU count and the MongoDB pool of the
+selected config (APP_CONFIG / FLASK_ENV, see config.py). Every request thread
+(or gevent greenlet) can hold a pooled connection, so per process they are
+capped at MONGO_MAX_POOL_SIZE minus SERVER_RESERVED_CONNECTIONS, which stay
+free for the health probe and warm-up. Past that, extra threads would only
+queue inside the driver until MONGO_WAIT_QUEUE_TIMEOUT_MS fails them.
+
+    SERVER              auto | waitress | gunicorn | dev (default auto)
+    APP_MODULE          module defining `app` (default app_production)
+    PORT                port to listen on (default 5000)
+    SERVER_THREADS      request threads per process; waitress defaults to
+                        2 x CPU (at least 4), gunicorn gthread to GUNICORN_THREADS
+    SERVER_RESERVED_CONNECTIONS   pool connections kept free of requests (default 1)
+    WAITRESS_CONNECTION_LIMIT     open connections before waitress stops accepting (default 1000)
+    WAITRESS_BACKLOG              listen() backlog (default 1024)
+    WAITRESS_CHANNEL_TIMEOUT      idle connection timeout in seconds (default 120)
+
+gunicorn reads its own settings from gunicorn.conf.py, which uses
+`server_sizing()` from here. Queue depths of the running server are reported
+under `server` in /api/health (see server_stats.py).
+"""
+import argparse
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import sys
+
+from config import selected_config
+
+SERVERS = ('auto', 'waitress', 'gunicorn', 'dev')
+
+# Config used for sizing when APP_CONFIG/FLASK_ENV aren't set, per app module
+APP_DEFAULT_CONFIGS = {'app': 'development', 'app_production': 'production'}
+
+SERVER_RESERVED_CONNECTIONS = int(os.environ.get('SERVER_RESERVED_CONNECTIONS', 1))
+WAITRESS_CONNECTION_LIMIT = int(os.environ.get('WAITRESS_CONNECTION_LIMIT', 1000))
+WAITRESS_BACKLOG = int(os.environ.get('WAITRESS_BACKLOG', 1024))
+WAITRESS_CHANNEL_TIMEOUT = int(os.environ.get('WAITRESS_CHANNEL_TIMEOUT', 120))
+WAITRESS_CLEANUP_INTERVAL = 30
+
+
+def _int_env(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def mongo_pool_size(app_module='app_production'):
+    """MONGO_MAX_POOL_SIZE of the config the app module will load"""
+    _, config_class = selected_config(APP_DEFAULT_CONFIGS.get(app_module, 'production'))
+    return config_class.MONGO_MAX_POOL_SIZE
+
+
+def server_sizing(server, profile=None, app_module='app_production', cpu_count=None):
+    """Workers and per-process concurrency for a server.
+
+    server is 'waitress' or 'gunicorn' (with profile sync/gthread/gevent).
+    Returns a dict with workers, threads, worker_connections (gevent only),
+    the MongoDB pool size and whether a requested value was capped by it.
+    """
+    cpu_count = cpu_count or multiprocessing.cpu_count()
+    pool_size = mongo_pool_size(app_module)
+    ceiling = max(1, pool_size - SERVER_RESERVED_CONNECTIONS)
+    sizing = {'cpu_count': cpu_count, 'mongo_max_pool_size': pool_size, 'capped': False}
+
+    if server == 'waitress':
+        # One process; threads do the I/O waiting for MongoDB
+        sizing['workers'] = 1
+        requested = _int_env('SERVER_THREADS') or max(4, cpu_count * 2)
+    elif profile == 'sync':
+        sizing['workers'] = _int_env('WEB_CONCURRENCY') or cpu_count * 2 + 1
+        requested = 1
+    elif profile == 'gevent':
+        sizing['workers'] = _int_env('WEB_CONCURRENCY') or cpu_count + 1
+        sizing['threads'] = 1
+        requested = _int_env('GUNICORN_WORKER_CONNECTIONS') or 100
+        sizing['worker_connections'] = min(requested, ceiling)
+        sizing['capped'] = requested > ceiling
+        return sizing
+    else:
+        sizing['workers'] = _int_env('WEB_CONCURRENCY') or cpu_count + 1
+        requested = _int_env('SERVER_THREADS') or _int_env('GUNICORN_THREADS') or 4
+
+    sizing['threads'] = min(requested, ceiling)
+    sizing['capped'] = requested > ceiling
+    return sizing
+
+
+def resolve_server(name):
+    """Turn 'auto' into the server to run"""
+    if name != 'auto':
+        return name
+    if os.name == 'posix' and importlib.util.find_spec('gunicorn') is not None:
+        return 'gunicorn'
+    return 'waitress'
+
+
+def run_gunicorn(app_module, host, port):
+    """Replace this process with gunicorn, configured by gunicorn.conf.py"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    os.environ['PORT'] = str(port)
+    os.environ['GUNICORN_BIND_HOST'] = host
+    os.environ['APP_MODULE'] = app_module
+    os.chdir(backend_dir)
+    print(f"🚀 Starting gunicorn for {app_module}:app on {host}:{port}")
+    os.execv(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', f'{app_module}:app'])
+
+
+def run_waitress(app_module, host, port):
+    from waitress import create_server
+
+    from server_stats import SERVER_STATS
+
+    sizing = server_sizing('waitress', app_module=app_module)
+    module = importlib.import_module(app_module)
+    server = create_server(
+        module.app,
+        host=host,
+        port=port,
+        threads=sizing['threads'],
+        connection_limit=WAITRESS_CONNECTION_LIMIT,
+        backlog=WAITRESS_BACKLOG,
+        channel_timeout=WAITRESS_CHANNEL_TIMEOUT,
+        cleanup_interval=WAITRESS_CLEANUP_INTERVAL
+    )
+    SERVER_STATS.attach_waitress(server, sizing)
+
+    startup = getattr(module, 'startup', None)
+    if startup is not None:
+        startup.start()
+
+    print(f"🚀 Starting waitress for {app_module}:app on http://{host}:{server.effective_port}")
+    print(f"   {sizing['threads']} thread(s) for a MongoDB pool of {sizing['mongo_max_pool_size']}"
+          f"{' (capped by the pool)' if sizing['capped'] else ''}, "
+          f"connection_limit={WAITRESS_CONNECTION_LIMIT}, backlog={WAITRESS_BACKLOG}")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        print("\n🛑 Server stopped")
+    finally:
+        server.close()
+
+
+def run_dev(app_module, host, port):
+    module = importlib.import_module(app_module)
+    print(f"🛠️ Starting the Flask development server for {app_module}:app on http://{host}:{port}")
+    module.app.run(host=host, port=port, debug=True, use_reloader=True, threaded=True)
+
+
+RUNNERS = {'gunicorn': run_gunicorn, 'waitress': run_waitress, 'dev': run_dev}
+
+
+def main(argv=None, server=None, app_module=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=SERVERS, default=server or os.environ.get('SERVER', 'auto'))
+    parser.add_argument('--app', default=app_module or os.environ.get('APP_MODULE', 'app_production'),
+                        help='Module that defines the Flask app')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    args = parser.parse_args(argv)
+
+    name = resolve_server(args.server)
+    if name == 'gunicorn' and os.name != 'posix':
+        parser.error('gunicorn only runs on Linux/macOS; use --server waitress')
+    RUNNERS[name](args.app, args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Request queuing stats for the WSGI server in front of the app.
+
+`serve.py` (waitress) and gunicorn.conf.py (gunicorn workers) register the
+running server here, and the health endpoints report `server_stats()`:
+
+    threads / active / queued   waitress: request threads, busy threads and
+                                requests waiting for a free thread
+    connections / in_flight /   gunicorn gthread: open connections, requests
+    queued                      handed to the thread pool, and those still
+                                waiting for a thread
+    listen_backlog              connections the kernel has accepted but the
+                                server hasn't picked up yet, against the
+                                listen() backlog (Linux only, from /proc/net/tcp)
+
+A growing `queued` or `listen_backlog.queued` means requests are waiting
+on the server rather than on MongoDB; compare with `readiness.pool.waiting`.
+"""
+import os
+import threading
+
+LISTEN_STATE = '0A'
+PROC_TCP_TABLES = ('/proc/net/tcp', '/proc/net/tcp6')
+SOMAXCONN_PATH = '/proc/sys/net/core/somaxconn'
+
+
+def _somaxconn():
+    try:
+        with open(SOMAXCONN_PATH) as value:
+            return int(value.read())
+    except (OSError, ValueError):
+        return None
+
+
+def listen_backlog(port, backlog=None):
+    """Accept-queue length of the socket listening on port.
+
+    For LISTEN sockets the kernel reports the accept queue as rx_queue.
+    `limit` is the backlog passed to listen(), which the kernel silently
+    caps at net.core.somaxconn. Returns None where /proc/net/tcp isn't
+    available or nothing listens on port.
+    """
+    queued = None
+    for path in PROC_TCP_TABLES:
+        try:
+            with open(path) as table:
+                next(table)
+                for line in table:
+                    fields = line.split()
+                    if fields[3] != LISTEN_STATE or int(fields[1].rsplit(':', 1)[1], 16) != port:
+                        continue
+                    queued = (queued or 0) + int(fields[4].split(':')[1], 16)
+        except (OSError, StopIteration, IndexError, ValueError):
+            continue
+    if queued is None:
+        return None
+    somaxconn = _somaxconn()
+    if backlog and somaxconn:
+        backlog = min(backlog, somaxconn)
+    return {'queued': queued, 'limit': backlog or somaxconn}
+
+
+class ServerStats:
+    """The server this process runs under, and how to read its queues"""
+
+    def __init__(self):
+        self.server = None
+        self.port = None
+        self.backlog = None
+        self.sizing = {}
+        self._waitress = None
+        self._worker = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def attach_waitress(self, server, sizing=None):
+        """Register a waitress server from waitress.create_server()"""
+        with self._lock:
+            self.server = 'waitress'
+            self._waitress = server
+            self.port = int(server.effective_port)
+            self.backlog = server.adj.backlog
+            self.sizing = dict(sizing or {})
+            self._pid = os.getpid()
+
+    def attach_gunicorn_worker(self, worker, sizing=None):
+        """Register the gunicorn worker of this process (from post_worker_init)"""
+        with self._lock:
+            self.server = 'gunicorn'
+            self._worker = worker
+            self.port = worker.sockets[0].getsockname()[1] if worker.sockets else None
+            self.backlog = worker.cfg.backlog
+            self.sizing = dict(sizing or {})
+            self._pid = os.getpid()
+
+    def _waitress_stats(self):
+        dispatcher = self._waitress.task_dispatcher
+        with dispatcher.lock:
+            threads = len(dispatcher.threads) - dispatcher.stop_count
+            return {
+                'threads': threads,
+                'active': dispatcher.active_count,
+                'idle': threads - dispatcher.active_count,
+                'queued': len(dispatcher.queue),
+                'connections': len(self._waitress.active_channels)
+            }
+
+    def _gunicorn_stats(self):
+        worker = self._worker
+        stats = {
+            'worker_class': type(worker).__name__,
+            'threads': worker.cfg.threads,
+            'requests_served': getattr(worker, 'nr', None)
+        }
+        if hasattr(worker, 'nr_conns'):
+            # gthread: connections are accepted by the main thread and handed
+            # to a ThreadPoolExecutor; its work queue holds the waiting ones
+            pool = getattr(worker, 'tpool', None)
+            stats['connections'] = worker.nr_conns
+            stats['in_flight'] = len(worker.futures)
+            stats['queued'] = pool._work_queue.qsize() if pool is not None else 0
+            stats['worker_connections'] = worker.worker_connections
+        elif hasattr(worker, 'worker_connections'):
+            stats['worker_connections'] = worker.worker_connections
+        return stats
+
+    def stats(self):
+        if self.server is None:
+            return {'server': 'development'}
+        if self._pid != os.getpid():
+            # Forked without re-registering; the counters belong to the parent
+            return {'server': self.server, 'pid': os.getpid()}
+        stats = {'server': self.server, 'pid': self._pid, 'sizing': self.sizing}
+        try:
+            if self._waitress is not None:
+                stats.update(self._waitress_stats())
+            elif self._worker is not None:
+                stats.update(self._gunicorn_stats())
+        except Exception as e:
+            stats['error'] = str(e)
+        if self.port:
+            stats['listen_backlog'] = listen_backlog(self.port, self.backlog)
+        return stats
+
+
+SERVER_STATS = ServerStats()
+
+
+def server_stats():
+    return SERVER_STATS.stats()
@@ -33,6 +33,10 @@ def main():
         print("💡 Try: pip install --user -r requirements_render.txt")
         return
     
+    # Create MongoDB indexes (needs MONGO_URI or a local MongoDB)
+    if not run_command("python manage.py ensure-indexes", "Creating MongoDB indexes"):
+        print("💡 Start MongoDB (or set MONGO_URI) and run: python manage.py ensure-indexes")
+    
     # Test the backend
     print("\n🧪 Testing backend setup...")
     if run_command("python test_deployment.py", "Running backend tests"):
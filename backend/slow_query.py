@@ -0,0 +1,240 @@
+"""
+MongoDB slow-query log with explain capture.
+
+A pymongo CommandListener flags every command slower than SLOW_QUERY_MS.
+A background thread then explains the query shape (executionStats), at most
+once per shape per SLOW_QUERY_EXPLAIN_INTERVAL seconds, and writes one JSON
+line per slow command to stderr, or to a rotating log file if one is set:
+
+    {"ts": "...", "route": "get_all_campaigns", "command": "find",
+     "collection": "campaigns", "duration_ms": 412.3,
+     "shape": {"filter": {"status": "?"}, "sort": {"created_at": -1, "_id": -1}},
+     "plan": ["FETCH", "IXSCAN"], "collscan": false,
+     "docs_examined": 20, "keys_examined": 21, "returned": 20}
+
+Configuration (environment):
+    SLOW_QUERY_LOG               on/off (default on)
+    SLOW_QUERY_MS                threshold in milliseconds (default 100)
+    SLOW_QUERY_EXPLAIN_INTERVAL  seconds between explains of one shape (default 60)
+    SLOW_QUERY_LOG_FILE          log path (default unset: write to stderr)
+    SLOW_QUERY_LOG_MAX_BYTES     rotate the file after this size (default 10 MB)
+    SLOW_QUERY_LOG_BACKUPS       rotated files kept (default 5)
+"""
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from pymongo import monitoring
+
+from indexes import plan_stages
+
+# Commands explain() accepts; each names its collection under the command name
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+
+# Session/transport fields the driver adds, which explain rejects
+DRIVER_FIELDS = {
+    'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'signature',
+    'readConcern', 'writeConcern'
+}
+
+# Parts of a command that describe its shape
+SHAPE_FIELDS = ('filter', 'query', 'sort', 'projection', 'pipeline', 'key', 'updates', 'deletes')
+
+
+def _flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'on', 'yes')
+
+
+def normalize_shape(value, key=None):
+    """Replace literal values with '?', keeping field names and operators.
+
+    Sort and projection specs are kept as-is since their values are part of
+    the shape.
+    """
+    if key in ('sort', 'projection', '$sort', '$project'):
+        return value
+    if isinstance(value, dict):
+        return {k: normalize_shape(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [normalize_shape(item) for item in value]
+    return '?'
+
+
+def command_shape(command):
+    """The normalized, loggable shape of a command"""
+    return {field: normalize_shape(command[field], field)
+            for field in SHAPE_FIELDS if field in command}
+
+
+def find_key(document, key):
+    """First value stored under key anywhere in a nested explain document"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def summarize_explain(explanation):
+    """Plan stages plus docs examined vs returned from an explain result"""
+    plan = find_key(explanation, 'winningPlan') or {}
+    stages = plan_stages(plan)
+    stats = find_key(explanation, 'executionStats') or {}
+    return {
+        'plan': stages,
+        'collscan': 'COLLSCAN' in stages,
+        'docs_examined': stats.get('totalDocsExamined'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'returned': stats.get('nReturned')
+    }
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Flags slow commands and hands them to a background explain thread"""
+
+    def __init__(self, stream=None):
+        self.enabled = _flag('SLOW_QUERY_LOG', 'on')
+        self.threshold_micros = float(os.environ.get('SLOW_QUERY_MS', 100)) * 1000
+        self.explain_interval = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', 60))
+        self.log_file = os.environ.get('SLOW_QUERY_LOG_FILE') or None
+        self.stream = stream
+        self.client = None
+        self.slow_commands = 0
+        self.dropped = 0
+        self._pending = {}
+        self._last_explained = {}
+        self._queue = queue.Queue(1000)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._logger = None
+
+    def attach(self, client):
+        """Give the listener the client to run explain commands on"""
+        self.client = client
+
+    def _key(self, event):
+        return (event.request_id, event.connection_id, event.operation_id)
+
+    def started(self, event):
+        if not self.enabled or event.command_name not in EXPLAINABLE:
+            return
+        # Listener callbacks run on the thread that issued the command, so
+        # the Flask request (if any) is the caller
+        route = request.endpoint if has_request_context() else None
+        with self._lock:
+            self._pending[self._key(event)] = (event.database_name, event.command, route)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            pending = self._pending.pop(self._key(event), None)
+        if pending is None or event.duration_micros < self.threshold_micros:
+            return
+        self.slow_commands += 1
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait((event.command_name, event.duration_micros, pending))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        """Start the explain/log thread in this process (lazily, after any fork)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._logger is None:
+                if self.log_file:
+                    handler = RotatingFileHandler(
+                        self.log_file,
+                        maxBytes=int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024)),
+                        backupCount=int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+                    )
+                else:
+                    # Next to the request log in the process output, instead
+                    # of a file relative to whatever the working directory is
+                    handler = logging.StreamHandler(self.stream or sys.stderr)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._logger = logging.getLogger('slow_query')
+                self._logger.setLevel(logging.INFO)
+                self._logger.propagate = False
+                self._logger.addHandler(handler)
+            threading.Thread(target=self._run, name='slow-query-log', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            command_name, duration_micros, (database, command, route) = self._queue.get()
+            try:
+                self._logger.info(json.dumps(
+                    self._entry(command_name, duration_micros, database, command, route),
+                    default=str, separators=(',', ':')
+                ))
+            except Exception as e:
+                print(f"Slow query log error: {e}")
+
+    def _entry(self, command_name, duration_micros, database, command, route):
+        shape = command_shape(command)
+        entry = {
+            'ts': datetime.utcnow().isoformat() + 'Z',
+            'route': route,
+            'command': command_name,
+            'database': database,
+            'collection': command.get(command_name),
+            'duration_ms': round(duration_micros / 1000, 2),
+            'shape': shape
+        }
+
+        # Explaining re-runs the query, so each shape is explained at most
+        # once per interval
+        shape_key = json.dumps([command_name, entry['collection'], shape], sort_keys=True, default=str)
+        now = time.monotonic()
+        last = self._last_explained.get(shape_key)
+        if self.client is None or (last is not None and now - last < self.explain_interval):
+            entry['explain'] = 'skipped'
+            return entry
+        self._last_explained[shape_key] = now
+        if len(self._last_explained) > 10000:
+            self._last_explained.clear()
+
+        explainable = {key: value for key, value in command.items()
+                       if key not in DRIVER_FIELDS and not key.startswith('$')}
+        try:
+            explanation = self.client[database].command(
+                'explain', explainable, verbosity='executionStats'
+            )
+            entry.update(summarize_explain(explanation))
+        except Exception as e:
+            entry['explain_error'] = str(e)
+        return entry
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_micros / 1000,
+            'slow_commands': self.slow_commands,
+            'dropped': self.dropped
+        }
+
+
+SLOW_QUERY_LISTENER = SlowQueryListener()
@@ -9,6 +9,8 @@ Usage:
     python start_server.py
     or
     python3 start_server.py
+
+For waitress or gunicorn use serve.py instead.
 """
 
 import os
@@ -71,15 +73,9 @@ def start_server():
     print("="*50 + "\n")
     
     try:
-        # Import and run the app
-        from app import app
-        app.run(
-            host='0.0.0.0',  # Allow connections from any IP
-            port=5000,
-            debug=True,
-            use_reloader=True,
-            threaded=True
-        )
+        # The launcher's dev mode runs app.run() with the reloader
+        from serve import main as serve
+        serve(['--server', 'dev', '--app', 'app', '--port', '5000'])
     except ImportError as e:
         print(f"Error importing app: {e}")
         print("Make sure app.py exists in the current directory")
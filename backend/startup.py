@@ -0,0 +1,115 @@
+"""
+Non-blocking startup: background warm-up with readiness gating.
+
+Importing the app no longer talks to MongoDB (the client is created with
+connect=False and connects on first use), so a slow or briefly unreachable
+cluster can't stall or crash-loop worker boot. Instead `Startup` runs the
+warm-up phases on a background thread once per process:
+
+    mongodb_pool   open WARMUP_CONNECTIONS connections concurrently
+    caches         pre-load the hot read caches
+    password_pool  start the password hashing processes (passwords.py)
+
+A failing phase is retried with backoff until it succeeds. Until every
+phase has finished, /api/health/ready reports not ready. Phase timings are
+printed and reported under `startup` in the health endpoints, to track
+cold-start time. Each phase reports its own duration; the `app_loaded` and
+`ready` marks are measured from the start of the process (for a preloaded
+gunicorn worker, from its fork), so interpreter start-up and imports count.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+WARMUP_CONNECTIONS = int(os.environ.get('WARMUP_CONNECTIONS', 4))
+WARMUP_MAX_BACKOFF = 30
+
+# Fallback start time where /proc isn't available
+IMPORTED_AT = time.time()
+
+
+def process_start_time():
+    """Wall-clock time the current process started"""
+    try:
+        with open('/proc/self/stat') as stat:
+            # starttime is field 22, in clock ticks since boot; the command
+            # name in field 2 may contain spaces, so split after it
+            start_ticks = int(stat.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as uptime:
+            seconds_since_boot = float(uptime.read().split()[0])
+        return time.time() - seconds_since_boot + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return IMPORTED_AT
+
+
+def warm_pool(client, connections=WARMUP_CONNECTIONS):
+    """Open `connections` pooled connections by pinging concurrently"""
+    if connections <= 0:
+        return
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        for future in [executor.submit(client.admin.command, 'ping') for _ in range(connections)]:
+            future.result()
+
+
+class Startup:
+    """Runs named warm-up phases in the background and records their timings"""
+
+    def __init__(self, phases, on_failure=None):
+        # phases: list of (name, callable); on_failure(name, error) is called
+        # for each failed attempt
+        self.phases = phases
+        self.on_failure = on_failure
+        self.began = process_start_time()
+        self.timings = {}
+        self.attempts = {}
+        self.done = False
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def mark(self, name):
+        """Record time elapsed since the process started, e.g. when the app finished importing"""
+        self.timings[name] = round((time.time() - self.began) * 1000, 2)
+
+    def start(self):
+        """Start warm-up in this process; safe to call repeatedly and after a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # A forked worker's warm-up counts from its own start
+            self.began = process_start_time()
+        threading.Thread(target=self._run, name='startup-warmup', daemon=True).start()
+
+    def _run(self):
+        for name, phase in self.phases:
+            backoff = 1
+            while True:
+                self.attempts[name] = self.attempts.get(name, 0) + 1
+                start = time.perf_counter()
+                try:
+                    phase()
+                    self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+                    break
+                except Exception as e:
+                    self.last_error = f'{name}: {e}'
+                    if self.on_failure:
+                        self.on_failure(name, e)
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, WARMUP_MAX_BACKOFF)
+        self.mark('ready')
+        self.done = True
+        print(f"🚀 Warm-up finished in {self.timings['ready']} ms: {self.timings}")
+
+    def status(self):
+        status = {
+            'warm': self.done,
+            'timings_ms': dict(self.timings),
+            'attempts': dict(self.attempts)
+        }
+        if not self.done and self.last_error:
+            status['last_error'] = self.last_error
+        return status
@@ -0,0 +1,94 @@
+"""
+List responses streamed straight from a MongoDB cursor.
+
+`jsonify(list(cursor))` holds every document as a dict, then the whole
+encoded body, in the worker at once. `stream_json_list(cursor)` instead
+returns a response whose body is produced batch by batch as the cursor
+fetches from the server: each batch of STREAM_BATCH_SIZE documents is
+encoded with the app's JSON provider (json_provider.py) and sent, so
+memory stays flat however many documents the list has. Clients see the
+same JSON array as before.
+
+With STREAM_RAW_BSON on, the cursor returns RawBSONDocument: the driver
+keeps each document as its BSON bytes and it is only decoded while its
+batch is being encoded, so no dicts are built for the rest of the batch.
+
+The first batch is fetched before the response is returned, so a failing
+query is still a 500; an error after that can only cut the body short
+(and is logged).
+
+Configuration (environment):
+    STREAM_RESPONSES      on/off (default on); off sends jsonify(list(cursor))
+    STREAM_BATCH_SIZE     documents per cursor batch and encoded chunk
+                          (default 100)
+    STREAM_RAW_BSON       on/off (default off)
+"""
+import os
+
+from bson.raw_bson import RawBSONDocument
+from flask import current_app, jsonify
+
+STREAM_RESPONSES = os.environ.get('STREAM_RESPONSES', 'on').lower() in ('1', 'true', 'on', 'yes')
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 100))
+STREAM_RAW_BSON = os.environ.get('STREAM_RAW_BSON', 'off').lower() in ('1', 'true', 'on', 'yes')
+
+
+def stream_collection(collection):
+    """collection, returning RawBSONDocument when STREAM_RAW_BSON is on"""
+    if not (STREAM_RESPONSES and STREAM_RAW_BSON):
+        return collection
+    return collection.with_options(
+        codec_options=collection.codec_options.with_options(document_class=RawBSONDocument)
+    )
+
+
+def _batches(iterator, first, batch_size):
+    batch = [first]
+    for document in iterator:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def json_array_chunks(iterator, first, encode, batch_size):
+    """Yield a JSON array as bytes, one encoded batch of documents at a time"""
+    yield b'['
+    separator = b''
+    for batch in _batches(iterator, first, batch_size):
+        # "[a,b,c]" minus its brackets, so one encode call covers the batch
+        yield separator + encode(batch)[1:-1]
+        separator = b','
+    yield b']\n'
+
+
+def stream_json_list(documents, batch_size=None):
+    """A streaming JSON array response for a cursor (or any iterable)"""
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    if not STREAM_RESPONSES:
+        return jsonify(list(documents))
+
+    if hasattr(documents, 'batch_size'):
+        documents.batch_size(batch_size)
+    iterator = iter(documents)
+    # Run the query now, while a failure can still become an error response
+    first = next(iterator, None)
+    if first is None:
+        return jsonify([])
+
+    encode = current_app.json.encode
+
+    def generate():
+        try:
+            yield from json_array_chunks(iterator, first, encode, batch_size)
+        except Exception as e:
+            print(f"❌ Streaming response failed mid-body: {e}")
+            raise
+        finally:
+            # Also runs when the client disconnects and the server closes us
+            if hasattr(documents, 'close'):
+                documents.close()
+
+    return current_app.response_class(generate(), mimetype=current_app.json.mimetype)
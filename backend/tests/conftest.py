@@ -0,0 +1,48 @@
+"""Shared fixtures: the backend modules are flat, so put them on sys.path"""
+import os
+import sys
+
+import mongomock
+import pytest
+from mongomock.collection import BulkOperationBuilder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config reads it once, at whichever import comes first; keeps app_production
+# from resolving the .env SRV URI
+os.environ['MONGO_URI'] = 'mongodb://localhost:27017/connect_contribute'
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def mongomock_bulk_write(monkeypatch):
+    """Let mongomock's bulk_write take the installed pymongo's UpdateOne.
+
+    pymongo passes a `sort` option to the bulk builder that mongomock's
+    doesn't know; it is always None for the updates the backend sends.
+    """
+    add_update = BulkOperationBuilder.add_update
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        assert sort is None
+        return add_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(BulkOperationBuilder, 'add_update', add_update_without_sort)
+
+
+@pytest.fixture
+def production_app(db, monkeypatch):
+    """app_production with the mongomock db in place of its MongoDB"""
+    import app_production
+    from passwords import PasswordHasher
+    monkeypatch.setattr(app_production.mongo, 'db', db)
+    monkeypatch.setattr(app_production.mongo, 'cx', db.client)
+    # Hash in the test process with a cheap method instead of starting a pool
+    monkeypatch.setattr(app_production, 'password_hasher',
+                        PasswordHasher(method='pbkdf2:sha256:1000', workers=0))
+    app_production.campaign_cache.clear()
+    with app_production.app.app_context():
+        yield app_production
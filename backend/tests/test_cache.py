@@ -0,0 +1,75 @@
+import time
+
+from cache import TTLCache, apply_projection
+
+
+def test_get_returns_a_copy():
+    cache = TTLCache('test')
+    cache.set('a', {'title': 'x'})
+    cached = cache.get('a')
+    cached['title'] = 'changed'
+    assert cache.get('a') == {'title': 'x'}
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_nested_values_are_not_shared():
+    cache = TTLCache('test')
+    document = {'recent_donations': [{'amount': 10}]}
+    cache.set('a', document)
+    document['recent_donations'].append({'amount': 20})
+    cached = cache.get('a')
+    cached['recent_donations'][0]['amount'] = 99
+    assert cache.get('a') == {'recent_donations': [{'amount': 10}]}
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache('test', ttl=30)
+    cache.set('a', {'v': 1})
+    now[0] += 29
+    assert cache.get('a') == {'v': 1}
+    now[0] += 2
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache('test', max_entries=2)
+    cache.set('a', {'v': 1})
+    cache.set('b', {'v': 2})
+    cache.get('a')
+    cache.set('c', {'v': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'v': 1}
+    assert cache.evictions == 1
+
+
+def test_memory_cap():
+    cache = TTLCache('test', max_bytes=2000)
+    cache.set('big', {'blob': 'x' * 5000})
+    assert cache.get('big') is None
+    for key in range(20):
+        cache.set(key, {'v': 'y' * 100})
+    stats = cache.stats()
+    assert stats['bytes'] <= 2000
+    assert 0 < stats['entries'] < 20
+
+
+def test_invalidate_and_disabled_cache():
+    cache = TTLCache('test')
+    cache.set('a', {'v': 1})
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.get('a') is None
+    assert cache.invalidations == 1
+
+    disabled = TTLCache('off', ttl=0)
+    disabled.set('a', {'v': 1})
+    assert disabled.get('a') is None
+
+
+def test_apply_projection_keeps_id():
+    document = {'_id': 1, 'title': 't', 'description': 'd'}
+    assert apply_projection(document, {'title': 1}) == {'_id': 1, 'title': 't'}
+    assert apply_projection(document, None) is document
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+from conditional import bump_list_version, document_validators, get_list_version, is_not_modified, make_etag
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def test_make_etag_depends_on_parts_and_query_string(app):
+    document_id = ObjectId()
+    with app.test_request_context('/?fields=title'):
+        etag = make_etag(document_id, datetime(2025, 1, 1))
+        assert etag == make_etag(document_id, '2025-01-01T00:00:00')
+        assert etag != make_etag(document_id, datetime(2025, 1, 2))
+    with app.test_request_context('/?fields=title,status'):
+        assert etag != make_etag(document_id, datetime(2025, 1, 1))
+
+
+def test_make_etag_separates_parts(app):
+    with app.test_request_context('/'):
+        assert make_etag('ab', 'c') != make_etag('a', 'bc')
+
+
+def test_document_validators(app):
+    document = {'_id': ObjectId(), 'updated_at': datetime(2025, 1, 1, 12, 0, 0, 500)}
+    with app.test_request_context('/'):
+        etag, last_modified = document_validators(document)
+        assert last_modified == document['updated_at']
+        assert document_validators({**document, 'updated_at': '2025-01-01T12:00:00.000500'}) == (etag, last_modified)
+
+
+def test_is_not_modified(app):
+    with app.test_request_context('/', headers={'If-None-Match': '"abc"'}):
+        assert is_not_modified('abc')
+        assert not is_not_modified('def')
+    with app.test_request_context('/', headers={'If-Modified-Since': 'Wed, 01 Jan 2025 12:00:00 GMT'}):
+        assert is_not_modified('abc', datetime(2025, 1, 1, 12, 0, 0, 900000))
+        assert not is_not_modified('abc', datetime(2025, 1, 1, 12, 0, 1))
+
+
+def test_list_version_is_bumped(db):
+    assert get_list_version(db, 'campaigns') == (0, None)
+    bump_list_version(db, 'campaigns')
+    bump_list_version(db, 'campaigns')
+    version, updated_at = get_list_version(db, 'campaigns')
+    assert version == 2
+    assert isinstance(updated_at, datetime)
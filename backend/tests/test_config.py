@@ -0,0 +1,67 @@
+import importlib.util
+
+import pytest
+from pymongo import MongoClient
+
+from config import (
+    ConfigError, ProductionConfig, available_compressors, effective_client_settings, mongo_client_options,
+    validate_config
+)
+
+
+def settings(config_class=ProductionConfig, **overrides):
+    values = {name: getattr(config_class, name) for name in dir(config_class) if name.isupper()}
+    values.update(overrides)
+    return values
+
+
+@pytest.fixture
+def only_zlib(monkeypatch):
+    """zstandard and snappy not installed"""
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec',
+                        lambda name, *args: None if name in ('zstandard', 'snappy') else find_spec(name, *args))
+
+
+def test_missing_compressor_modules_are_skipped(only_zlib):
+    assert available_compressors(['zstd', 'snappy', 'zlib']) == ['zlib']
+    assert mongo_client_options(settings())['compressors'] == 'zlib'
+    assert 'compressors' not in mongo_client_options(settings(MONGO_COMPRESSORS='zstd'))
+    assert 'compressors' not in mongo_client_options(settings(MONGO_COMPRESSORS=''))
+
+
+def test_production_client_options():
+    options = mongo_client_options(settings())
+    assert (options['maxPoolSize'], options['minPoolSize']) == (50, 5)
+    assert (options['readConcernLevel'], options['w']) == ('majority', 'majority')
+    assert mongo_client_options(settings(MONGO_WRITE_CONCERN='2'))['w'] == 2
+    # Unset settings are left to pymongo's defaults
+    assert 'socketTimeoutMS' not in mongo_client_options(settings(MONGO_SOCKET_TIMEOUT_MS=None))
+
+
+@pytest.mark.parametrize('overrides, error', [
+    ({'MONGO_MAX_POOL_SIZE': 0}, 'MONGO_MAX_POOL_SIZE'),
+    ({'MONGO_MIN_POOL_SIZE': 60}, 'MONGO_MIN_POOL_SIZE'),
+    ({'MONGO_CONNECT_TIMEOUT_MS': -1}, 'MONGO_CONNECT_TIMEOUT_MS'),
+    ({'MONGO_COMPRESSORS': 'zlib,lz4'}, 'lz4'),
+    ({'MONGO_READ_CONCERN': 'strong'}, 'MONGO_READ_CONCERN'),
+    ({'MONGO_WRITE_CONCERN': 'all'}, 'MONGO_WRITE_CONCERN'),
+])
+def test_invalid_settings_are_rejected(overrides, error):
+    with pytest.raises(ConfigError, match=error):
+        validate_config(settings(**overrides))
+
+
+def test_effective_client_settings(only_zlib):
+    configured = settings()
+    client = MongoClient('mongodb://localhost:1/test', connect=False,
+                         **mongo_client_options(configured))
+    try:
+        effective = effective_client_settings(client, configured)
+    finally:
+        client.close()
+    assert (effective['max_pool_size'], effective['min_pool_size']) == (50, 5)
+    assert effective['wait_queue_timeout_seconds'] == 5
+    assert effective['compressors'] == ['zlib']
+    assert effective['read_concern'] == 'majority'
+    assert effective['write_concern'] == {'w': 'majority'}
@@ -0,0 +1,142 @@
+import json
+from datetime import datetime
+
+import mongomock
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import donation_import
+from donation_import import InvalidImport, import_donations, parse_import, validate_row
+
+NOW = datetime(2024, 5, 1, 12, 0)
+IMPORTER = str(ObjectId())
+
+
+def test_parse_import_json_array_and_object():
+    rows = [{'campaign_id': 'x', 'amount': 5}]
+    assert parse_import(json.dumps(rows).encode(), 'application/json') == rows
+    assert parse_import(json.dumps({'donations': rows}).encode(), 'application/json') == rows
+
+
+def test_parse_import_csv_with_bom():
+    body = '﻿campaign_id,amount, donor_name\nabc,10, Asha \n'.encode('utf-8')
+    assert parse_import(body, 'text/csv') == [{'campaign_id': 'abc', 'amount': '10', 'donor_name': 'Asha'}]
+    assert parse_import(body, None, filename='sheet.CSV')[0]['campaign_id'] == 'abc'
+
+
+@pytest.mark.parametrize('body', [b'', b'not json', b'{"rows": []}', b'[]'])
+def test_parse_import_rejects(body):
+    with pytest.raises(InvalidImport):
+        parse_import(body, 'application/json')
+
+
+def test_parse_import_limits_rows(monkeypatch):
+    monkeypatch.setattr(donation_import, 'IMPORT_MAX_ROWS', 2)
+    with pytest.raises(InvalidImport):
+        parse_import(json.dumps([{}] * 3).encode(), 'application/json')
+
+
+def test_validate_row_defaults():
+    campaign_id = ObjectId()
+    donation = validate_row({'campaign_id': str(campaign_id), 'amount': '12.5', 'donor_email': ' '},
+                            IMPORTER, 'import-1', NOW)
+    assert donation['campaign_id'] == campaign_id
+    assert donation['amount'] == 12.5
+    assert donation['donor_name'] == 'Anonymous'
+    assert donation['donor_email'] is None
+    assert donation['payment_method'] == 'cash'
+    assert donation['created_at'] == NOW
+    assert (donation['source'], donation['import_id']) == ('import', 'import-1')
+
+
+def test_validate_row_converts_donated_at_to_naive_utc():
+    donation = validate_row({'campaign_id': str(ObjectId()), 'amount': 1,
+                             'donated_at': '2024-04-01T10:00:00+05:30'}, IMPORTER, 'i', NOW)
+    assert donation['created_at'] == datetime(2024, 4, 1, 4, 30)
+
+
+@pytest.mark.parametrize('row, error', [
+    ({'amount': 1}, 'campaign_id'),
+    ({'campaign_id': 'nope', 'amount': 1}, 'campaign_id'),
+    ({'campaign_id': str(ObjectId())}, 'amount'),
+    ({'campaign_id': str(ObjectId()), 'amount': -1}, 'positive'),
+    ({'campaign_id': str(ObjectId()), 'amount': 1, 'donated_at': 'yesterday'}, 'donated_at'),
+    ('row', 'object'),
+])
+def test_validate_row_errors(row, error):
+    with pytest.raises(ValueError, match=error):
+        validate_row(row, IMPORTER, 'i', NOW)
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    db.campaign_ids = [
+        db.campaigns.insert_one({'created_by': ObjectId(IMPORTER), 'raised_amount': 0.0,
+                                 'total_donations': 0, 'recent_donations': []}).inserted_id
+        for _ in range(2)
+    ]
+    return db
+
+
+def test_import_updates_each_campaign_once(db, mongomock_bulk_write):
+    first, second = db.campaign_ids
+    report = import_donations(db, [
+        {'campaign_id': str(first), 'amount': 5, 'donor_name': 'Asha', 'donated_at': '2024-04-01T10:00:00'},
+        {'campaign_id': str(second), 'amount': 7},
+        {'campaign_id': str(first), 'amount': 1, 'payment_method': 'cheque'},
+        {'campaign_id': str(first), 'amount': 0},
+    ], IMPORTER)
+
+    assert (report['imported'], report['failed']) == (3, 1)
+    assert [(c['campaign_id'], c['donations'], c['amount']) for c in report['campaigns']] == [
+        (first, 2, 6.0), (second, 1, 7.0)
+    ]
+    campaign = db.campaigns.find_one({'_id': first})
+    assert (campaign['raised_amount'], campaign['total_donations']) == (6.0, 2)
+    assert campaign['campaign_stats']['payment_methods'] == {'cash': 1, 'cheque': 1}
+    assert [entry['amount'] for entry in campaign['recent_donations']] == [1.0, 5.0]
+    assert db.donations.count_documents({'import_id': report['import_id']}) == 3
+
+
+def test_failed_campaign_update_only_removes_that_campaigns_donations(db, monkeypatch):
+    first, second = db.campaign_ids
+
+    def bulk_write(requests, ordered=True, session=None):
+        # The first campaign's update lands, the second one's fails
+        db.campaigns.update_one(requests[0]._filter, {'$inc': requests[0]._doc['$inc']})
+        raise BulkWriteError({'writeErrors': [{'index': 1, 'code': 2, 'errmsg': 'boom'}]})
+
+    monkeypatch.setattr(db.campaigns, 'bulk_write', bulk_write)
+    report = import_donations(db, [
+        {'campaign_id': str(first), 'amount': 5},
+        {'campaign_id': str(second), 'amount': 7},
+        {'campaign_id': str(first), 'amount': 1},
+    ], IMPORTER)
+
+    assert (report['imported'], report['failed']) == (2, 1)
+    assert [row['status'] for row in report['rows']] == ['imported', 'error', 'imported']
+    assert report['rows'][1]['error'] == 'Campaign update failed'
+    assert [campaign['campaign_id'] for campaign in report['campaigns']] == [first]
+    assert db.donations.count_documents({'campaign_id': first}) == 2
+    assert db.donations.count_documents({'campaign_id': second}) == 0
+    assert db.campaigns.find_one({'_id': first})['raised_amount'] == 6
+
+
+def test_unknown_update_failure_removes_the_whole_import(db, monkeypatch):
+    def bulk_write(requests, ordered=True, session=None):
+        raise ConnectionError('network down')
+
+    monkeypatch.setattr(db.campaigns, 'bulk_write', bulk_write)
+    with pytest.raises(ConnectionError):
+        import_donations(db, [{'campaign_id': str(db.campaign_ids[0]), 'amount': 5}], IMPORTER)
+    assert db.donations.count_documents({}) == 0
+
+
+def test_rows_for_other_users_campaigns_are_rejected(db):
+    other = db.campaigns.insert_one({'created_by': ObjectId()}).inserted_id
+    report = import_donations(db, [{'campaign_id': str(other), 'amount': 5}], IMPORTER)
+    assert report['imported'] == 0
+    assert report['rows'][0]['error'] == 'Campaign not found or unauthorized'
+    assert db.donations.count_documents({}) == 0
@@ -0,0 +1,139 @@
+import math
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from donation_stats import (
+    UNKNOWN_METHOD, InvalidDateRange, add_donation_to_stats, add_donations_to_stats,
+    aggregate_donation_stats, format_donation_stats, get_campaign_stats, new_campaign_stats, parse_date_range, rebuild_donation_stats, stats_complete
+)
+
+
+def test_format_donation_stats_empty():
+    assert format_donation_stats(None) == {
+        'total_amount': 0, 'total_donations': 0, 'average_donation': 0,
+        'highest_donation': 0, 'donation_stddev': 0, 'payment_methods': {}
+    }
+
+
+def test_format_donation_stats_average_and_stddev():
+    amounts = [10.0, 20.0, 30.0]
+    stats = format_donation_stats({'count': 3, 'sum': sum(amounts), 'max': 30.0,
+                                   'sum_squares': sum(a * a for a in amounts), 'payment_methods': {'UPI': 3}})
+    assert stats['average_donation'] == 20.0
+    assert stats['donation_stddev'] == round(math.sqrt(200 / 3), 2)
+    assert stats['highest_donation'] == 30.0
+
+
+def test_add_donations_to_stats_matches_one_update_per_donation():
+    donations = [(5, 'UPI'), (12.5, 'cash'), (3, 'UPI'), (1, None)]
+    combined = add_donations_to_stats({'$inc': {'raised_amount': 21.5}}, donations)
+    assert combined['$inc']['raised_amount'] == 21.5
+    assert combined['$inc']['campaign_stats.count'] == 4
+    assert combined['$inc']['campaign_stats.sum'] == 21.5
+    assert combined['$inc']['campaign_stats.sum_squares'] == 25 + 156.25 + 9 + 1
+    assert combined['$inc']['campaign_stats.payment_methods.UPI'] == 2
+    assert combined['$inc']['campaign_stats.payment_methods.unknown'] == 1
+    assert combined['$max'] == {'campaign_stats.max': 12.5}
+
+    single = add_donation_to_stats({}, 12.5, 'ca.sh')
+    assert single['$inc']['campaign_stats.payment_methods.ca_sh'] == 1
+
+
+def test_parse_date_range():
+    start, end = parse_date_range('2025-01-01T05:30:00+05:30', '2025-02-01')
+    assert (start, end) == (datetime(2025, 1, 1), datetime(2025, 2, 1))
+    assert parse_date_range(None, None) == (None, None)
+    with pytest.raises(InvalidDateRange):
+        parse_date_range('2025-02-01', '2025-01-01')
+    with pytest.raises(InvalidDateRange):
+        parse_date_range('soon', None)
+
+
+def add_campaign(db, **fields):
+    return db.campaigns.insert_one(fields).inserted_id
+
+
+def test_aggregate_donation_stats_window(db):
+    campaign_id = ObjectId()
+    for day, amount, method in ((1, 10.0, 'UPI'), (2, 30.0, 'card'), (3, 20.0, None), (4, 99.0, 'UPI')):
+        db.donations.insert_one({'campaign_id': campaign_id, 'amount': amount,
+                                 'payment_method': method, 'created_at': datetime(2026, 1, day)})
+    db.donations.insert_one({'campaign_id': ObjectId(), 'amount': 500.0, 'created_at': datetime(2026, 1, 2)})
+
+    stats = aggregate_donation_stats(db, campaign_id, datetime(2026, 1, 1), datetime(2026, 1, 4))
+    assert (stats['total_donations'], stats['total_amount'], stats['highest_donation']) == (3, 60.0, 30.0)
+    assert stats['average_donation'] == 20.0
+    assert stats['payment_methods'] == {'UPI': 1, 'card': 1, UNKNOWN_METHOD: 1}
+
+    assert aggregate_donation_stats(db, campaign_id, start=datetime(2026, 1, 4))['total_amount'] == 99.0
+    assert aggregate_donation_stats(db, campaign_id, end=datetime(2026, 1, 1))['total_donations'] == 0
+
+
+def test_new_campaign_stats_are_complete():
+    assert stats_complete(new_campaign_stats(datetime.utcnow()))
+    assert not stats_complete({'count': 1, 'sum': 5.0})
+    assert not stats_complete(None)
+
+
+def test_get_campaign_stats_aggregates_old_campaigns_without_writing(db):
+    # Created before campaign_stats: one new donation only $inc'd a partial sub-document
+    campaign_id = add_campaign(db, campaign_stats={'count': 1, 'sum': 5.0})
+    for amount in (5.0, 20.0, 15.0):
+        db.donations.insert_one({'campaign_id': campaign_id, 'amount': amount, 'payment_method': 'UPI'})
+
+    stats = get_campaign_stats(db, campaign_id)
+    assert (stats['total_donations'], stats['total_amount'], stats['highest_donation']) == (3, 40.0, 20.0)
+    assert db.campaigns.find_one({'_id': campaign_id})['campaign_stats'] == {'count': 1, 'sum': 5.0}
+    assert get_campaign_stats(db, ObjectId()) is None
+
+
+def test_rebuild_missing_only_touches_incomplete_campaigns(db, mongomock_bulk_write):
+    done = add_campaign(db, campaign_stats={**new_campaign_stats(datetime.utcnow()), 'count': 7})
+    old = add_campaign(db)
+    empty = add_campaign(db)
+    db.donations.insert_many([{'campaign_id': cid, 'amount': 2.0, 'payment_method': 'cash'} for cid in (done, old)])
+
+    assert rebuild_donation_stats(db, missing_only=True) == 2
+    assert db.campaigns.find_one({'_id': done})['campaign_stats']['count'] == 7
+    assert db.campaigns.find_one({'_id': old})['campaign_stats']['count'] == 1
+    assert db.campaigns.find_one({'_id': empty})['campaign_stats']['count'] == 0
+    assert rebuild_donation_stats(db, missing_only=True) == 0
+
+
+def test_rebuild_leaves_campaigns_that_changed_meanwhile(db, monkeypatch, mongomock_bulk_write):
+    campaign_id = add_campaign(db, campaign_stats={'count': 1, 'sum': 5.0})
+    db.donations.insert_many([{'campaign_id': campaign_id, 'amount': amount, 'payment_method': 'UPI'}
+                              for amount in (5.0, 20.0)])
+    aggregate = db.donations.aggregate
+    counted = []
+
+    def aggregate_while_donating(*args, **kwargs):
+        result = list(aggregate(*args, **kwargs))
+        if not counted:
+            # A donation lands between the aggregation and the write
+            db.donations.insert_one({'campaign_id': campaign_id, 'amount': 1.0, 'payment_method': 'UPI'})
+            db.campaigns.update_one({'_id': campaign_id}, add_donation_to_stats({}, 1.0, 'UPI'))
+            counted.append(True)
+        return iter(result)
+
+    monkeypatch.setattr(db.donations, 'aggregate', aggregate_while_donating)
+    assert rebuild_donation_stats(db, campaign_id=campaign_id) == 1
+    stats = db.campaigns.find_one({'_id': campaign_id})['campaign_stats']
+    assert (stats['count'], stats['sum'], stats['max']) == (3, 26.0, 20.0)
+    assert stats_complete(stats)
+
+
+def test_rebuild_gives_up_after_attempts(db, monkeypatch, mongomock_bulk_write):
+    campaign_id = add_campaign(db)
+    aggregate = db.donations.aggregate
+
+    def aggregate_while_donating(*args, **kwargs):
+        result = list(aggregate(*args, **kwargs))
+        db.campaigns.update_one({'_id': campaign_id}, add_donation_to_stats({}, 1.0, 'UPI'))
+        return iter(result)
+
+    monkeypatch.setattr(db.donations, 'aggregate', aggregate_while_donating)
+    assert rebuild_donation_stats(db) == 0
+    assert not stats_complete(db.campaigns.find_one({'_id': campaign_id})['campaign_stats'])
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from flask_jwt_extended import create_access_token
+from pymongo.errors import DuplicateKeyError
+
+from recent_donations import RECENT_DONATIONS_LIMIT
+
+
+@pytest.fixture
+def campaign_id(db):
+    return db.campaigns.insert_one({
+        'title': 'Wells', 'description': 'x' * 1000, 'raised_amount': 10.0, 'target_amount': 100.0,
+        'total_donations': 1, 'recent_donations': [], 'updated_at': datetime(2024, 1, 1)
+    }).inserted_id
+
+
+def donation(campaign_id, **fields):
+    return {'campaign_id': campaign_id, 'amount': 5.0, 'payment_method': 'UPI',
+            'created_at': datetime.utcnow(), **fields}
+
+
+def test_record_and_count_returns_only_the_projected_totals(production_app, db, campaign_id):
+    campaign = production_app.record_and_count(donation(campaign_id), 'UPI')
+    assert set(campaign) == {'_id', *production_app.DONATION_RESULT_PROJECTION}
+    assert campaign['raised_amount'] == 15.0
+    assert campaign['updated_at'] > datetime(2024, 1, 1)
+    stored = db.campaigns.find_one({'_id': campaign_id})
+    assert stored['raised_amount'] == 15.0
+    assert stored['campaign_stats']['payment_methods'] == {'UPI': 1}
+
+
+def test_record_and_count_for_a_missing_campaign_leaves_no_record(production_app, db):
+    assert production_app.record_and_count(donation(ObjectId()), 'UPI') is None
+    assert db.donations.count_documents({}) == 0
+
+
+def test_duplicate_record_moves_no_counter(production_app, db, campaign_id):
+    db.donations.create_index('transaction_id', unique=True)
+    production_app.record_and_count(donation(campaign_id, transaction_id='UPI_1'), 'UPI')
+    with pytest.raises(DuplicateKeyError):
+        production_app.record_and_count(donation(campaign_id, transaction_id='UPI_1'), 'UPI')
+    assert db.campaigns.find_one({'_id': campaign_id})['raised_amount'] == 15.0
+    assert db.donations.count_documents({}) == 1
+
+
+def test_donate_responds_with_the_new_totals(production_app, db, campaign_id):
+    user_id = ObjectId()
+    token = create_access_token(identity=str(user_id))
+    response = production_app.app.test_client().post(
+        f'/api/campaigns/{campaign_id}/donate', json={'amount': 2.5},
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['new_total'] == 12.5
+    assert set(body['campaign']) == {'_id', *production_app.DONATION_RESULT_PROJECTION}
+    assert db.donations.find_one({'_id': ObjectId(body['donation_id'])})['donor_id'] == user_id
+
+
+def test_record_donation_keeps_recent_donations_bounded(production_app, db, campaign_id):
+    for _ in range(RECENT_DONATIONS_LIMIT + 2):
+        production_app.record_donation(str(campaign_id), donation(campaign_id))
+    campaign = db.campaigns.find_one({'_id': campaign_id})
+    assert campaign['total_donations'] == RECENT_DONATIONS_LIMIT + 3
+    assert len(campaign['recent_donations']) == RECENT_DONATIONS_LIMIT
@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+from export import EXPORT_FIELDS, InvalidExportFormat, export_format, export_response
+from json_provider import init_json
+
+
+@pytest.fixture
+def campaign(db):
+    campaign_id = ObjectId()
+    db.donations.insert_many([
+        {'campaign_id': campaign_id, 'amount': 100 + n, 'created_at': datetime(2024, 1, 1 + n)}
+        for n in range(3)
+    ] + [{'campaign_id': ObjectId(), 'amount': 1, 'created_at': datetime(2024, 1, 1)}])
+    db.payments.insert_one({'campaign_id': campaign_id, 'amount': 50, 'payment_status': 'SUCCESS',
+                            'created_at': datetime(2024, 1, 2)})
+    return campaign_id
+
+
+def export(db, campaign_id, fmt, **kwargs):
+    app = Flask(__name__)
+    init_json(app)
+    with app.app_context():
+        response = export_response(db, str(campaign_id), fmt, batch_size=2, **kwargs)
+        return response, response.get_data().decode()
+
+
+def test_export_format():
+    assert export_format(None) == 'ndjson'
+    assert export_format('CSV') == 'csv'
+    with pytest.raises(InvalidExportFormat):
+        export_format('xlsx')
+
+
+def test_ndjson_covers_donations_then_payments(db, campaign):
+    response, body = export(db, campaign, 'ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    assert f'campaign-{campaign}-donations.ndjson' in response.headers['Content-Disposition']
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [(row['record_type'], row['amount']) for row in rows] == [
+        ('donation', 100), ('donation', 101), ('donation', 102), ('payment', 50)
+    ]
+
+
+def test_csv_has_header_and_empty_missing_columns(db, campaign):
+    _, body = export(db, campaign, 'csv', start=datetime(2024, 1, 2))
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert list(rows[0]) == EXPORT_FIELDS
+    assert [row['amount'] for row in rows] == ['101', '102', '50']
+    assert rows[0]['payment_status'] == '' and rows[-1]['payment_status'] == 'SUCCESS'
+    assert rows[0]['created_at'] == '2024-01-02T00:00:00'
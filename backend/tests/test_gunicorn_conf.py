@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import runpy
+
+import pytest
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def load_conf(monkeypatch):
+    """Evaluate gunicorn.conf.py under the given environment"""
+    for name in ('GUNICORN_PROFILE', 'PROMETHEUS_MULTIPROC_DIR', 'WEB_CONCURRENCY', 'SERVER_THREADS',
+                 'GUNICORN_THREADS', 'GUNICORN_MAX_REQUESTS', 'APP_CONFIG', 'FLASK_ENV'):
+        monkeypatch.delenv(name, raising=False)
+
+    def load(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return runpy.run_path(GUNICORN_CONF)
+    return load
+
+
+def test_gthread_is_the_default(load_conf):
+    conf = load_conf(GUNICORN_THREADS='8')
+    assert (conf['worker_class'], conf['threads']) == ('gthread', 8)
+    assert conf['workers'] == conf['sizing']['workers']
+    assert conf['preload_app'] is True
+    assert (conf['max_requests'], conf['max_requests_jitter']) == (1000, 100)
+
+
+def test_sync_profile(load_conf):
+    conf = load_conf(GUNICORN_PROFILE='sync', WEB_CONCURRENCY='3')
+    assert (conf['worker_class'], conf['workers']) == ('sync', 3)
+    assert 'threads' not in conf
+
+
+def test_gevent_falls_back_without_gevent(load_conf, monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec',
+                        lambda name, *args: None if name == 'gevent' else find_spec(name, *args))
+    conf = load_conf(GUNICORN_PROFILE='gevent')
+    assert conf['worker_class'] == 'gthread'
+    assert 'worker_connections' not in conf
+
+
+def test_unknown_profile(load_conf):
+    with pytest.raises(ValueError, match='GUNICORN_PROFILE'):
+        load_conf(GUNICORN_PROFILE='eventlet')
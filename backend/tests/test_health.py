@@ -0,0 +1,116 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from health import HealthProbe, PoolListener
+
+
+class FakeClient:
+    """Answers ping until told to fail"""
+
+    def __init__(self):
+        self.error = None
+        self.admin = self
+        self.options = SimpleNamespace(pool_options=SimpleNamespace(max_pool_size=10))
+
+    def command(self, name):
+        if self.error:
+            raise self.error
+        return {'ok': 1}
+
+
+class FakeStartup:
+    def __init__(self):
+        self.done = False
+
+    def start(self):
+        pass
+
+    def status(self):
+        return {'done': self.done}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def probe_for(client, **kwargs):
+    probe = HealthProbe(client, interval=10, pool_listener=PoolListener(), **kwargs)
+    # Probed by hand instead of from the background thread
+    probe._pid = os.getpid()
+    return probe
+
+
+def test_not_ready_before_the_first_probe(monkeypatch):
+    monkeypatch.setattr('health.FIRST_PROBE_WAIT', 0)
+    status = probe_for(FakeClient()).status()
+    assert (status['ready'], status['database']) == (False, 'unavailable')
+    assert status['checked_at'] is None
+
+
+def test_failures_and_recovery(clock):
+    client = FakeClient()
+    probe = probe_for(client)
+    assert probe.probe() is True
+    status = probe.status()
+    assert (status['ready'], status['database'], status['consecutive_failures']) == (True, 'connected', 0)
+    assert status['pool']['max_pool_size'] == 10
+
+    client.error = ConnectionError('no primary')
+    probe.probe()
+    probe.probe()
+    status = probe.status()
+    assert (status['ready'], status['database']) == (False, 'unavailable')
+    assert (status['consecutive_failures'], status['error']) == (2, 'no primary')
+
+    client.error = None
+    probe.probe()
+    status = probe.status()
+    assert (status['ready'], status['consecutive_failures']) == (True, 0)
+    assert 'error' not in status
+
+
+def test_stale_probe_is_not_ready(clock):
+    probe = probe_for(FakeClient())
+    probe.probe()
+    clock[0] += 29
+    assert probe.status()['ready'] is True
+    clock[0] += 2
+    status = probe.status()
+    assert (status['ready'], status['probe_age_seconds']) == (False, 31)
+
+
+def test_missing_client_and_startup():
+    probe = probe_for(None)
+    probe.probe()
+    status = probe.status()
+    assert status['error'] == 'MongoDB client not created yet'
+    assert 'pool' not in status
+
+    startup = FakeStartup()
+    probe = probe_for(FakeClient(), startup=startup)
+    probe.probe()
+    assert probe.status()['ready'] is False
+    startup.done = True
+    status = probe.status()
+    assert (status['ready'], status['startup']) == (True, {'done': True})
+
+
+def test_pool_listener_counts_checkouts():
+    listener = PoolListener()
+    for _ in range(3):
+        listener.connection_created(None)
+        listener.connection_check_out_started(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_out(None)
+    listener.connection_check_out_failed(None)
+    listener.connection_checked_in(None)
+    assert listener.stats(4) == {
+        'open': 3, 'in_use': 1, 'waiting': 0, 'checkout_failures': 1, 'pool_clears': 0,
+        'max_pool_size': 4, 'saturation': 0.25
+    }
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from flask import Flask, jsonify, request
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+from pymongo.errors import DuplicateKeyError
+
+from idempotency import (IdempotencyGuard, IdempotencyStore, KeyInProgress, KeyReused,
+                         new_transaction_id, stamp_idempotency_key)
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    db.donations.create_index('idempotency_key', unique=True,
+                              partialFilterExpression={'idempotency_key': {'$type': 'string'}})
+    return db
+
+
+@pytest.fixture
+def store(db):
+    return IdempotencyStore(lambda: db.idempotency_keys, ttl=60, lock_seconds=30)
+
+
+@pytest.fixture
+def client(db, store):
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-long-enough-for-hs256'
+    JWTManager(app)
+    guard = IdempotencyGuard(store)
+
+    @app.route('/donate', methods=['POST'])
+    @jwt_required()
+    @guard.idempotent('donate')
+    def donate():
+        try:
+            donation = db.donations.insert_one(stamp_idempotency_key({'amount': request.json['amount']}))
+        except DuplicateKeyError:
+            return jsonify({'error': 'Donation already recorded'}), 409
+        if request.json.get('fail'):
+            return jsonify({'error': 'Internal server error'}), 500
+        return jsonify({'donation_id': str(donation.inserted_id)}), 201
+
+    with app.app_context():
+        token = create_access_token(identity='user-1')
+    client = app.test_client()
+    client.guard = guard
+    client.headers = lambda key: {'Authorization': f'Bearer {token}', 'Idempotency-Key': key}
+    return client
+
+
+def test_new_transaction_id_is_unique_within_a_second():
+    ids = {new_transaction_id('DON') for _ in range(100)}
+    assert len(ids) == 100
+    assert all(transaction_id.startswith('DON_') for transaction_id in ids)
+
+
+def test_claim_then_replay(store):
+    assert store.claim('k', 'body') is None
+    with pytest.raises(KeyInProgress):
+        store.claim('k', 'body')
+    with pytest.raises(KeyReused):
+        store.claim('k', 'other body')
+
+    class Response:
+        status_code = 201
+        mimetype = 'application/json'
+
+        def get_data(self):
+            return b'{"ok":true}'
+
+    store.complete('k', Response())
+    record = store.claim('k', 'body')
+    assert (record['status'], record['body']) == (201, b'{"ok":true}')
+
+
+def test_release_lets_the_key_be_claimed_again(store):
+    store.claim('k', 'body')
+    store.release('k')
+    assert store.claim('k', 'body') is None
+
+
+def test_lapsed_claim_is_taken_over(store, db):
+    store.claim('k', 'body')
+    db.idempotency_keys.update_one({'_id': 'k'}, {'$set': {'locked_until': datetime.utcnow() - timedelta(seconds=1)}})
+    assert store.claim('k', 'body') is None
+
+
+def test_repeated_key_replays_without_writing_again(client, db):
+    first = client.post('/donate', json={'amount': 5}, headers=client.headers('a'))
+    again = client.post('/donate', json={'amount': 5}, headers=client.headers('a'))
+    assert first.status_code == again.status_code == 201
+    assert again.headers['Idempotent-Replayed'] == 'true'
+    assert again.get_data() == first.get_data()
+    assert db.donations.count_documents({}) == 1
+    assert client.guard.stats()['replayed'] == 1
+
+
+def test_key_reused_with_another_body(client):
+    client.post('/donate', json={'amount': 5}, headers=client.headers('a'))
+    response = client.post('/donate', json={'amount': 6}, headers=client.headers('a'))
+    assert response.status_code == 422
+
+
+def test_server_errors_are_not_stored(client, db):
+    failed = client.post('/donate', json={'amount': 5, 'fail': True}, headers=client.headers('a'))
+    assert failed.status_code == 500
+    assert db.idempotency_keys.count_documents({}) == 0
+
+
+def test_takeover_after_lost_response_does_not_write_twice(client, db, store, monkeypatch):
+    # The donation is written but its response can't be stored
+    monkeypatch.setattr(store, 'complete', lambda key_id, response: (_ for _ in ()).throw(RuntimeError('down')))
+    first = client.post('/donate', json={'amount': 5}, headers=client.headers('a'))
+    assert first.status_code == 201
+    monkeypatch.undo()
+
+    db.idempotency_keys.update_many({}, {'$set': {'locked_until': datetime.utcnow() - timedelta(seconds=1)}})
+    retry = client.post('/donate', json={'amount': 5}, headers=client.headers('a'))
+    assert retry.status_code == 409
+    assert retry.json['error'] == 'Donation already recorded'
+    assert db.donations.count_documents({}) == 1
+
+
+def test_requests_without_a_key_are_not_tracked(client, db):
+    headers = client.headers('a')
+    del headers['Idempotency-Key']
+    client.post('/donate', json={'amount': 5}, headers=headers)
+    client.post('/donate', json={'amount': 5}, headers=headers)
+    assert db.donations.count_documents({}) == 2
+    assert 'idempotency_key' not in db.donations.find_one()
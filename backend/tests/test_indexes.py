@@ -0,0 +1,60 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import manage
+from indexes import dedupe_field, ensure_indexes, find_duplicates
+
+
+def add_donations(db, *transaction_ids):
+    for second, transaction_id in enumerate(transaction_ids):
+        db.donations.insert_one({'transaction_id': transaction_id, 'amount': 10.0,
+                                 'created_at': datetime(2024, 1, 1, 12, 0, second)})
+
+
+def test_find_duplicates_lists_shared_ids_oldest_first(db):
+    add_donations(db, 'DON_1', 'DON_2', 'DON_1', None, None)
+    [group] = find_duplicates(db, 'donations', 'transaction_id')
+    assert group['value'] == 'DON_1'
+    assert group['count'] == 2
+    first = db.donations.find_one({'transaction_id': 'DON_1'}, sort=[('created_at', 1)])
+    assert group['ids'][0] == first['_id']
+
+
+def test_dedupe_field_renames_later_duplicates(db):
+    add_donations(db, 'DON_1', 'DON_1', 'DON_1', 'DON_2')
+    assert dedupe_field(db, 'donations', 'transaction_id', dry_run=True) == 2
+    assert find_duplicates(db, 'donations', 'transaction_id')
+
+    assert dedupe_field(db, 'donations', 'transaction_id') == 2
+    assert find_duplicates(db, 'donations', 'transaction_id') == []
+    assert db.donations.count_documents({}) == 4
+    renamed = sorted(d['transaction_id'] for d in db.donations.find({'original_transaction_id': 'DON_1'}))
+    assert renamed == ['DON_1-dup1', 'DON_1-dup2']
+
+
+def test_ensure_indexes_reports_duplicates_for_dedupe_indexes(db):
+    add_donations(db, 'DON_1', 'DON_1')
+    results = {(collection, name): (error, duplicates)
+               for collection, name, error, duplicates in ensure_indexes(db)}
+    error, duplicates = results[('donations', 'transaction_id_unique')]
+    assert error
+    assert [group['value'] for group in duplicates] == ['DON_1']
+    assert results[('donations', 'campaign_id_created_at')] == (None, None)
+
+    dedupe_field(db, 'donations', 'transaction_id')
+    results = {(collection, name): error for collection, name, error, _ in ensure_indexes(db)}
+    assert results[('donations', 'transaction_id_unique')] is None
+
+
+def test_ensure_indexes_command_fails_on_duplicates(db, monkeypatch, capsys):
+    monkeypatch.setattr(manage, 'get_database', lambda: db)
+    add_donations(db, 'DON_1', 'DON_1')
+    # mongomock ignores partialFilterExpression: give idempotency_key_unique distinct values
+    for donation in db.donations.find():
+        db.donations.update_one({'_id': donation['_id']}, {'$set': {'idempotency_key': str(donation['_id'])}})
+    assert manage.ensure_indexes_command(SimpleNamespace(verify=False, allow_missing_unique=False)) == 1
+    assert "❌ donations.transaction_id_unique not created" in capsys.readouterr().out
+    assert manage.ensure_indexes_command(SimpleNamespace(verify=False, allow_missing_unique=True)) == 0
+
+    dedupe_field(db, 'donations', 'transaction_id')
+    assert manage.ensure_indexes_command(SimpleNamespace(verify=False, allow_missing_unique=False)) == 0
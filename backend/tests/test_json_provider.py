@@ -0,0 +1,35 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from bson import Decimal128, ObjectId, encode
+from bson.raw_bson import RawBSONDocument
+from flask import Flask
+
+from json_provider import MongoJSONProvider, encode_default, init_json
+
+
+def test_encode_default_mongo_types():
+    oid = ObjectId()
+    assert encode_default(oid) == str(oid)
+    assert encode_default(Decimal128('12.50')) == 12.5
+    assert encode_default(Decimal('3.25')) == 3.25
+    assert encode_default(datetime(2024, 1, 2, 3, 4, 5)) == '2024-01-02T03:04:05'
+    assert encode_default(RawBSONDocument(encode({'a': 1}))) == {'a': 1}
+    assert sorted(encode_default({2, 1})) == [1, 2]
+    with pytest.raises(TypeError):
+        encode_default(object())
+
+
+def test_response_body_is_compact_json():
+    app = Flask(__name__)
+    init_json(app)
+    assert isinstance(app.json, MongoJSONProvider)
+    oid = ObjectId()
+    with app.app_context():
+        response = app.json.response({'_id': oid, 'amount': Decimal128('10'), 'name': 'दान'})
+    assert response.mimetype == 'application/json'
+    body = response.get_data()
+    assert body.endswith(b'\n') and b' ' not in body.strip()
+    assert json.loads(body) == {'_id': str(oid), 'amount': 10.0, 'name': 'दान'}
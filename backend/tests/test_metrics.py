@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from flask import Flask, jsonify
+from prometheus_client import REGISTRY
+
+import metrics
+from metrics import MongoCommandListener, command_collection, init_metrics
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def event(command_name, command=None, request_id=1, duration_micros=2000):
+    return SimpleNamespace(
+        request_id=request_id, connection_id=('localhost', 27017), operation_id=request_id,
+        command_name=command_name, command=command or {}, duration_micros=duration_micros
+    )
+
+
+def test_command_collection():
+    assert command_collection('find', {'find': 'campaigns'}) == 'campaigns'
+    assert command_collection('getMore', {'getMore': 12, 'collection': 'donations'}) == 'donations'
+    assert command_collection('aggregate', {'aggregate': 1}) == ''
+
+
+def test_command_listener_times_commands_by_collection():
+    listener = MongoCommandListener()
+    before = sample('mongodb_command_duration_seconds_count', collection='metrics_test', command='find')
+    failures = sample('mongodb_command_failures_total', collection='metrics_test', command='find')
+
+    listener.started(event('find', {'find': 'metrics_test'}, request_id=1))
+    listener.succeeded(event('find', request_id=1))
+    listener.started(event('find', {'find': 'metrics_test'}, request_id=2))
+    listener.failed(event('find', request_id=2))
+    # Ignored commands and unmatched finishes record nothing
+    listener.started(event('ping', {'ping': 1}, request_id=3))
+    listener.succeeded(event('ping', request_id=3))
+    listener.succeeded(event('find', request_id=4))
+
+    assert sample('mongodb_command_duration_seconds_count',
+                  collection='metrics_test', command='find') == before + 2
+    assert sample('mongodb_command_failures_total',
+                  collection='metrics_test', command='find') == failures + 1
+    assert listener._pending == {}
+
+
+def test_requests_are_counted_by_endpoint():
+    app = Flask('metrics_test')
+    init_metrics(app)
+
+    @app.route('/api/things/<thing_id>')
+    def metrics_test_thing(thing_id):
+        return jsonify(id=thing_id)
+
+    labels = {'endpoint': 'metrics_test_thing', 'method': 'GET', 'status': '200'}
+    before = sample('http_requests_total', **labels)
+    timed = sample('http_request_duration_seconds_count', endpoint='metrics_test_thing', method='GET')
+    client = app.test_client()
+    client.get('/api/things/1')
+    client.get('/api/things/2')
+    assert sample('http_requests_total', **labels) == before + 2
+    assert sample('http_request_duration_seconds_count',
+                  endpoint='metrics_test_thing', method='GET') == timed + 2
+
+
+def test_metrics_token(monkeypatch):
+    app = Flask('metrics_token_test')
+    monkeypatch.setattr(metrics, 'METRICS_TOKEN', 'secret')
+    with app.test_request_context(headers={'Authorization': 'Bearer secret'}):
+        assert metrics.metrics_authorized()
+    with app.test_request_context():
+        assert not metrics.metrics_authorized()
+        response = metrics.metrics_response()
+        assert b'http_requests_total' in response.get_data()
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from pagination import (InvalidCursor, clamp_limit, decode_cursor, encode_cursor, fetch_page,
+                        keyset_query)
+
+
+def test_cursor_round_trip():
+    document = {'_id': ObjectId(), 'created_at': datetime(2025, 1, 2, 3, 4, 5, 678000)}
+    cursor = encode_cursor(document)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (document['created_at'], document['_id'])
+
+
+@pytest.mark.parametrize('cursor', [
+    'garbage',
+    'e30',  # {}
+    'eyJjIjoiMjAyNS0wMS0wMSIsImkiOiJub3QtYW4taWQifQ',  # an _id that isn't an ObjectId
+])
+def test_decode_cursor_rejects_foreign_tokens(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_keyset_query_without_cursor_copies_the_base_query():
+    base = {'status': 'active'}
+    query = keyset_query(base)
+    assert query == base
+    assert query is not base
+
+
+def test_keyset_query_breaks_created_at_ties_on_id():
+    document = {'_id': ObjectId(), 'created_at': datetime(2025, 1, 1)}
+    query = keyset_query({'status': 'active'}, encode_cursor(document))
+    assert query['status'] == 'active'
+    assert query['$or'] == [
+        {'created_at': {'$lt': document['created_at']}},
+        {'created_at': document['created_at'], '_id': {'$lt': document['_id']}}
+    ]
+
+
+def test_clamp_limit():
+    assert clamp_limit(None) == 20
+    assert clamp_limit(0) == 1
+    assert clamp_limit(500) == 100
+    assert clamp_limit('5') == 5
+
+
+def test_fetch_page_walks_every_document_once(db):
+    same_time = datetime(2025, 1, 1)
+    for minute in range(7):
+        # Pairs share a created_at, so pages have to split ties on _id
+        db.campaigns.insert_one({'status': 'active', 'created_at': same_time + timedelta(minutes=minute // 2)})
+
+    seen, cursor = [], None
+    while True:
+        documents, cursor = fetch_page(db.campaigns, {'status': 'active'}, 3, cursor)
+        seen.extend(document['_id'] for document in documents)
+        if cursor is None:
+            break
+    expected = [d['_id'] for d in db.campaigns.find().sort([('created_at', -1), ('_id', -1)])]
+    assert seen == expected
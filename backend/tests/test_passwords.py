@@ -0,0 +1,73 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from passwords import HashingBusy, PasswordHasher, normalize_method, stored_method
+
+CHEAP = 'pbkdf2:sha256:1000'
+OLD = 'pbkdf2:sha256:600'
+
+
+def test_normalize_method():
+    assert normalize_method('scrypt') == 'scrypt:32768:8:1'
+    assert normalize_method('pbkdf2:sha512').startswith('pbkdf2:sha512:')
+    with pytest.raises(ValueError):
+        normalize_method('md5')
+
+
+def test_stored_method():
+    assert stored_method(generate_password_hash('pw', method=OLD)) == OLD
+    assert stored_method('plain text') is None
+    assert stored_method(None) is None
+
+
+def test_check_upgrades_hashes_made_with_another_method():
+    hasher = PasswordHasher(method=CHEAP, workers=0)
+    matches, upgraded = hasher.check(generate_password_hash('pw', method=OLD), 'pw')
+    assert matches and stored_method(upgraded) == CHEAP
+    assert hasher.check(upgraded, 'pw') == (True, None)
+    assert hasher.check(upgraded, 'wrong') == (False, None)
+    assert hasher.stats()['rehashed'] == 1
+
+
+def test_full_queue_is_rejected():
+    hasher = PasswordHasher(method=CHEAP, workers=1, queue_size=1)
+    hasher._slots.acquire()
+    with pytest.raises(HashingBusy):
+        hasher.hash('pw')
+    assert hasher.stats()['rejected'] == 1
+
+
+@pytest.fixture
+def user(db):
+    user = {'email': 'asha@example.com', 'name': 'Asha', 'password': generate_password_hash('pw', method=OLD)}
+    user['_id'] = db.users.insert_one(user).inserted_id
+    return user
+
+
+def login(production_app, password='pw'):
+    return production_app.app.test_client().post('/api/auth/login',
+                                                  json={'email': 'asha@example.com', 'password': password})
+
+
+def test_login_stores_the_upgraded_hash(production_app, db, user):
+    response = login(production_app)
+    assert response.status_code == 200
+    assert 'password' not in response.get_json()['user']
+    stored = db.users.find_one({'_id': user['_id']})['password']
+    assert stored_method(stored) == CHEAP
+    assert login(production_app).status_code == 200
+
+
+def test_upgrade_leaves_a_concurrent_password_change_alone(production_app, db, user):
+    # The password changes between reading the user and storing the rehash
+    changed = generate_password_hash('new password', method=CHEAP)
+    db.users.update_one({'_id': user['_id']}, {'$set': {'password': changed}})
+    production_app.upgrade_password_hash(user, generate_password_hash('pw', method=CHEAP))
+    assert db.users.find_one({'_id': user['_id']})['password'] == changed
+
+
+def test_upgrade_only_touches_that_user(production_app, db, user):
+    other = db.users.insert_one({'email': 'b@example.com', 'password': user['password']}).inserted_id
+    production_app.upgrade_password_hash(user, 'new-hash')
+    assert db.users.find_one({'_id': other})['password'] == user['password']
+    assert db.users.find_one({'_id': user['_id']})['password'] == 'new-hash'
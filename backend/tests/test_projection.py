@@ -0,0 +1,47 @@
+import pytest
+
+from projection import InvalidFields, parse_fields, public_document, read_projection
+
+
+@pytest.mark.parametrize('raw', [None, '', ' , ,'])
+def test_no_fields_means_whole_document(raw):
+    assert parse_fields('campaign', raw) is None
+
+
+def test_fields_become_a_projection():
+    assert parse_fields('campaign', 'title, raised_amount,title') == {'title': 1, 'raised_amount': 1}
+
+
+def test_always_fields_are_added():
+    assert parse_fields('campaign', 'title', always=('created_at',)) == {'title': 1, 'created_at': 1}
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(InvalidFields, match='password, secret'):
+        parse_fields('donation', 'amount,secret,password')
+
+
+def test_allowlists_are_per_resource():
+    assert parse_fields('donation', 'amount') == {'amount': 1}
+    with pytest.raises(InvalidFields):
+        parse_fields('donation_request', 'amount')
+
+
+def test_internal_fields_are_not_selectable():
+    with pytest.raises(InvalidFields):
+        parse_fields('campaign', 'title,campaign_stats')
+    with pytest.raises(InvalidFields):
+        parse_fields('donation', 'idempotency_key')
+
+
+def test_reads_leave_out_internal_fields():
+    assert read_projection('campaign') == {'campaign_stats': 0}
+    assert read_projection('donation') == {'idempotency_key': 0}
+    assert read_projection('donation_request') is None
+    assert read_projection('campaign', {'title': 1}) == {'title': 1}
+
+
+def test_public_document_drops_internal_fields():
+    donation = {'amount': 5.0, 'idempotency_key': 'abc'}
+    assert public_document('donation', donation) == {'amount': 5.0}
+    assert public_document('campaign', None) is None
@@ -0,0 +1,64 @@
+import pytest
+from flask import Flask, jsonify
+
+from rate_limit import AuthRateLimiter, MemoryBucketStore, client_ip, parse_limit
+
+
+def test_parse_limit():
+    assert parse_limit('10/60') == (10, 10 / 60)
+    assert parse_limit('off') is None
+    assert parse_limit('') is None
+    assert parse_limit(None) is None
+
+
+@pytest.mark.parametrize('raw', ['10', 'ten/60', '0/60', '5/0'])
+def test_parse_limit_rejects(raw):
+    with pytest.raises(ValueError):
+        parse_limit(raw)
+
+
+def test_memory_bucket_allows_a_burst_then_limits():
+    store = MemoryBucketStore()
+    assert [store.take('k', 3, 0.001)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = store.take('k', 3, 0.001)
+    assert not allowed
+    assert retry_after > 0
+    # Other keys have their own bucket
+    assert store.take('other', 3, 0.001) == (True, 0)
+
+
+def test_memory_bucket_is_capped_at_max_keys():
+    store = MemoryBucketStore(max_keys=2)
+    for key in ('a', 'b', 'c'):
+        store.take(key, 1, 1)
+    assert store.size() == 2
+
+
+def test_client_ip_trusts_only_configured_hops():
+    app = Flask(__name__)
+    headers = {'X-Forwarded-For': '203.0.113.9, 198.51.100.7'}
+    environ = {'REMOTE_ADDR': '10.0.0.1'}
+    with app.test_request_context(headers=headers, environ_base=environ):
+        assert client_ip(0) == '10.0.0.1'
+        assert client_ip(1) == '198.51.100.7'
+        assert client_ip(2) == '203.0.113.9'
+        # More hops than entries: the header can't be trusted
+        assert client_ip(3) == '10.0.0.1'
+
+
+def test_limiter_buckets_clients_by_forwarded_ip():
+    app = Flask(__name__)
+    limiter = AuthRateLimiter(enabled=True, limits={('login', 'ip'): '1/3600', ('login', 'email'): 'off'},
+                              proxy_hops=1)
+
+    @app.route('/login', methods=['POST'])
+    @limiter.limit('login')
+    def login():
+        return jsonify({'ok': True})
+
+    client = app.test_client()
+    first = client.post('/login', headers={'X-Forwarded-For': '203.0.113.1'})
+    other = client.post('/login', headers={'X-Forwarded-For': '203.0.113.2'})
+    again = client.post('/login', headers={'X-Forwarded-For': '203.0.113.1'})
+    assert (first.status_code, other.status_code, again.status_code) == (200, 200, 429)
+    assert int(again.headers['Retry-After']) >= 1
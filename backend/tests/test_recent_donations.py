@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+import recent_donations
+from recent_donations import compact_recent_donations, recent_donations_push
+
+START = datetime(2024, 1, 1)
+
+
+def entry(minutes):
+    return {'amount': float(minutes), 'donor_name': 'A', 'created_at': START + timedelta(minutes=minutes)}
+
+
+def test_push_keeps_the_newest_entries_newest_first(db, monkeypatch):
+    monkeypatch.setattr(recent_donations, 'RECENT_DONATIONS_LIMIT', 3)
+    campaign_id = db.campaigns.insert_one({'recent_donations': []}).inserted_id
+    # An imported donation can be older than the ones already listed
+    for minutes in (1, 5, 2, 9, 4):
+        db.campaigns.update_one({'_id': campaign_id},
+                                {'$push': {'recent_donations': recent_donations_push(entry(minutes))}})
+    recent = db.campaigns.find_one({'_id': campaign_id})['recent_donations']
+    assert [item['amount'] for item in recent] == [9.0, 5.0, 4.0]
+
+
+def test_compact_trims_only_oversized_campaigns(db, monkeypatch, mongomock_bulk_write):
+    monkeypatch.setattr(recent_donations, 'RECENT_DONATIONS_LIMIT', 2)
+    oversized = db.campaigns.insert_one({'recent_donations': [entry(m) for m in (1, 3, 2)]}).inserted_id
+    small = db.campaigns.insert_one({'recent_donations': [entry(1)]}).inserted_id
+
+    assert compact_recent_donations(db, dry_run=True) == 1
+    assert len(db.campaigns.find_one({'_id': oversized})['recent_donations']) == 3
+    assert compact_recent_donations(db, batch_size=1) == 1
+    assert [item['amount'] for item in db.campaigns.find_one({'_id': oversized})['recent_donations']] == [3.0, 2.0]
+    assert len(db.campaigns.find_one({'_id': small})['recent_donations']) == 1
+    assert compact_recent_donations(db) == 0
@@ -0,0 +1,124 @@
+import io
+import itertools
+import json
+import random
+
+import pytest
+from flask import Flask, jsonify, request
+
+from request_log import REDACTED, init_request_logging, parse_route_samples, redact
+
+# Each app gets its own logger (named after the app)
+APP_NAMES = itertools.count()
+
+
+@pytest.fixture
+def make_app(monkeypatch):
+    """A small app with request logging into a StringIO, configured by env"""
+    created = []
+
+    def make(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        app = Flask(f'request_log_test_{next(APP_NAMES)}')
+
+        @app.route('/api/auth/login', methods=['POST'])
+        def login():
+            request.get_json()
+            return jsonify(ok=True)
+
+        @app.route('/api/health')
+        def health():
+            return jsonify(status='healthy')
+
+        @app.route('/api/broken')
+        def broken():
+            return jsonify(error='boom'), 500
+
+        stream = io.StringIO()
+        request_logger = init_request_logging(app, stream)
+        created.append(request_logger)
+        return app, request_logger, stream
+
+    yield make
+    for request_logger in created:
+        request_logger.stop()
+        request_logger.logger.removeHandler(request_logger.handler)
+
+
+def entries(request_logger, stream):
+    request_logger.stop()  # flushes the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_redact_nested_fields():
+    body = {'email': 'a@b.c', 'Password': 'x', 'payment': {'upi_id': 'a@upi', 'amount': 5},
+            'cards': [{'cvv': '123'}]}
+    assert redact(body) == {'email': 'a@b.c', 'Password': REDACTED,
+                            'payment': {'upi_id': REDACTED, 'amount': 5},
+                            'cards': [{'cvv': REDACTED}]}
+
+
+def test_parse_route_samples():
+    assert parse_route_samples('/api/health=0, /api/campaigns/all=0.1,bad,/x=2,/y=z') == {
+        '/api/health': 0.0, '/api/campaigns/all': 0.1, '/x': 1.0
+    }
+    assert parse_route_samples(None) == {}
+
+
+def test_bodies_and_queries_are_redacted(make_app):
+    app, request_logger, stream = make_app(REQUEST_LOG_BODY='on', REQUEST_LOG_REDACT='email')
+    client = app.test_client()
+    client.post('/api/auth/login?token=abc&page=2', json={'email': 'a@b.c', 'password': 'hunter2'})
+
+    [entry] = entries(request_logger, stream)
+    assert entry['route'] == '/api/auth/login'
+    assert entry['status'] == 200
+    assert entry['body'] == {'email': REDACTED, 'password': REDACTED}
+    assert entry['query'] == {'token': REDACTED, 'page': '2'}
+    assert 'hunter2' not in stream.getvalue()
+
+
+def test_large_bodies_are_logged_as_a_size(make_app):
+    app, request_logger, stream = make_app(REQUEST_LOG_BODY='on', REQUEST_LOG_BODY_MAX_BYTES='16')
+    app.test_client().post('/api/auth/login', json={'password': 'x' * 64})
+
+    [entry] = entries(request_logger, stream)
+    assert 'body' not in entry
+    assert entry['body_bytes'] > 16
+
+
+def test_sampling_keeps_server_errors(make_app, monkeypatch):
+    app, request_logger, stream = make_app(REQUEST_LOG_SAMPLE_RATE='0.5',
+                                           REQUEST_LOG_ROUTE_SAMPLES='/api/health=0')
+    monkeypatch.setattr(random, 'random', lambda: 0.7)
+    client = app.test_client()
+    client.get('/api/health')
+    client.post('/api/auth/login', json={})
+    client.get('/api/broken')
+
+    assert [entry['route'] for entry in entries(request_logger, stream)] == ['/api/broken']
+    assert request_logger.stats()['sampled_out'] == 2
+
+    monkeypatch.setattr(random, 'random', lambda: 0.2)
+    assert request_logger.sample_rate('/api/auth/login') == 0.5
+    client.post('/api/auth/login', json={})
+    client.get('/api/health')
+    assert request_logger.stats()['sampled_out'] == 3
+
+
+def test_full_queue_drops_records(make_app):
+    app, request_logger, stream = make_app(REQUEST_LOG_QUEUE_SIZE='1')
+    # Queue records without a listener thread draining them
+    request_logger.start = lambda: None
+    client = app.test_client()
+    for _ in range(3):
+        client.get('/api/health')
+    assert request_logger.stats()['dropped'] == 2
+
+
+def test_disabled(make_app):
+    app, request_logger, stream = make_app(REQUEST_LOG='off')
+    app.test_client().get('/api/health')
+    assert entries(request_logger, stream) == []
+    assert request_logger.stats()['enabled'] is False
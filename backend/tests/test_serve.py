@@ -0,0 +1,84 @@
+import pytest
+
+import serve
+import server_stats
+from config import DevelopmentConfig, ProductionConfig
+from serve import resolve_server, server_sizing
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Pin the MongoDB pool size and the sizing environment"""
+    for name in ('SERVER_THREADS', 'GUNICORN_THREADS', 'GUNICORN_WORKER_CONNECTIONS', 'WEB_CONCURRENCY'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(serve, 'SERVER_RESERVED_CONNECTIONS', 1)
+
+    def set_pool(size):
+        monkeypatch.setattr(serve, 'mongo_pool_size', lambda app_module='app_production': size)
+    set_pool(10)
+    return set_pool
+
+
+def test_waitress_threads_follow_cpu_count(pool):
+    sizing = server_sizing('waitress', cpu_count=2)
+    assert (sizing['workers'], sizing['threads'], sizing['capped']) == (1, 4, False)
+
+
+def test_threads_are_capped_at_pool_minus_reserved(pool, monkeypatch):
+    sizing = server_sizing('waitress', cpu_count=8)
+    assert (sizing['threads'], sizing['capped']) == (9, True)
+
+    monkeypatch.setenv('SERVER_THREADS', '32')
+    monkeypatch.setattr(serve, 'SERVER_RESERVED_CONNECTIONS', 3)
+    sizing = server_sizing('gunicorn', 'gthread', cpu_count=2)
+    assert (sizing['workers'], sizing['threads'], sizing['capped']) == (3, 7, True)
+
+
+def test_gevent_caps_worker_connections(pool, monkeypatch):
+    pool(50)
+    sizing = server_sizing('gunicorn', 'gevent', cpu_count=2)
+    assert (sizing['workers'], sizing['threads']) == (3, 1)
+    assert (sizing['worker_connections'], sizing['capped']) == (49, True)
+
+    monkeypatch.setenv('GUNICORN_WORKER_CONNECTIONS', '20')
+    assert server_sizing('gunicorn', 'gevent', cpu_count=2)['worker_connections'] == 20
+
+
+def test_sync_workers_have_one_thread(pool, monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    sizing = server_sizing('gunicorn', 'sync', cpu_count=4)
+    assert (sizing['workers'], sizing['threads'], sizing['capped']) == (3, 1, False)
+
+
+def test_ceiling_is_at_least_one_thread(pool):
+    pool(1)
+    assert server_sizing('gunicorn', 'gthread', cpu_count=1)['threads'] == 1
+
+
+def test_pool_size_comes_from_the_app_config(monkeypatch):
+    monkeypatch.delenv('APP_CONFIG', raising=False)
+    monkeypatch.delenv('FLASK_ENV', raising=False)
+    assert serve.mongo_pool_size('app_production') == ProductionConfig.MONGO_MAX_POOL_SIZE
+    assert serve.mongo_pool_size('app') == DevelopmentConfig.MONGO_MAX_POOL_SIZE
+
+
+def test_resolve_server():
+    assert resolve_server('waitress') == 'waitress'
+    assert resolve_server('auto') in ('gunicorn', 'waitress')
+
+
+def test_listen_backlog_reads_the_accept_queue(tmp_path, monkeypatch):
+    table = tmp_path / 'tcp'
+    table.write_text(
+        '  sl  local_address rem_address   st tx_queue rx_queue\n'
+        '   0: 00000000:1388 00000000:0000 0A 00000000:00000003\n'
+        '   1: 0100007F:1388 0100007F:C350 01 00000000:00000000\n'
+        '   2: 00000000:0050 00000000:0000 0A 00000000:00000009\n'
+    )
+    somaxconn = tmp_path / 'somaxconn'
+    somaxconn.write_text('512\n')
+    monkeypatch.setattr(server_stats, 'PROC_TCP_TABLES', (str(table), str(tmp_path / 'missing')))
+    monkeypatch.setattr(server_stats, 'SOMAXCONN_PATH', str(somaxconn))
+
+    assert server_stats.listen_backlog(5000, 1024) == {'queued': 3, 'limit': 512}
+    assert server_stats.listen_backlog(8080) is None
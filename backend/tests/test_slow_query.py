@@ -0,0 +1,89 @@
+import io
+import json
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from slow_query import SlowQueryListener, command_shape, summarize_explain
+
+
+@pytest.fixture(autouse=True)
+def slow_query_logger():
+    yield
+    logger = logging.getLogger('slow_query')
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def event(duration_ms, command=None, request_id=1):
+    command = command or {'find': 'campaigns', 'filter': {'status': 'active'}, 'lsid': {}}
+    return SimpleNamespace(
+        request_id=request_id, connection_id=('localhost', 27017), operation_id=request_id,
+        command_name=next(iter(command)), command=command, database_name='connect_contribute',
+        duration_micros=duration_ms * 1000
+    )
+
+
+def run(listener, *events):
+    for item in events:
+        listener.started(item)
+        listener.succeeded(item)
+
+
+def wait_for_lines(read, count):
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        lines = read().splitlines()
+        if len(lines) >= count:
+            return [json.loads(line) for line in lines]
+        time.sleep(0.01)
+    raise AssertionError('slow query log was not written')
+
+
+def test_command_shape_hides_literals():
+    command = {'find': 'campaigns', 'filter': {'status': 'active', 'goal': {'$gte': 10}},
+               'sort': {'created_at': -1}, 'limit': 20}
+    assert command_shape(command) == {
+        'filter': {'status': '?', 'goal': {'$gte': '?'}},
+        'sort': {'created_at': -1}
+    }
+
+
+def test_summarize_explain():
+    explanation = {
+        'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'COLLSCAN'}}},
+        'executionStats': {'totalDocsExamined': 500, 'totalKeysExamined': 0, 'nReturned': 3}
+    }
+    summary = summarize_explain(explanation)
+    assert summary['collscan'] is True
+    assert (summary['docs_examined'], summary['returned']) == (500, 3)
+
+
+def test_slow_commands_go_to_stderr_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv('SLOW_QUERY_LOG_FILE', raising=False)
+    monkeypatch.chdir(tmp_path)
+    stream = io.StringIO()
+    listener = SlowQueryListener(stream=stream)
+    run(listener, event(5), event(250, request_id=2))
+
+    [entry] = wait_for_lines(stream.getvalue, 1)
+    assert (entry['collection'], entry['duration_ms']) == ('campaigns', 250)
+    assert entry['shape'] == {'filter': {'status': '?'}}
+    assert entry['explain'] == 'skipped'
+    assert listener.stats()['slow_commands'] == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_log_file_only_when_set(monkeypatch, tmp_path):
+    log_file = tmp_path / 'slow.log'
+    monkeypatch.setenv('SLOW_QUERY_LOG_FILE', str(log_file))
+    stream = io.StringIO()
+    listener = SlowQueryListener(stream=stream)
+    run(listener, event(250))
+
+    [entry] = wait_for_lines(lambda: log_file.read_text() if log_file.exists() else '', 1)
+    assert entry['command'] == 'find'
+    assert stream.getvalue() == ''
@@ -0,0 +1,37 @@
+import time
+
+from startup import Startup, process_start_time
+
+
+def test_process_start_time_is_before_now():
+    started = process_start_time()
+    assert started <= time.time()
+    # This test process started recently, not at boot or in the future
+    assert time.time() - started < 24 * 3600
+
+
+def test_marks_count_from_process_start():
+    startup = Startup([])
+    elapsed_ms = (time.time() - process_start_time()) * 1000
+    startup.mark('app_loaded')
+    # Not from Startup construction: the imports before it count too
+    # (allowing for the clock-tick resolution of the start time)
+    assert startup.timings['app_loaded'] >= elapsed_ms - 50
+
+
+def test_failed_phase_is_retried(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError('DNS not answering')
+
+    failures = []
+    startup = Startup([('mongodb_client', flaky)], on_failure=lambda name, error: failures.append(name))
+    startup._run()
+    assert startup.done
+    assert startup.attempts == {'mongodb_client': 3}
+    assert failures == ['mongodb_client', 'mongodb_client']
+    assert 'ready' in startup.timings
@@ -0,0 +1,42 @@
+import json
+
+import mongomock
+from flask import Flask
+
+import streaming
+from json_provider import init_json
+from streaming import json_array_chunks, stream_json_list
+
+
+def encode(value):
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def test_chunks_form_one_json_array():
+    documents = [{'n': n} for n in range(5)]
+    chunks = list(json_array_chunks(iter(documents[1:]), documents[0], encode, 2))
+    # "[", three batches, "]"
+    assert len(chunks) == 5
+    assert json.loads(b''.join(chunks)) == documents
+
+
+def test_stream_json_list_from_cursor(monkeypatch):
+    monkeypatch.setattr(streaming, 'STREAM_RESPONSES', True)
+    app = Flask(__name__)
+    init_json(app)
+    collection = mongomock.MongoClient().db.campaigns
+    collection.insert_many([{'n': n} for n in range(7)])
+    with app.app_context():
+        response = stream_json_list(collection.find({}, {'_id': 0}).sort('n', 1), batch_size=3)
+        assert response.is_streamed
+        assert json.loads(response.get_data()) == [{'n': n} for n in range(7)]
+
+
+def test_empty_list_is_not_streamed(monkeypatch):
+    monkeypatch.setattr(streaming, 'STREAM_RESPONSES', True)
+    app = Flask(__name__)
+    init_json(app)
+    with app.app_context():
+        response = stream_json_list(iter([]))
+        assert not response.is_streamed
+        assert json.loads(response.get_data()) == []
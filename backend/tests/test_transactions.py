@@ -0,0 +1,128 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import transactions
+from transactions import run_write, transactions_enabled
+
+
+def topology(name):
+    return SimpleNamespace(topology_description=SimpleNamespace(topology_type_name=name))
+
+
+@pytest.mark.parametrize('mode, topology_name, expected', [
+    ('auto', 'ReplicaSetWithPrimary', True),
+    ('auto', 'Single', False),
+    ('on', 'Single', True),
+    ('off', 'Sharded', False),
+])
+def test_transactions_enabled(mode, topology_name, expected):
+    assert transactions_enabled(topology(topology_name), mode) is expected
+
+
+class AbortingSession:
+    """with_transaction that puts the collections back when the callback raises"""
+
+    def __init__(self, db):
+        self.db = db
+        self.aborted = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def with_transaction(self, callback):
+        snapshot = {name: list(self.db[name].find()) for name in ('donations', 'campaigns')}
+        try:
+            return callback(self)
+        except Exception:
+            self.aborted = True
+            for name, documents in snapshot.items():
+                self.db[name].delete_many({})
+                if documents:
+                    self.db[name].insert_many(documents)
+            raise
+
+
+class TransactionalClient:
+    def __init__(self, db):
+        self.sessions = []
+        self.db = db
+
+    def start_session(self):
+        self.sessions.append(AbortingSession(self.db))
+        return self.sessions[-1]
+
+
+def test_run_write_without_transactions_passes_no_session():
+    assert run_write(topology('Single'), lambda session: session, mode='auto') is None
+
+
+def test_run_write_failure_aborts_the_transaction(db):
+    client = TransactionalClient(db)
+
+    def write(session):
+        db.donations.insert_one({'amount': 5.0}, session=session)
+        raise RuntimeError('campaign update failed')
+
+    with pytest.raises(RuntimeError):
+        run_write(client, write, mode='on')
+    assert client.sessions[0].aborted
+    assert db.donations.count_documents({}) == 0
+
+
+@pytest.fixture
+def campaign_id(db):
+    return db.campaigns.insert_one({'raised_amount': 10.0, 'total_donations': 1, 'recent_donations': []}).inserted_id
+
+
+def donation(campaign_id):
+    return {'campaign_id': campaign_id, 'amount': 5.0, 'payment_method': 'UPI', 'created_at': datetime.utcnow()}
+
+
+def fail_campaign_update(db, monkeypatch):
+    def update_one(*args, **kwargs):
+        raise RuntimeError('campaign update failed')
+    monkeypatch.setattr(db.campaigns, 'update_one', update_one)
+
+
+def test_record_donation_writes_both(production_app, db, campaign_id):
+    assert production_app.record_donation(str(campaign_id), donation(campaign_id))
+    campaign = db.campaigns.find_one({'_id': campaign_id})
+    assert (campaign['raised_amount'], campaign['total_donations']) == (15.0, 2)
+    assert db.donations.count_documents({'campaign_id': campaign_id}) == 1
+
+
+def test_record_donation_for_a_missing_campaign_leaves_no_record(production_app, db):
+    missing = ObjectId()
+    assert production_app.record_donation(str(missing), donation(missing)) is False
+    assert db.donations.count_documents({}) == 0
+
+
+def test_failed_update_without_transaction_deletes_the_donation(production_app, db, campaign_id, monkeypatch):
+    monkeypatch.setattr(transactions, 'DONATION_TRANSACTIONS', 'off')
+    fail_campaign_update(db, monkeypatch)
+    with pytest.raises(RuntimeError):
+        production_app.record_donation(str(campaign_id), donation(campaign_id))
+    assert db.donations.count_documents({}) == 0
+    assert db.campaigns.find_one({'_id': campaign_id})['raised_amount'] == 10.0
+
+
+def test_failed_update_in_a_transaction_is_left_to_the_abort(production_app, db, campaign_id, monkeypatch):
+    monkeypatch.setattr(transactions, 'DONATION_TRANSACTIONS', 'on')
+    client = TransactionalClient(db)
+    monkeypatch.setattr(production_app.mongo, 'cx', client)
+    fail_campaign_update(db, monkeypatch)
+    deletes = []
+    monkeypatch.setattr(db.donations, 'delete_one', lambda *args, **kwargs: deletes.append(args))
+
+    with pytest.raises(RuntimeError):
+        production_app.record_donation(str(campaign_id), donation(campaign_id))
+    # No compensating delete outside the session: the abort removes the insert
+    assert deletes == []
+    assert client.sessions[0].aborted
+    assert db.donations.count_documents({}) == 0
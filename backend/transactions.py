@@ -0,0 +1,37 @@
+"""
+Optional multi-document transactions for donation writes.
+
+DONATION_TRANSACTIONS controls whether the donation insert and the campaign
+counter update run inside one transaction:
+    auto (default) - only when connected to a replica set or sharded cluster
+    on             - always (fails on a standalone server)
+    off            - never; writes fall back to a compensating delete
+"""
+import os
+
+DONATION_TRANSACTIONS = os.environ.get('DONATION_TRANSACTIONS', 'auto').lower()
+
+# Topologies that support multi-document transactions
+TRANSACTIONAL_TOPOLOGIES = {'ReplicaSetWithPrimary', 'Sharded', 'LoadBalanced'}
+
+
+def transactions_enabled(client, mode=None):
+    """Decide whether writes on this client should use a transaction"""
+    mode = (mode or DONATION_TRANSACTIONS).lower()
+    if mode == 'on':
+        return True
+    if mode == 'off':
+        return False
+    return client.topology_description.topology_type_name in TRANSACTIONAL_TOPOLOGIES
+
+
+def run_write(client, callback, mode=None):
+    """Run callback(session) in a transaction when enabled, else callback(None).
+
+    The callback may be retried by with_transaction on transient errors, so
+    it must not have side effects outside the session.
+    """
+    if not transactions_enabled(client, mode):
+        return callback(None)
+    with client.start_session() as session:
+        return session.with_transaction(callback)